@@ -1,7 +1,14 @@
 import pytest
-from datasets.orm.dataset_orm import get_dataset_filters
+from core.index_cache import INDEX_CACHE
+from core.transform_cache import TRANSFORMED_CACHE
+from datasets.orm.dataset_metadata_orm import METADATA_INDEX
+from datasets.orm.dataset_orm import DATASET_CACHE, SERIES_CACHE
 
 
 @pytest.fixture(autouse=True)
 def clear_caches():
-    get_dataset_filters.cache_clear()
+    TRANSFORMED_CACHE.clear()
+    INDEX_CACHE.clear()
+    DATASET_CACHE.clear()
+    SERIES_CACHE.clear()
+    METADATA_INDEX.invalidate()
@@ -0,0 +1,665 @@
+"""Vectorized correlation engine.
+
+Transformed datasets are aligned into one period-indexed matrix so a test
+series can be scored against every dataset in a single batched pass instead
+of merging and calling ``np.corrcoef`` once per dataset.
+"""
+
+from collections.abc import Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import stats
+
+from datasets.models import (
+    AggregationPeriod,
+    CorrelateData,
+    CorrelateDataPoint,
+    CorrelationMethod,
+    CorrelationMetric,
+    PValueAdjustment,
+)
+
+# Datasets sharing fewer dates than this with the test series are skipped,
+# same as in ``correlate_datasets``.
+MIN_OVERLAP = 4
+
+# Upper bound on the number of elements in the temporaries of a lagged batch
+BLOCK_ELEMENTS = 2**22
+
+
+class AlignedMatrix:
+    """Transformed datasets aligned on a shared, sorted period axis.
+
+    ``values`` has one row per date and one column per title, with NaN where a
+    dataset has no value for that date.
+
+    A matrix selected from the columns of another one keeps it as ``base``,
+    with the position of every column in it as ``columns``.
+    """
+
+    def __init__(
+        self,
+        dates: pd.Index,
+        values: np.ndarray,
+        titles: list[str],
+        base: "AlignedMatrix | None" = None,
+        columns: np.ndarray | None = None,
+    ):
+        self.dates = dates
+        self.values = values
+        self.titles = titles
+        self.base = base
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+
+def align_datasets(dfs: Mapping[str, pd.DataFrame]) -> AlignedMatrix:
+    """Align transformed dataframes with ``Date``/``Value`` columns."""
+    titles = [title for title, df in dfs.items() if not df.empty]
+    if len(titles) == 0:
+        return AlignedMatrix(pd.Index([]), np.empty((0, 0)), [])
+
+    frames = [dfs[title] for title in titles]
+    lengths = [len(df) for df in frames]
+
+    codes, dates = pd.factorize(
+        pd.concat([df["Date"] for df in frames], ignore_index=True), sort=True
+    )
+    columns = np.repeat(np.arange(len(titles)), lengths)
+
+    values = np.full((len(dates), len(titles)), np.nan)
+    values[codes, columns] = np.concatenate(
+        [df["Value"].to_numpy(dtype=float) for df in frames]
+    )
+    return AlignedMatrix(pd.Index(dates), values, titles)
+
+
+def align_long(df: pd.DataFrame) -> AlignedMatrix:
+    """Align transformed datasets in long ``Title``/``Date``/``Value`` format.
+
+    Titles keep the order they first appear in.
+    """
+    if df.empty:
+        return AlignedMatrix(pd.Index([]), np.empty((0, 0)), [])
+
+    columns, titles = pd.factorize(df["Title"])
+    codes, dates = pd.factorize(df["Date"], sort=True)
+
+    values = np.full((len(dates), len(titles)), np.nan)
+    values[codes, columns] = df["Value"].to_numpy(dtype=float)
+    return AlignedMatrix(pd.Index(dates), values, list(titles))
+
+
+def align_series(df: pd.DataFrame, dates: pd.Index) -> np.ndarray:
+    """Project a transformed dataframe onto the period axis of a matrix.
+
+    Dates are matched on their string labels, so test series that arrive
+    already transformed, such as ``"2020Q1"``, line up with period dates.
+    """
+    if df.empty:
+        return np.full(len(dates), np.nan)
+
+    df = df.drop_duplicates("Date", keep="last")
+    series = pd.Series(df["Value"].to_numpy(dtype=float), index=df["Date"].astype(str))
+    return series.reindex(dates.astype(str)).to_numpy()
+
+
+def year_mask(
+    dates: pd.Index, start_year: int | None = None, end_year: int | None = None
+) -> np.ndarray:
+    """Select the dates of an aligned axis falling within a range of years."""
+    mask = np.ones(len(dates), dtype=bool)
+    if len(dates) == 0:
+        return mask
+
+    years = np.asarray(dates.year)
+    if start_year is not None:
+        mask &= years >= start_year
+    if end_year is not None:
+        mask &= years <= end_year
+    return mask
+
+
+def masked_pearson(y: np.ndarray, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Pearson coefficient of ``y`` against every column of ``x``.
+
+    Dates run along the second to last axis and datasets along the last one.
+    ``y`` is either one series shared by every column or an array broadcastable
+    against ``x``, which lets a stack of lagged series be scored in one call.
+    Only the dates where ``mask`` is set for a column take part in that
+    column's coefficient. Columns with zero variance come back as NaN.
+    """
+    if y.ndim == 1:
+        y = y[:, None]
+
+    count = mask.sum(axis=-2, keepdims=True)
+    y_filled = np.where(mask, y, 0.0)
+    x_filled = np.where(mask, x, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y_mean = y_filled.sum(axis=-2, keepdims=True) / count
+        x_mean = x_filled.sum(axis=-2, keepdims=True) / count
+        y_dev = np.where(mask, y_filled - y_mean, 0.0)
+        x_dev = np.where(mask, x_filled - x_mean, 0.0)
+
+        covariance = (y_dev * x_dev).sum(axis=-2)
+        variance = (y_dev**2).sum(axis=-2) * (x_dev**2).sum(axis=-2)
+        coefficients = covariance / np.sqrt(variance)
+
+    coefficients[variance == 0] = np.nan
+    return np.clip(coefficients, -1, 1)
+
+
+def compact_overlap(
+    test_values: np.ndarray, matrix: np.ndarray, both: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Move the dates each column shares with the test series to the top.
+
+    This turns every column into the equivalent of the merged dataframe in
+    ``correlate_datasets``, so lags shift by position within the shared dates.
+    Returns the compacted test values, dataset values and validity mask.
+    """
+    order = np.argsort(~both, axis=0, kind="stable")
+    y = np.take_along_axis(
+        np.broadcast_to(test_values[:, None], matrix.shape), order, axis=0
+    )
+    x = np.take_along_axis(matrix, order, axis=0)
+    valid = np.arange(len(matrix))[:, None] < both.sum(axis=0)
+    return y, x, valid
+
+
+def lagged_pearson(
+    y: np.ndarray, x: np.ndarray, valid: np.ndarray, lag_periods: int
+) -> np.ndarray:
+    """Pearson coefficient for every lag ``0..lag_periods`` in one batch.
+
+    Takes the output of ``compact_overlap``. The test values and the validity
+    mask are padded and viewed through a sliding window, so lag ``l`` pairs
+    ``y[i + l]`` with ``x[i]`` without copying the test values per lag.
+    """
+    n_dates = len(x)
+    y_padded = np.pad(y, ((0, lag_periods), (0, 0)), constant_values=np.nan)
+    valid_padded = np.pad(valid, ((0, lag_periods), (0, 0)))
+
+    # Windows come out as (lag, dataset, date), move dates before datasets
+    y_lagged = np.moveaxis(sliding_window_view(y_padded, n_dates, axis=0), -1, -2)
+    mask = np.moveaxis(sliding_window_view(valid_padded, n_dates, axis=0), -1, -2)
+    return masked_pearson(y_lagged, x, mask)
+
+
+def batch_pearson(
+    test_values: np.ndarray,
+    matrix: np.ndarray,
+    lag_periods: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Correlate a test series against every column of an aligned matrix.
+
+    Mirrors ``correlate_datasets``: only dates where both series have a value
+    are used, and for a lag ``l`` the test value ``l`` shared dates later is
+    paired with the dataset value.
+
+    Returns the coefficients, shaped ``(lag_periods + 1, n_datasets)``, and the
+    number of dates each dataset shares with the test series.
+    """
+    # Dates without a test value never take part, drop them up front
+    test_dates = ~np.isnan(test_values)
+    test_values, matrix = test_values[test_dates], matrix[test_dates]
+
+    n_dates, n_datasets = matrix.shape
+    both = ~np.isnan(matrix)
+    overlap = both.sum(axis=0)
+
+    if lag_periods == 0:
+        return masked_pearson(test_values, matrix, both)[None, :], overlap
+
+    # Score the columns in blocks to bound the (lag, date, dataset) temporaries
+    coefficients = np.empty((lag_periods + 1, n_datasets))
+    block_size = max(1, BLOCK_ELEMENTS // ((lag_periods + 1) * max(n_dates, 1)))
+    for start in range(0, n_datasets, block_size):
+        block = slice(start, start + block_size)
+        y, x, valid = compact_overlap(test_values, matrix[:, block], both[:, block])
+        coefficients[:, block] = lagged_pearson(y, x, valid, lag_periods)
+
+    return coefficients, overlap
+
+
+def column_ranks(values: np.ndarray) -> np.ndarray:
+    """Average rank of every value within its column, NaN stays NaN."""
+    return pd.DataFrame(values).rank(axis=0).to_numpy()
+
+
+def batch_spearman(
+    test_values: np.ndarray,
+    matrix: np.ndarray,
+    lag_periods: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Rank correlation counterpart of ``batch_pearson``.
+
+    Both series of a pair are ranked within the dates they share at each
+    lag, then scored with the Pearson kernel, which gives the exact Spearman
+    coefficient of every pair. Ranking happens per block of columns, not per
+    dataset.
+    """
+    test_dates = ~np.isnan(test_values)
+    test_values, matrix = test_values[test_dates], matrix[test_dates]
+
+    n_dates, n_datasets = matrix.shape
+    both = ~np.isnan(matrix)
+    overlap = both.sum(axis=0)
+
+    coefficients = np.empty((lag_periods + 1, n_datasets))
+    block_size = max(1, BLOCK_ELEMENTS // max(n_dates, 1))
+    for start in range(0, n_datasets, block_size):
+        block = slice(start, start + block_size)
+        y, x, valid = compact_overlap(test_values, matrix[:, block], both[:, block])
+        for lag in range(lag_periods + 1):
+            # Lag l pairs y[i + l] with x[i] within the shared dates
+            mask = valid[lag:]
+            x_lagged = np.where(mask, x[: len(mask)], np.nan)
+            y_lagged = np.where(mask, y[lag:], np.nan)
+            coefficients[lag, block] = masked_pearson(
+                column_ranks(y_lagged), column_ranks(x_lagged), mask
+            )
+
+    return coefficients, overlap
+
+
+def best_lag(coefficients: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pick the lag with the strongest absolute correlation for each dataset.
+
+    Takes coefficients shaped ``(lags, n_datasets)`` and returns the chosen lag
+    and its coefficient per dataset. Datasets without any coefficient keep NaN.
+    """
+    strength = np.where(np.isnan(coefficients), -1.0, np.abs(coefficients))
+    lags = strength.argmax(axis=0)
+    return lags, np.take_along_axis(coefficients, lags[None, :], axis=0)[0]
+
+
+def top_k(values: np.ndarray, k: int | None = None) -> np.ndarray:
+    """Indices of the ``k`` largest values in descending order.
+
+    Uses a partial selection so only the winners are sorted. Ties are broken
+    by position, which gives the same indices as a full stable sort cut to
+    ``k`` entries. Without ``k`` every index is returned.
+    """
+    if k is None or k >= len(values):
+        return np.argsort(-values, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[: k - len(above)]
+    winners = np.concatenate([above, ties])
+    return winners[np.lexsort((winners, -values[winners]))]
+
+
+def p_values(coefficients: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """Two-sided p-values of the t-test of each coefficient against zero.
+
+    ``count`` is the number of paired dates behind each coefficient. Pairs too
+    short to test get a p-value of 1.
+    """
+    degrees = count - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = coefficients * np.sqrt(degrees / (1 - coefficients**2))
+        values = 2 * stats.t.sf(np.abs(t), degrees)
+
+    values[degrees <= 0] = 1.0
+    return values
+
+
+class CorrelationResult:
+    """Ranked correlation results stored column by column.
+
+    Each row is a (dataset column, lag, coefficient, p-value) tuple pointing
+    into one shared aligned matrix. The dates and values of a row are only
+    turned into Python lists when the row is materialized as a
+    ``CorrelateDataPoint``.
+    """
+
+    def __init__(
+        self,
+        matrix: AlignedMatrix,
+        test_values: np.ndarray,
+        columns: np.ndarray,
+        lags: np.ndarray,
+        coefficients: np.ndarray,
+        p_values: np.ndarray | None = None,
+    ):
+        self.matrix = matrix
+        self.test_values = test_values
+        self.columns = columns
+        self.lags = lags
+        self.coefficients = coefficients
+        self.p_values = p_values
+
+    def __len__(self) -> int:
+        return len(self.coefficients)
+
+    def iter_data_points(
+        self, limit: int | None = None, include_data: bool = True
+    ) -> Iterator[CorrelateDataPoint]:
+        """Materialize the first ``limit`` rows lazily in ranked order."""
+        rows = range(len(self) if limit is None else min(limit, len(self)))
+        if include_data:
+            test_present = ~np.isnan(self.test_values)
+            date_labels = np.asarray(self.matrix.dates.astype(str))
+
+        for row in rows:
+            column = self.columns[row]
+            title = self.matrix.titles[column]
+            dates, input_data, dataset_data = [], [], []
+            if include_data:
+                shared = test_present & ~np.isnan(self.matrix.values[:, column])
+                dates = date_labels[shared].tolist()
+                input_data = self.test_values[shared].tolist()
+                dataset_data = self.matrix.values[shared, column].tolist()
+
+            yield CorrelateDataPoint(
+                title=title,
+                internal_name=title,
+                pearson_value=float(self.coefficients[row]),
+                p_value=0 if self.p_values is None else float(self.p_values[row]),
+                lag=int(self.lags[row]),
+                input_data=input_data,
+                dataset_data=dataset_data,
+                dates=dates,
+            )
+
+    def data_points(
+        self, limit: int | None = None, include_data: bool = True
+    ) -> list[CorrelateDataPoint]:
+        """Materialize the first ``limit`` rows in ranked order."""
+        return list(self.iter_data_points(limit=limit, include_data=include_data))
+
+    def to_correlate_data(
+        self,
+        aggregation_period: AggregationPeriod,
+        correlation_metric: CorrelationMetric,
+        limit: int | None = None,
+        include_data: bool = True,
+        fiscal_year_end: str = "December",
+    ) -> CorrelateData:
+        return CorrelateData(
+            data=self.data_points(limit=limit, include_data=include_data),
+            aggregation_period=aggregation_period,
+            correlation_metric=correlation_metric,
+            fiscalYearEnd=fiscal_year_end,
+        )
+
+
+def flatten_candidates(
+    coefficients: np.ndarray,
+    overlap: np.ndarray,
+    best_lag_only: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten coefficients shaped ``(lags, n_datasets)`` into candidate rows.
+
+    Returns the column, lag, coefficient and p-value of every candidate in
+    (dataset, lag) order. Datasets sharing fewer than ``MIN_OVERLAP`` dates
+    with the test series, or without a defined coefficient, are left out.
+    """
+    lags = np.broadcast_to(np.arange(len(coefficients))[:, None], coefficients.shape)
+    if best_lag_only:
+        best_lags, best_coefficients = best_lag(coefficients)
+        lags, coefficients = best_lags[None, :], best_coefficients[None, :]
+    columns = np.broadcast_to(np.arange(coefficients.shape[1]), coefficients.shape)
+
+    # Flatten in (dataset, lag) order so ties keep the order of correlate_datasets
+    coefficients, lags, columns = (a.T.ravel() for a in (coefficients, lags, columns))
+    valid = (overlap[columns] >= MIN_OVERLAP) & ~np.isnan(coefficients)
+    columns, lags, coefficients = columns[valid], lags[valid], coefficients[valid]
+
+    # A lag of l pairs l fewer dates than the dataset shares with the test
+    pairs = overlap[columns] - lags
+    return columns, lags, coefficients, p_values(coefficients, pairs)
+
+
+def rank_correlations(
+    matrix: AlignedMatrix,
+    test_values: np.ndarray,
+    coefficients: np.ndarray,
+    overlap: np.ndarray,
+    best_lag_only: bool = False,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+) -> CorrelationResult:
+    """Rank coefficients shaped ``(lags, n_datasets)`` by absolute value.
+
+    P-values are computed for every candidate, see ``flatten_candidates``, so
+    an adjustment covers all of them and not only the ones within ``limit``.
+    """
+    columns, lags, coefficients, candidate_p_values = flatten_candidates(
+        coefficients, overlap, best_lag_only
+    )
+    if p_value_adjustment == PValueAdjustment.BENJAMINI_HOCHBERG:
+        candidate_p_values = stats.false_discovery_control(candidate_p_values)
+
+    # Only keep the strongest correlations, sorted in descending order
+    order = top_k(np.abs(coefficients), limit)
+    return CorrelationResult(
+        matrix,
+        test_values,
+        columns[order],
+        lags[order],
+        coefficients[order],
+        candidate_p_values[order],
+    )
+
+
+def correlate_matrix(
+    matrix: AlignedMatrix,
+    test_values: np.ndarray,
+    lag_periods: int = 0,
+    best_lag_only: bool = False,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+) -> CorrelationResult:
+    """Rank every dataset in ``matrix`` by its correlation with the test series.
+
+    Results are sorted by absolute coefficient, see ``rank_correlations``.
+    """
+    if correlation_method == CorrelationMethod.SPEARMAN:
+        score = batch_spearman
+    else:
+        score = batch_pearson
+    coefficients, overlap = score(test_values, matrix.values, lag_periods)
+    return rank_correlations(
+        matrix,
+        test_values,
+        coefficients,
+        overlap,
+        best_lag_only=best_lag_only,
+        limit=limit,
+        p_value_adjustment=p_value_adjustment,
+    )
+
+
+def running_totals(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums down the first axis, with a leading row of zeros."""
+    totals = np.zeros((len(values) + 1, *values.shape[1:]), dtype=values.dtype)
+    np.cumsum(values, axis=0, out=totals[1:])
+    return totals
+
+
+def column_means(values: np.ndarray) -> np.ndarray:
+    """Mean of the present values of every column, zero for empty columns."""
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    total = np.where(present, values, 0.0).sum(axis=0)
+    return np.divide(total, count, out=np.zeros(values.shape[1:]), where=count > 0)
+
+
+class PrefixSums:
+    """Running count, sum and sum of squares down every column of a matrix.
+
+    Row ``i`` holds the totals over the first ``i`` dates, so the totals of any
+    contiguous window of dates are the difference of two rows. Values are
+    shifted by their column mean to keep the one-pass variance accurate.
+    """
+
+    def __init__(self, values: np.ndarray):
+        present = ~np.isnan(values)
+        self.shift = column_means(values)
+
+        shifted = np.where(present, values - self.shift, 0.0)
+        self.count = running_totals(present.astype(np.int64))
+        self.total = running_totals(shifted)
+        self.total_sq = running_totals(shifted**2)
+
+
+class CrossSums:
+    """Running totals pairing one test series with every column of a matrix.
+
+    Only dates where both the test series and a column have a value count
+    towards that column's totals. Totals are kept for the dates of the test
+    series only, ``positions`` maps a date of the matrix to its row.
+    """
+
+    def __init__(self, test_values: np.ndarray, values: np.ndarray, prefix: PrefixSums):
+        test_dates = ~np.isnan(test_values)
+        self.positions = running_totals(test_dates.astype(np.int64))
+
+        y = test_values[test_dates]
+        self.shift = y.mean() if len(y) > 0 else 0.0
+        y = (y - self.shift)[:, None]
+
+        x = values[test_dates] - prefix.shift
+        present = ~np.isnan(x)
+        x[~present] = 0.0
+        self.total_xy = running_totals(x * y)
+        self.total_y = running_totals(present * y)
+        self.total_yy = running_totals(present * y**2)
+
+
+# Variances below this fraction of the sum of squares are rounding noise left
+# over from differencing running totals, the window is constant
+FLAT_TOLERANCE = 1e-12
+
+
+def pearson_from_sums(
+    count: np.ndarray,
+    sum_x: np.ndarray,
+    sum_y: np.ndarray,
+    sum_xx: np.ndarray,
+    sum_yy: np.ndarray,
+    sum_xy: np.ndarray,
+) -> np.ndarray:
+    """Pearson coefficients from the sums over each pair's shared dates.
+
+    Pairs whose variance is only rounding noise come back as NaN.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = sum_xy - sum_x * sum_y / count
+        variance_x = sum_xx - sum_x**2 / count
+        variance_y = sum_yy - sum_y**2 / count
+        coefficients = covariance / np.sqrt(variance_x * variance_y)
+
+    flat = (variance_x <= FLAT_TOLERANCE * sum_xx) | (
+        variance_y <= FLAT_TOLERANCE * sum_yy
+    )
+    coefficients[flat] = np.nan
+    return np.clip(coefficients, -1, 1)
+
+
+class WindowSums:
+    """Score a test series against a matrix over any contiguous date window.
+
+    ``prefix`` and ``cross`` cover every column of ``values``, the aligned
+    matrix they were built from. ``columns`` selects the columns reported,
+    in the order of ``matrix``. Each window then costs a difference of two
+    rows instead of a pass over the dates.
+    """
+
+    def __init__(
+        self,
+        matrix: AlignedMatrix,
+        test_values: np.ndarray,
+        values: np.ndarray,
+        prefix: PrefixSums,
+        cross: CrossSums,
+        columns: np.ndarray | slice = slice(None),
+    ):
+        self.matrix = matrix
+        self.test_values = test_values
+        self.values = values
+        self.prefix = prefix
+        self.cross = cross
+        self.columns = columns
+
+    def pearson(self, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+        """Coefficients and overlap over the dates ``start:stop``.
+
+        Gives the same result as ``batch_pearson`` without lags on a test
+        series restricted to those dates.
+        """
+
+        def window(totals: np.ndarray) -> np.ndarray:
+            return totals[stop, self.columns] - totals[start, self.columns]
+
+        count = window(self.prefix.count)
+        sum_x = window(self.prefix.total)
+        sum_xx = window(self.prefix.total_sq)
+
+        # The dataset totals include dates without a test value, take them out
+        missing = start + np.flatnonzero(np.isnan(self.test_values[start:stop]))
+        if len(missing) > 0:
+            x = self.values[missing][:, self.columns] - self.prefix.shift[self.columns]
+            present = ~np.isnan(x)
+            x = np.where(present, x, 0.0)
+            count = count - present.sum(axis=0)
+            sum_x = sum_x - x.sum(axis=0)
+            sum_xx = sum_xx - (x**2).sum(axis=0)
+
+        def test_window(totals: np.ndarray) -> np.ndarray:
+            first = self.cross.positions[start]
+            last = self.cross.positions[stop]
+            return totals[last, self.columns] - totals[first, self.columns]
+
+        sum_y = test_window(self.cross.total_y)
+        sum_yy = test_window(self.cross.total_yy)
+        sum_xy = test_window(self.cross.total_xy)
+
+        coefficients = pearson_from_sums(count, sum_x, sum_y, sum_xx, sum_yy, sum_xy)
+        return coefficients[None, :], count
+
+
+def window_bounds(mask: np.ndarray) -> tuple[int, int]:
+    """First and past the last selected position of a contiguous mask."""
+    selected = np.flatnonzero(mask)
+    if len(selected) == 0:
+        return 0, 0
+    return int(selected[0]), int(selected[-1]) + 1
+
+
+def correlate_window(
+    sums: WindowSums,
+    start_year: int | None = None,
+    end_year: int | None = None,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+) -> CorrelationResult:
+    """Rank every dataset by its correlation within a range of years.
+
+    Same as ``correlate_matrix`` without lags on a test series cut to the
+    years, but computed from the running totals in ``sums``.
+    """
+    mask = year_mask(sums.matrix.dates, start_year, end_year)
+    coefficients, overlap = sums.pearson(*window_bounds(mask))
+
+    test_values = sums.test_values.copy()
+    test_values[~mask] = np.nan
+    return rank_correlations(
+        sums.matrix,
+        test_values,
+        coefficients,
+        overlap,
+        limit=limit,
+        p_value_adjustment=p_value_adjustment,
+    )
@@ -0,0 +1,246 @@
+"""Sharded correlation across a persistent process pool.
+
+The aligned matrix of a transformation is copied into shared memory once and
+every worker maps it without copying. Requests over a selection of its
+columns reuse it and send the workers the positions of their columns. A
+request splits the columns into one shard per worker, each shard ranks its
+own candidates and only sends back its top ``limit`` rows, which are merged
+on the request thread. The merge keeps the tie-breaking of
+``rank_correlations``, so the result is the same as the single process path.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from django.conf import settings
+from scipy import stats
+
+from core.correlation_engine import (
+    AlignedMatrix,
+    CorrelationResult,
+    batch_pearson,
+    batch_spearman,
+    correlate_matrix,
+    flatten_candidates,
+    top_k,
+)
+from datasets.models import CorrelationMethod, PValueAdjustment
+
+# Shared matrices each worker keeps mapped, older ones are closed
+WORKER_ATTACHMENTS = 4
+
+_attachments: OrderedDict[str, tuple[shared_memory.SharedMemory, np.ndarray]] = (
+    OrderedDict()
+)
+
+
+def _attach(name: str, shape: tuple[int, int]) -> np.ndarray:
+    attachment = _attachments.get(name)
+    if attachment is None:
+        memory = shared_memory.SharedMemory(name=name)
+        values = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+        attachment = _attachments[name] = (memory, values)
+        while len(_attachments) > WORKER_ATTACHMENTS:
+            _, (old_memory, _) = _attachments.popitem(last=False)
+            old_memory.close()
+    _attachments.move_to_end(name)
+    return attachment[1]
+
+
+def _select(values: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    # A run of consecutive columns is a view, anything else a copy
+    if len(columns) > 0 and np.all(np.diff(columns) == 1):
+        return values[:, columns[0] : columns[-1] + 1]
+    return values[:, columns]
+
+
+def correlate_shard(
+    name: str,
+    shape: tuple[int, int],
+    start: int,
+    columns: np.ndarray,
+    test_values: np.ndarray,
+    lag_periods: int,
+    best_lag_only: bool,
+    correlation_method: CorrelationMethod,
+    limit: int | None,
+    all_p_values: bool,
+):
+    """Rank the candidates of ``columns`` of a shared matrix.
+
+    The columns are ``start`` onwards of the request's matrix. Returns the
+    shard's top ``limit`` rows with their position among the shard's
+    candidates, the number of candidates, and every candidate's p-value when
+    ``all_p_values`` is set.
+    """
+    values = _select(_attach(name, shape), columns)
+    if correlation_method == CorrelationMethod.SPEARMAN:
+        score = batch_spearman
+    else:
+        score = batch_pearson
+    coefficients, overlap = score(test_values, values, lag_periods)
+
+    columns, lags, coefficients, p_values = flatten_candidates(
+        coefficients, overlap, best_lag_only
+    )
+    selected = top_k(np.abs(coefficients), limit)
+    return (
+        columns[selected] + start,
+        lags[selected],
+        coefficients[selected],
+        p_values[selected],
+        selected,
+        len(coefficients),
+        p_values if all_p_values else None,
+    )
+
+
+class CorrelationPool:
+    """Process pool correlating shards of shared aligned matrices.
+
+    Matrices are published to shared memory the first time they are scored
+    and released once the matrix itself is garbage collected. A matrix
+    selected from a ``base`` one publishes its base instead, so every
+    selection of a cached transformation shares one copy.
+    """
+
+    def __init__(self, workers: int = 1, threshold: int = 0):
+        self.workers = workers
+        self.threshold = threshold
+        self._executor: ProcessPoolExecutor | None = None
+        self._published: dict[int, shared_memory.SharedMemory] = {}
+        self._lock = threading.Lock()
+
+    def should_shard(self, matrix: AlignedMatrix, lag_periods: int) -> bool:
+        """Whether a request is big enough to be worth spreading out."""
+        size = matrix.values.size * (lag_periods + 1)
+        return self.workers > 1 and len(matrix) > 1 and size >= self.threshold
+
+    def correlate(
+        self,
+        matrix: AlignedMatrix,
+        test_values: np.ndarray,
+        lag_periods: int = 0,
+        best_lag_only: bool = False,
+        limit: int | None = None,
+        p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+        correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+    ) -> CorrelationResult:
+        """Same as ``correlate_matrix``, with the columns split across workers."""
+        if matrix.base is not None and matrix.columns is not None:
+            shared, columns = matrix.base.values, matrix.columns
+        else:
+            shared, columns = matrix.values, np.arange(len(matrix))
+        memory = self._publish(shared)
+        adjust = p_value_adjustment == PValueAdjustment.BENJAMINI_HOCHBERG
+        bounds = np.linspace(0, len(matrix), min(self.workers, len(matrix)) + 1)
+        bounds = bounds.astype(int)
+
+        futures = [
+            self._get_executor().submit(
+                correlate_shard,
+                memory.name,
+                shared.shape,
+                start,
+                columns[start:stop],
+                test_values,
+                lag_periods,
+                best_lag_only,
+                correlation_method,
+                limit,
+                adjust,
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        shards = [future.result() for future in futures]
+
+        # Position of every shard's rows among all candidates, in column order
+        offsets = np.cumsum([0] + [shard[5] for shard in shards[:-1]])
+        positions = np.concatenate(
+            [shard[4] + offset for shard, offset in zip(shards, offsets)]
+        )
+        columns, lags, coefficients, p_values = (
+            np.concatenate([shard[i] for shard in shards]) for i in range(4)
+        )
+        if adjust:
+            adjusted = stats.false_discovery_control(
+                np.concatenate([shard[6] for shard in shards])
+            )
+            p_values = adjusted[positions]
+
+        # Strongest first, ties in candidate order like ``top_k``
+        order = np.lexsort((positions, -np.abs(coefficients)))[:limit]
+        return CorrelationResult(
+            matrix,
+            test_values,
+            columns[order],
+            lags[order],
+            coefficients[order],
+            p_values[order],
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _publish(self, values: np.ndarray) -> shared_memory.SharedMemory:
+        with self._lock:
+            memory = self._published.get(id(values))
+            if memory is not None:
+                return memory
+
+            memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=np.float64, buffer=memory.buf)[:] = values
+            self._published[id(values)] = memory
+            weakref.finalize(values, self._release, id(values))
+            return memory
+
+    def _release(self, key: int) -> None:
+        with self._lock:
+            memory = self._published.pop(key, None)
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+
+CORRELATION_POOL = CorrelationPool(
+    workers=getattr(settings, "CORRELATION_WORKERS", 1),
+    threshold=getattr(settings, "CORRELATION_PARALLEL_THRESHOLD", 0),
+)
+
+
+def correlate(
+    matrix: AlignedMatrix,
+    test_values: np.ndarray,
+    lag_periods: int = 0,
+    best_lag_only: bool = False,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+) -> CorrelationResult:
+    """Run ``correlate_matrix``, sharded when the request is large enough."""
+    if CORRELATION_POOL.should_shard(matrix, lag_periods):
+        run = CORRELATION_POOL.correlate
+    else:
+        run = correlate_matrix
+    return run(
+        matrix,
+        test_values,
+        lag_periods=lag_periods,
+        best_lag_only=best_lag_only,
+        limit=limit,
+        p_value_adjustment=p_value_adjustment,
+        correlation_method=correlation_method,
+    )
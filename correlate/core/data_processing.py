@@ -10,6 +10,23 @@ from pandas.core.dtypes.dtypes import DatetimeTZDtype
 from datasets.lib.date import VALID_DATE_PATTERNS
 
 
+# Pandas quarterly period code of every fiscal year end month
+FISCAL_MONTH_CODES = {
+    "December": "Q-DEC",
+    "January": "Q-JAN",
+    "February": "Q-FEB",
+    "March": "Q-MAR",
+    "April": "Q-APR",
+    "May": "Q-MAY",
+    "June": "Q-JUN",
+    "July": "Q-JUL",
+    "August": "Q-AUG",
+    "September": "Q-SEP",
+    "October": "Q-OCT",
+    "November": "Q-NOV",
+}
+
+
 def transform_data_base(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
@@ -50,23 +67,8 @@ def transform_metric(
 
 
 def transform_quarterly(df, fiscal_end_month):
-    fiscal_month_code = {
-        "December": "Q-DEC",
-        "January": "Q-JAN",
-        "February": "Q-FEB",
-        "March": "Q-MAR",
-        "April": "Q-APR",
-        "May": "Q-MAY",
-        "June": "Q-JUN",
-        "July": "Q-JUL",
-        "August": "Q-AUG",
-        "September": "Q-SEP",
-        "October": "Q-OCT",
-        "November": "Q-NOV",
-    }
-
     df["Date"] = pd.to_datetime(df["Date"]).dt.to_period(
-        fiscal_month_code[fiscal_end_month]
+        FISCAL_MONTH_CODES[fiscal_end_month]
     )
     return df
 
@@ -102,27 +104,11 @@ def transform_data(
         if len(df) < 3:
             return pd.DataFrame()
 
-        # Map the fiscal_end_month to its appropriate code
-        fiscal_month_code = {
-            "December": "Q-DEC",
-            "January": "Q-JAN",
-            "February": "Q-FEB",
-            "March": "Q-MAR",
-            "April": "Q-APR",
-            "May": "Q-MAY",
-            "June": "Q-JUN",
-            "July": "Q-JUL",
-            "August": "Q-AUG",
-            "September": "Q-SEP",
-            "October": "Q-OCT",
-            "November": "Q-NOV",
-        }
-
         granularity = "monthly"
         if abs(df["Date"].iloc[0].month - df["Date"].iloc[1].month) != 1:
             granularity = AggregationPeriod.QUARTERLY
 
-        df["Date"] = df["Date"].dt.to_period(fiscal_month_code[fiscal_end_month])
+        df["Date"] = df["Date"].dt.to_period(FISCAL_MONTH_CODES[fiscal_end_month])
 
         if granularity == "monthly":
             # Make sure the start and end quarters are complete
@@ -162,6 +148,123 @@ def transform_data(
     return df
 
 
+def _first_in_group(
+    positions: np.ndarray, group_starts: np.ndarray, group_stops: np.ndarray
+) -> np.ndarray:
+    """First of the sorted ``positions`` inside every group, -1 when none."""
+    if len(positions) == 0:
+        return np.full(len(group_starts), -1)
+    index = np.searchsorted(positions, group_starts)
+    found = positions[np.minimum(index, len(positions) - 1)]
+    inside = (index < len(positions)) & (found < group_stops)
+    return np.where(inside, found, -1)
+
+
+def _last_in_group(
+    positions: np.ndarray, group_starts: np.ndarray, group_stops: np.ndarray
+) -> np.ndarray:
+    """Last of the sorted ``positions`` inside every group, -1 when none."""
+    if len(positions) == 0:
+        return np.full(len(group_starts), -1)
+    index = np.searchsorted(positions, group_stops) - 1
+    found = positions[np.maximum(index, 0)]
+    inside = (index >= 0) & (found >= group_starts)
+    return np.where(inside, found, -1)
+
+
+def transform_data_batch(
+    df: pd.DataFrame,
+    time_increment: AggregationPeriod,
+    fiscal_end_month=None,
+    correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
+) -> pd.DataFrame:
+    """Apply ``transform_data`` to many datasets in one grouped pass.
+
+    ``df`` is in long format with ``Title``, ``Date`` and ``Value`` columns,
+    the rows of each dataset contiguous and in the order ``transform_data``
+    would see them. Returns the transformed rows in the same format, each
+    dataset's rows sorted by date. Datasets ``transform_data`` returns no
+    rows for are left out, as are monthly datasets without a complete
+    quarter, which make ``transform_data`` raise.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=["Title", "Date", "Value"])
+
+    titles = df["Title"].to_numpy()
+    dates = df["Date"]
+    if not isinstance(dates.dtype, DatetimeTZDtype):
+        dates = pd.to_datetime(dates)
+    values = df["Value"].to_numpy(dtype=float)
+
+    # Every dataset is a contiguous run of rows
+    group_starts = np.flatnonzero(np.r_[True, titles[1:] != titles[:-1]])
+    group_stops = np.r_[group_starts[1:], len(df)]
+    sizes = group_stops - group_starts
+    groups = np.repeat(np.arange(len(group_starts)), sizes)
+
+    if time_increment == AggregationPeriod.QUARTERLY:
+        if fiscal_end_month is None:
+            raise ValueError(
+                "fiscal_end_month is required for Quarterly time increment"
+            )
+
+        keep = sizes[groups] >= 3
+
+        # Monthly datasets step by one month between their first two rows
+        months = dates.dt.month.to_numpy()
+        second = np.minimum(group_starts + 1, len(df) - 1)
+        monthly = np.abs(months[group_starts] - months[second]) == 1
+
+        periods = dates.dt.to_period(FISCAL_MONTH_CODES[fiscal_end_month])
+        period_months = periods.dt.month.to_numpy()
+
+        # Rows starting three rows of the same quarter end month in a dataset
+        same_next = np.zeros(len(df), dtype=bool)
+        same_next[:-1] = (groups[1:] == groups[:-1]) & (
+            period_months[1:] == period_months[:-1]
+        )
+        complete = np.flatnonzero(same_next & np.r_[same_next[1:], False])
+
+        # Trim monthly datasets to their first and last complete quarter
+        first = _first_in_group(complete, group_starts, group_stops)
+        last = _last_in_group(complete, group_starts, group_stops) + 2
+        positions = np.arange(len(df))
+        trimmed = (first[groups] >= 0) & (positions >= first[groups])
+        trimmed &= positions <= last[groups]
+        keep &= ~monthly[groups] | trimmed
+
+        grouped = pd.DataFrame(
+            {"Group": groups[keep], "Date": periods[keep], "Value": values[keep]}
+        )
+        grouped = grouped.groupby(["Group", "Date"]).sum().reset_index()
+        if correlation_metric == CorrelationMetric.YOY_GROWTH:
+            grouped["Value"] = grouped.groupby("Group")["Value"].pct_change(
+                periods=4, fill_method=None
+            )
+
+    # Annually
+    elif time_increment == AggregationPeriod.ANNUALLY:
+        grouped = pd.DataFrame(
+            {"Group": groups, "Date": dates.dt.year.to_numpy(), "Value": values}
+        )
+        grouped = grouped.groupby(["Group", "Date"]).sum().reset_index()
+        grouped["Date"] = pd.to_datetime(
+            grouped["Date"].astype(str) + "-1-1", errors="coerce"
+        )
+        if correlation_metric == CorrelationMetric.YOY_GROWTH:
+            grouped["Value"] = grouped.groupby("Group")["Value"].pct_change(
+                periods=1, fill_method=None
+            )
+
+    else:
+        raise ValueError("Invalid time_increment")
+
+    grouped.replace([np.inf, -np.inf], np.nan, inplace=True)
+    grouped.dropna(inplace=True)
+    grouped["Title"] = titles[group_starts][grouped["Group"].to_numpy()]
+    return grouped[["Title", "Date", "Value"]].reset_index(drop=True)
+
+
 def compute_correlations(test_df, dfs):
     correlation_results = {}
     for title, df in dfs.items():
@@ -0,0 +1,173 @@
+"""Columnar snapshot of raw datasets, shared between processes with mmap.
+
+A snapshot is a single file:
+
+* ``MAGIC`` followed by the length of a JSON header, as a little endian uint64
+* the header, holding the data version, the titles and the array positions
+* ``offsets``, int64 of length ``n_titles + 1``, where series ``i`` is
+  ``offsets[i]:offsets[i + 1]`` of the next two arrays
+* ``dates``, int64 nanoseconds since the epoch in UTC
+* ``values``, float64
+
+Arrays start on ``ALIGNMENT`` byte boundaries after the header, the header
+stores their positions from there, so they can be mapped directly.
+Every process opening the same file shares its pages through the page cache,
+and a snapshot is replaced by renaming a new file over it, so open mappings
+keep reading the old one.
+"""
+
+import json
+import os
+import struct
+import tempfile
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+from pandas.core.dtypes.dtypes import DatetimeTZDtype
+
+MAGIC = b"CORRSNAP"
+ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+_UTC = DatetimeTZDtype(tz="UTC")
+
+
+def _aligned(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def _data_start(header_length: int) -> int:
+    return _aligned(len(MAGIC) + _LENGTH.size + header_length)
+
+
+def _utc_dates(dates: np.ndarray) -> pd.arrays.DatetimeArray:
+    nanoseconds = dates.view("M8[ns]")
+    try:
+        # Private, but tz_localize and the public constructors all copy
+        return pd.arrays.DatetimeArray._simple_new(nanoseconds, dtype=_UTC)
+    except (AttributeError, TypeError):
+        return pd.DatetimeIndex(nanoseconds).tz_localize("UTC").array
+
+
+def series_frame(dates: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """Raw dataframe of int64 UTC nanosecond ``dates`` and float64 ``values``.
+
+    Neither array is copied with the pinned pandas, newer versions may copy
+    the dates.
+    """
+    return pd.DataFrame(
+        {"Date": _utc_dates(dates), "Value": np.asarray(values)},
+        copy=False,
+    )
+
+
+def write_snapshot(path: str, dfs: Mapping[str, pd.DataFrame], version: int) -> None:
+    """Write raw ``Date``/``Value`` dataframes to a snapshot at ``path``."""
+    titles = [title for title, df in dfs.items() if not df.empty]
+    frames = [dfs[title] for title in titles]
+    offsets = np.zeros(len(titles) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(df) for df in frames])
+
+    dates = np.empty(offsets[-1], dtype=np.int64)
+    values = np.empty(offsets[-1], dtype=np.float64)
+    for df, start, stop in zip(frames, offsets[:-1], offsets[1:]):
+        series_dates = pd.DatetimeIndex(pd.to_datetime(df["Date"], utc=True))
+        dates[start:stop] = series_dates.as_unit("ns").asi8
+        values[start:stop] = df["Value"].to_numpy(dtype=np.float64)
+
+    arrays = {"offsets": offsets, "dates": dates, "values": values}
+    header: dict = {"version": version, "titles": titles, "arrays": {}}
+    position = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": position, "length": len(array)}
+        position = _aligned(position + array.nbytes)
+    encoded = json.dumps(header).encode()
+    start = _data_start(len(encoded))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            file.write(MAGIC + _LENGTH.pack(len(encoded)) + encoded)
+            for name, array in arrays.items():
+                file.seek(start + header["arrays"][name]["offset"])
+                file.write(array.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+
+
+class DatasetSnapshot:
+    """Read-only view of a snapshot file, see ``write_snapshot``."""
+
+    def __init__(self, path: str):
+        """Map the snapshot at ``path``, raising ``ValueError`` if it is corrupt."""
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a dataset snapshot")
+            try:
+                (length,) = _LENGTH.unpack(file.read(_LENGTH.size))
+                header = json.loads(file.read(length))
+            except (struct.error, UnicodeDecodeError) as error:
+                raise ValueError(f"{path} has a truncated header") from error
+            self._size = os.fstat(file.fileno()).st_size
+
+        self.path = path
+        self._start = _data_start(length)
+        try:
+            self.version: int = header["version"]
+            self.titles: list[str] = header["titles"]
+            self.offsets, self.dates, self.values = (
+                self._map(header["arrays"][name], dtype)
+                for name, dtype in (
+                    ("offsets", np.int64),
+                    ("dates", np.int64),
+                    ("values", np.float64),
+                )
+            )
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"{path} has an invalid header") from error
+        if (
+            len(self.offsets) != len(self.titles) + 1
+            or self.offsets[0] != 0
+            or np.any(np.diff(self.offsets) < 0)
+            or self.offsets[-1] != len(self.dates)
+            or len(self.dates) != len(self.values)
+        ):
+            raise ValueError(f"{path} has inconsistent offsets")
+
+    def _map(self, position: dict, dtype: type) -> np.ndarray:
+        if position["length"] == 0:
+            return np.empty(0, dtype=dtype)
+        end = self._start + position["offset"]
+        end += position["length"] * np.dtype(dtype).itemsize
+        if end > self._size:
+            raise ValueError(f"{self.path} is truncated")
+        return np.memmap(
+            self.path,
+            dtype=dtype,
+            mode="r",
+            offset=self._start + position["offset"],
+            shape=(position["length"],),
+        )
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def frame(self, column: int) -> pd.DataFrame:
+        """Raw dataframe of one series, its values are not copied."""
+        start, stop = self.offsets[column], self.offsets[column + 1]
+        return series_frame(self.dates[start:stop], self.values[start:stop])
+
+    def dfs(self, selected_names: list[str] | None = None) -> dict[str, pd.DataFrame]:
+        """Raw dataframes of every series, or only of ``selected_names``."""
+        columns = {title: column for column, title in enumerate(self.titles)}
+        if selected_names is None:
+            selected_names = self.titles
+        return {
+            title: self.frame(columns[title])
+            for title in selected_names
+            if title in columns
+        }
@@ -0,0 +1,118 @@
+"""In-memory cache of the computed series of saved indexes.
+
+Saved indexes rarely change, so their series are kept per index and
+transformation. Entries are dropped when an index is saved again or when one
+of its component datasets receives new data. Saving and ingestion happen in
+other processes, so entries also remember the ``updated_at`` of their index
+and the data version, and are ignored by any process reading newer ones.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime
+
+import pandas as pd
+from django.conf import settings
+
+from core.transform_cache import TransformKey, transform_key
+from datasets.models import AggregationPeriod, CorrelationMetric
+
+# Index id and the transformation its components went through
+IndexKey = tuple[int, TransformKey]
+
+
+def index_key(
+    index_id: int,
+    time_increment: AggregationPeriod,
+    fiscal_end_month: str | None,
+    correlation_metric: CorrelationMetric,
+) -> IndexKey:
+    return (
+        index_id,
+        transform_key(time_increment, fiscal_end_month, correlation_metric),
+    )
+
+
+class IndexSeriesCache:
+    """Index series with ``Date``/``Value`` columns keyed by ``IndexKey``.
+
+    The least recently used series are dropped once more than ``max_entries``
+    are held. Series computed while an invalidation happened are not stored,
+    see ``version``. Series stored for another ``updated_at`` of their index
+    or another data version are dropped when requested.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries: OrderedDict[
+            IndexKey, tuple[pd.DataFrame, datetime | None, int | None]
+        ] = OrderedDict()
+        # Index ids using every component dataset, by internal name
+        self._indexes: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: IndexKey,
+        updated_at: datetime | None = None,
+        data_version: int | None = None,
+    ) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1:] != (updated_at, data_version):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(
+        self,
+        key: IndexKey,
+        series: pd.DataFrame,
+        components: Iterable[str],
+        version: int,
+        updated_at: datetime | None = None,
+        data_version: int | None = None,
+    ) -> None:
+        """Store ``series`` unless anything was invalidated since ``version``."""
+        with self._lock:
+            if version != self.version:
+                return
+
+            self._entries[key] = (series, updated_at, data_version)
+            self._entries.move_to_end(key)
+            for title in components:
+                self._indexes.setdefault(title, set()).add(key[0])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_index(self, index_id: int) -> None:
+        """Recompute ``index_id`` the next time it is requested."""
+        self.invalidate_indexes({index_id})
+
+    def invalidate_dataset(self, title: str) -> None:
+        """Recompute every index using ``title`` the next time it is requested."""
+        with self._lock:
+            index_ids = self._indexes.pop(title, set())
+        self.invalidate_indexes(index_ids)
+
+    def invalidate_indexes(self, index_ids: set[int]) -> None:
+        with self._lock:
+            self.version += 1
+            for key in [key for key in self._entries if key[0] in index_ids]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._indexes.clear()
+
+
+INDEX_CACHE = IndexSeriesCache(
+    max_entries=getattr(settings, "INDEX_CACHE_MAX_ENTRIES", 256)
+)
@@ -0,0 +1,75 @@
+"""Evaluate weighted indexes of datasets as one sparse matrix product.
+
+An index is a weighted sum of transformed datasets. With ``RAW_VALUE`` every
+component is first scaled by its largest absolute value so the weights are
+comparable. A date belongs to an index when any of its components has a value
+for it, and missing components count as zero, like summing the components'
+dataframes grouped by date.
+"""
+
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from core.correlation_engine import AlignedMatrix
+from datasets.models import CorrelationMetric
+
+
+def index_weights(
+    titles: list[str], components: Sequence[Mapping[str, float]]
+) -> sparse.csr_array:
+    """Sparse ``(n_indexes, n_datasets)`` weights over the columns ``titles``.
+
+    Components that are not in ``titles`` are left out.
+    """
+    positions = {title: column for column, title in enumerate(titles)}
+    rows, columns, weights = [], [], []
+    for row, component_weights in enumerate(components):
+        for title, weight in component_weights.items():
+            column = positions.get(title)
+            if column is None:
+                continue
+            rows.append(row)
+            columns.append(column)
+            weights.append(weight)
+
+    return sparse.csr_array(
+        (weights, (rows, columns)), shape=(len(components), len(titles))
+    )
+
+
+def index_values(
+    matrix: AlignedMatrix,
+    weights: sparse.csr_array,
+    correlation_metric: CorrelationMetric,
+) -> np.ndarray:
+    """Values of every index, shaped ``(n_dates, n_indexes)``."""
+    values = matrix.values
+    present = ~np.isnan(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if correlation_metric == CorrelationMetric.RAW_VALUE and values.size:
+            values = values / np.nanmax(np.abs(values), axis=0, initial=0)
+        # Missing values and components without scale add nothing to the sum
+        values = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # Components are stored even with a weight of zero, their dates still count
+    components = weights.copy()
+    components.data = np.ones_like(components.data)
+
+    result = np.asarray(weights @ values.T).T
+    result[np.asarray(components @ present.T.astype(float)).T == 0] = np.nan
+    return result
+
+
+def build_indexes(
+    matrix: AlignedMatrix,
+    indexes: Sequence[tuple[str, Mapping[str, float]]],
+    correlation_metric: CorrelationMetric,
+) -> AlignedMatrix:
+    """Aligned matrix with one column per ``(title, component weights)`` index."""
+    titles = [title for title, _ in indexes]
+    weights = index_weights(matrix.titles, [weights for _, weights in indexes])
+    return AlignedMatrix(
+        matrix.dates, index_values(matrix, weights, correlation_metric), titles
+    )
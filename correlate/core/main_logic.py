@@ -4,9 +4,23 @@ from core.data_processing import transform_data, transform_data_base
 from datasets.orm.dataset_orm import get_all_dfs
 import pandas as pd
 from core.data import TEST_DATA
+from core.correlation_engine import (
+    AlignedMatrix,
+    CorrelationResult,
+    align_series,
+)
+from core.correlation_pool import correlate
+from core.index_engine import build_indexes
+from core.transform_cache import TRANSFORMED_CACHE, column_frame
 import math
 
-from datasets.models import CorrelateDataPoint, AggregationPeriod, CorrelationMetric
+from datasets.models import (
+    CorrelateDataPoint,
+    AggregationPeriod,
+    CorrelationMethod,
+    CorrelationMetric,
+    PValueAdjustment,
+)
 import numpy as np
 from frozendict import frozendict
 
@@ -61,7 +75,19 @@ def correlate_datasets(
     return results
 
 
-def calculate_correlation(
+def transform_and_align(
+    dfs: frozendict[str, pd.DataFrame] | dict[str, pd.DataFrame],
+    time_increment: AggregationPeriod,
+    fiscal_end_month: str,
+    correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
+) -> AlignedMatrix:
+    # Transformed datasets are cached per transformation
+    return TRANSFORMED_CACHE.get_matrix(
+        dfs, time_increment, fiscal_end_month, correlation_metric
+    )
+
+
+def calculate_correlation_result(
     time_increment: AggregationPeriod,
     fiscal_end_month: str,
     dfs: frozendict[str, pd.DataFrame] | dict[str, pd.DataFrame],
@@ -69,7 +95,11 @@ def calculate_correlation(
     lag_periods: int = 0,
     test_correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
     correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
-) -> list[CorrelateDataPoint]:
+    best_lag_only: bool = False,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+) -> CorrelationResult:
     if test_data is None:
         test_data = TEST_DATA
 
@@ -88,29 +118,46 @@ def calculate_correlation(
     # timestamp: pd.Period = start_time.to_timestamp()
     # start_datetime = datetime(timestamp.year, timestamp.month, timestamp.day)
 
-    transformed_dfs: dict[str, pd.DataFrame] = {}
-    # Apply the transformation on every dataframe in dfs.
-    for title, df in dfs.items():
-        transformed_dfs[title] = transform_data(
-            df,
-            time_increment,
-            fiscal_end_month,
-            correlation_metric,
-        )
-
-    correlation_results: list[CorrelateDataPoint] = []
-
-    for title, df in transformed_dfs.items():
-        results = correlate_datasets(test_df, df, title, lag_periods)
-        if results is not None:
-            correlation_results.extend(results)
-
-    # Sort by correlation in descending order
-    sorted_correlations = sorted(
-        correlation_results, key=lambda x: abs(x.pearson_value), reverse=True
+    matrix = transform_and_align(
+        dfs, time_increment, fiscal_end_month, correlation_metric
+    )
+    return correlate(
+        matrix,
+        align_series(test_df, matrix.dates),
+        lag_periods=lag_periods,
+        best_lag_only=best_lag_only,
+        limit=limit,
+        p_value_adjustment=p_value_adjustment,
+        correlation_method=correlation_method,
     )
 
-    return sorted_correlations
+
+def calculate_correlation(
+    time_increment: AggregationPeriod,
+    fiscal_end_month: str,
+    dfs: frozendict[str, pd.DataFrame] | dict[str, pd.DataFrame],
+    test_data: dict | pd.DataFrame | None = None,
+    lag_periods: int = 0,
+    test_correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
+    correlation_metric: CorrelationMetric = CorrelationMetric.RAW_VALUE,
+    best_lag_only: bool = False,
+    limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+) -> list[CorrelateDataPoint]:
+    return calculate_correlation_result(
+        time_increment,
+        fiscal_end_month,
+        dfs,
+        test_data=test_data,
+        lag_periods=lag_periods,
+        test_correlation_metric=test_correlation_metric,
+        correlation_metric=correlation_metric,
+        best_lag_only=best_lag_only,
+        limit=limit,
+        p_value_adjustment=p_value_adjustment,
+        correlation_method=correlation_method,
+    ).data_points()
 
 
 def create_index(
@@ -126,19 +173,11 @@ def create_index(
     if len(dfs) == 0:
         return None
 
-    df_items = list(dfs.items())
-    dfs_to_concat = []
-    for title, df in df_items:
-        transformed_df = transform_data(
-            df, aggregation_period, fiscal_end_month, correlation_metric
-        )
-
-        if correlation_metric == CorrelationMetric.RAW_VALUE:
-            transformed_df["Value"] = (
-                transformed_df["Value"] / transformed_df["Value"].abs().max()
-            )
-
-        transformed_df["Value"] = transformed_df["Value"] * dataset_weights[title]
-        dfs_to_concat.append(transformed_df)
+    matrix = transform_and_align(
+        dfs, aggregation_period, fiscal_end_month, correlation_metric
+    )
+    if len(matrix) == 0:
+        return None
 
-    return pd.concat(dfs_to_concat, join="inner").groupby("Date").sum()
+    index = build_indexes(matrix, [("index", dataset_weights)], correlation_metric)
+    return column_frame(index, 0).set_index("Date")
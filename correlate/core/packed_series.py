@@ -0,0 +1,83 @@
+"""Packing of a whole series into a few scalars and byte strings.
+
+Regular series, such as monthly or quarterly data, are stored as their first
+date, a pandas frequency and the float64 values. Series whose dates can not
+be rebuilt from a frequency also keep their int64 nanosecond UTC dates.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# Dates of calendar frequencies are sliced out of a grid spanning these
+_GRID_START = pd.Timestamp("1800-01-01", tz="UTC")
+_GRID_END = pd.Timestamp("2200-01-01", tz="UTC")
+
+
+class PackedSeries(NamedTuple):
+    start: pd.Timestamp
+    frequency: str | None
+    # int64 nanoseconds since the epoch, only without a frequency
+    dates: bytes | None
+    values: bytes
+
+
+def _date_index(dates: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(dates.view("M8[ns]")).tz_localize("UTC")
+
+
+@lru_cache(maxsize=64)
+def _date_grid(frequency: str) -> np.ndarray:
+    grid = pd.date_range(_GRID_START, _GRID_END, freq=frequency).as_unit("ns").asi8
+    # Slices are shared by every series of the frequency
+    grid.flags.writeable = False
+    return grid
+
+
+def _frequency_dates(start: pd.Timestamp, frequency: str, length: int) -> np.ndarray:
+    offset = to_offset(frequency)
+    if isinstance(offset, pd.offsets.Tick):
+        return start.value + offset.nanos * np.arange(length, dtype=np.int64)
+
+    # Building calendar dates one by one is slow, slice them instead
+    grid = _date_grid(frequency)
+    position = np.searchsorted(grid, start.value)
+    if position + length <= len(grid) and grid[position] == start.value:
+        return grid[position : position + length]
+    return pd.date_range(start, periods=length, freq=frequency).as_unit("ns").asi8
+
+
+def pack_series(dates: np.ndarray, values: np.ndarray) -> PackedSeries:
+    """Pack sorted int64 nanosecond UTC ``dates`` and their ``values``."""
+    dates = np.ascontiguousarray(dates, dtype=np.int64)
+    index = _date_index(dates)
+    frequency = pd.infer_freq(index) if len(index) >= 3 else None
+    if frequency is not None and not index.equals(
+        pd.date_range(index[0], periods=len(index), freq=frequency)
+    ):
+        frequency = None
+
+    return PackedSeries(
+        start=index[0],
+        frequency=frequency,
+        dates=None if frequency is not None else dates.tobytes(),
+        values=np.ascontiguousarray(values, dtype=np.float64).tobytes(),
+    )
+
+
+def unpack_series(
+    start: pd.Timestamp | None,
+    frequency: str | None,
+    dates: bytes | memoryview | None,
+    values: bytes | memoryview,
+) -> tuple[np.ndarray, np.ndarray]:
+    """int64 nanosecond UTC dates and float64 values of a packed series."""
+    values_array = np.frombuffer(values, dtype=np.float64).copy()
+    if frequency is None:
+        return np.frombuffer(dates, dtype=np.int64), values_array  # type:ignore
+
+    start = pd.Timestamp(start).tz_convert("UTC").as_unit("ns")
+    return _frequency_dates(start, frequency, len(values_array)), values_array
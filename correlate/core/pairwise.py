@@ -0,0 +1,192 @@
+"""All-pairs correlation of an aligned matrix.
+
+The datasets are cut into column blocks and every pair of blocks is scored
+with a handful of matrix products, which yields the sums over the dates each
+pair of datasets shares in one go. Blocks run on a process pool and write
+straight into a memory-mapped ``.npy`` file, so the full matrix never has to
+fit in memory.
+"""
+
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from core.correlation_engine import (
+    MIN_OVERLAP,
+    AlignedMatrix,
+    column_means,
+    pearson_from_sums,
+)
+
+# Columns per block, keeps the operands of a block product in cache
+BLOCK_SIZE = 512
+
+# Coefficient above which two datasets are reported as near duplicates
+THRESHOLD = 0.99
+
+
+def pairwise_block(
+    values: np.ndarray,
+    rows: slice,
+    columns: slice,
+    shift: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Correlate every column in ``rows`` against every column in ``columns``.
+
+    Each pair only uses the dates both datasets have a value for, same as
+    ``batch_pearson``. ``shift`` is subtracted from every column to keep the
+    one-pass sums accurate, the column means are used when it is not given.
+    Returns the coefficients and the number of shared dates of every pair.
+    """
+    if shift is None:
+        shift = column_means(values)
+
+    x, y = values[:, rows], values[:, columns]
+    x_present, y_present = ~np.isnan(x), ~np.isnan(y)
+    x = np.where(x_present, x - shift[rows], 0.0)
+    y = np.where(y_present, y - shift[columns], 0.0)
+    x_present, y_present = x_present.astype(float), y_present.astype(float)
+
+    count = x_present.T @ y_present
+    coefficients = pearson_from_sums(
+        count,
+        x.T @ y_present,
+        x_present.T @ y,
+        (x**2).T @ y_present,
+        x_present.T @ y**2,
+        x.T @ y,
+    )
+    return coefficients, count.astype(np.int64)
+
+
+class PairwiseSummary:
+    """Averages and near duplicates collected while filling the matrix.
+
+    ``averages`` maps every dataset to the mean of its coefficients and
+    ``top_correlations`` maps it to the other datasets correlating above the
+    threshold, strongest first.
+    """
+
+    def __init__(self, averages: dict[str, float], top_correlations: dict[str, list]):
+        self.averages = averages
+        self.top_correlations = top_correlations
+
+
+# Worker state, set once per process by ``_init_worker``
+_values: np.ndarray | None = None
+_shift: np.ndarray | None = None
+_output: np.ndarray | None = None
+_threshold: float = THRESHOLD
+
+
+def _init_worker(values: np.ndarray, path: str, threshold: float) -> None:
+    global _values, _shift, _output, _threshold
+    _values = values
+    _shift = column_means(values)
+    _output = open_memmap(path, mode="r+")
+    _threshold = threshold
+
+
+def _score_blocks(task: tuple[int, int, int, int]):
+    row_start, row_stop, column_start, column_stop = task
+    rows, columns = slice(row_start, row_stop), slice(column_start, column_stop)
+
+    coefficients, count = pairwise_block(_values, rows, columns, _shift)
+    coefficients[count < MIN_OVERLAP] = np.nan
+    _output[rows, columns] = coefficients
+    if row_start != column_start:
+        _output[columns, rows] = coefficients.T
+    _output.flush()
+
+    valid = ~np.isnan(coefficients)
+    filled = np.where(valid, coefficients, 0.0)
+    row_sums = (filled.sum(axis=1), valid.sum(axis=1))
+    column_sums = (filled.sum(axis=0), valid.sum(axis=0))
+
+    above = filled > _threshold
+    if row_start == column_start:
+        # Diagonal blocks hold every pair twice and each dataset with itself
+        above = np.triu(above, k=1)
+    i, j = np.nonzero(above)
+    pairs = (i + row_start, j + column_start, coefficients[i, j])
+    return task, row_sums, column_sums, pairs
+
+
+def block_tasks(n_datasets: int, block_size: int) -> Iterator[tuple[int, ...]]:
+    """Bounds of every block on or above the diagonal of the matrix."""
+    starts = range(0, n_datasets, block_size)
+    for row_start in starts:
+        for column_start in starts:
+            if column_start >= row_start:
+                yield (
+                    row_start,
+                    min(row_start + block_size, n_datasets),
+                    column_start,
+                    min(column_start + block_size, n_datasets),
+                )
+
+
+def pairwise_correlation(
+    matrix: AlignedMatrix,
+    path: str,
+    block_size: int = BLOCK_SIZE,
+    workers: int | None = None,
+    threshold: float = THRESHOLD,
+) -> PairwiseSummary:
+    """Write the correlation of every pair of datasets to a ``.npy`` file.
+
+    The file holds a float32 matrix in the order of ``matrix.titles``, with
+    NaN for pairs sharing fewer than ``MIN_OVERLAP`` dates or without a
+    defined coefficient.
+    """
+    n_datasets = len(matrix)
+    open_memmap(path, mode="w+", dtype=np.float32, shape=(n_datasets, n_datasets))
+
+    totals = np.zeros(n_datasets)
+    counts = np.zeros(n_datasets, dtype=np.int64)
+    pairs: dict[int, list[tuple[float, int]]] = {}
+
+    tasks = list(block_tasks(n_datasets, block_size))
+    workers = workers or os.cpu_count() or 1
+    initargs = (matrix.values, path, threshold)
+    if workers == 1:
+        _init_worker(*initargs)
+        results = map(_score_blocks, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=initargs
+        )
+        results = executor.map(_score_blocks, tasks)
+
+    try:
+        for task, row_sums, column_sums, block_pairs in results:
+            row_start, row_stop, column_start, column_stop = task
+            totals[row_start:row_stop] += row_sums[0]
+            counts[row_start:row_stop] += row_sums[1]
+            if row_start != column_start:
+                totals[column_start:column_stop] += column_sums[0]
+                counts[column_start:column_stop] += column_sums[1]
+
+            for i, j, coefficient in zip(*block_pairs):
+                pairs.setdefault(i, []).append((coefficient, j))
+                pairs.setdefault(j, []).append((coefficient, i))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    averages = {
+        matrix.titles[i]: float(totals[i] / counts[i])
+        for i in range(n_datasets)
+        if counts[i] > 0
+    }
+    top_correlations = {
+        matrix.titles[i]: [
+            matrix.titles[j] for _, j in sorted(others, key=lambda pair: -pair[0])
+        ]
+        for i, others in sorted(pairs.items())
+    }
+    return PairwiseSummary(averages, top_correlations)
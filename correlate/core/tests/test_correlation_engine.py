@@ -0,0 +1,335 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from core.correlation_engine import (
+    AlignedMatrix,
+    CrossSums,
+    PrefixSums,
+    WindowSums,
+    align_datasets,
+    align_series,
+    batch_pearson,
+    batch_spearman,
+    best_lag,
+    correlate_matrix,
+    correlate_window,
+    p_values,
+    top_k,
+)
+from scipy import stats
+
+from datasets.models import (
+    AggregationPeriod,
+    CorrelationMethod,
+    CorrelationMetric,
+    PValueAdjustment,
+)
+
+
+class TestAlignDatasets(unittest.TestCase):
+    def test_align_datasets_uses_union_of_dates(self):
+        dfs = {
+            "a": pd.DataFrame({"Date": ["2020Q1", "2020Q2"], "Value": [1.0, 2.0]}),
+            "b": pd.DataFrame({"Date": ["2020Q2", "2020Q3"], "Value": [3.0, 4.0]}),
+            "empty": pd.DataFrame(),
+        }
+
+        matrix = align_datasets(dfs)
+
+        self.assertEqual(matrix.titles, ["a", "b"])
+        self.assertEqual(list(matrix.dates), ["2020Q1", "2020Q2", "2020Q3"])
+        np.testing.assert_array_equal(
+            matrix.values, [[1.0, np.nan], [2.0, 3.0], [np.nan, 4.0]]
+        )
+
+    def test_align_series(self):
+        df = pd.DataFrame({"Date": ["2020Q2", "2020Q4"], "Value": [1.0, 2.0]})
+
+        values = align_series(df, pd.Index(["2020Q1", "2020Q2", "2020Q3"]))
+
+        np.testing.assert_array_equal(values, [np.nan, 1.0, np.nan])
+
+
+class TestBatchPearson(unittest.TestCase):
+    def test_batch_pearson_matches_corrcoef(self):
+        rng = np.random.default_rng(0)
+        test_values = rng.normal(size=20)
+        matrix = rng.normal(size=(20, 3))
+        matrix[:5, 1] = np.nan
+
+        coefficients, overlap = batch_pearson(test_values, matrix)
+
+        self.assertEqual(list(overlap), [20, 15, 20])
+        self.assertAlmostEqual(
+            coefficients[0, 0], np.corrcoef(test_values, matrix[:, 0])[0, 1]
+        )
+        self.assertAlmostEqual(
+            coefficients[0, 1], np.corrcoef(test_values[5:], matrix[5:, 1])[0, 1]
+        )
+
+    def test_batch_pearson_lag_shifts_within_shared_dates(self):
+        test_values = np.array([1.0, 3.0, np.nan, 2.0, 5.0, 4.0, 8.0])
+        matrix = np.array([[2.0], [1.0], [4.0], [3.0], [7.0], [5.0], [np.nan]])
+
+        coefficients, _ = batch_pearson(test_values, matrix, lag_periods=1)
+
+        # Shared dates are rows 0, 1, 3, 4 and 5
+        test_shared = test_values[[0, 1, 3, 4, 5]]
+        dataset_shared = matrix[[0, 1, 3, 4, 5], 0]
+        self.assertAlmostEqual(
+            coefficients[1, 0],
+            np.corrcoef(test_shared[1:], dataset_shared[:-1])[0, 1],
+        )
+
+    def test_batch_pearson_all_lags_match_single_lag_corrcoef(self):
+        rng = np.random.default_rng(1)
+        test_values = rng.normal(size=30)
+        matrix = rng.normal(size=(30, 4))
+        matrix[:3, 2] = np.nan
+        matrix[10, 3] = np.nan
+
+        coefficients, _ = batch_pearson(test_values, matrix, lag_periods=6)
+
+        self.assertEqual(coefficients.shape, (7, 4))
+        for column in range(4):
+            rows = ~np.isnan(matrix[:, column])
+            test_shared, dataset_shared = test_values[rows], matrix[rows, column]
+            n = len(test_shared)
+            for lag in range(7):
+                self.assertAlmostEqual(
+                    coefficients[lag, column],
+                    np.corrcoef(test_shared[lag:], dataset_shared[: n - lag])[0, 1],
+                )
+
+    def test_batch_pearson_constant_series_is_nan(self):
+        coefficients, _ = batch_pearson(np.arange(6, dtype=float), np.full((6, 1), 3.0))
+
+        self.assertTrue(np.isnan(coefficients[0, 0]))
+
+
+class TestBestLag(unittest.TestCase):
+    def test_best_lag_picks_strongest_absolute_value(self):
+        coefficients = np.array(
+            [[0.1, np.nan, np.nan], [-0.9, 0.3, np.nan], [0.5, np.nan, np.nan]]
+        )
+
+        lags, values = best_lag(coefficients)
+
+        self.assertEqual(list(lags[:2]), [1, 1])
+        self.assertEqual(list(values[:2]), [-0.9, 0.3])
+        self.assertTrue(np.isnan(values[2]))
+
+
+class TestTopK(unittest.TestCase):
+    def test_top_k_matches_stable_sort(self):
+        values = np.array([0.5, 0.9, 0.1, 0.9, 0.5, 0.5, 0.3])
+
+        full_sort = np.argsort(-values, kind="stable")
+        for k in range(len(values) + 1):
+            np.testing.assert_array_equal(top_k(values, k), full_sort[:k])
+
+    def test_top_k_without_limit_returns_everything(self):
+        values = np.array([0.2, 0.8, 0.5])
+
+        np.testing.assert_array_equal(top_k(values), [1, 2, 0])
+
+
+class TestCorrelationResult(unittest.TestCase):
+    def setUp(self):
+        self.matrix = align_datasets(
+            {
+                "up": pd.DataFrame(
+                    {
+                        "Date": ["2020Q1", "2020Q2", "2020Q3", "2020Q4"],
+                        "Value": [1, 2, 3, 5],
+                    }
+                ),
+                "down": pd.DataFrame(
+                    {
+                        "Date": ["2019Q4", "2020Q1", "2020Q2", "2020Q3", "2020Q4"],
+                        "Value": [9, 8, 7, 5, 4],
+                    }
+                ),
+            }
+        )
+        self.test_values = np.array([np.nan, 1.0, 2.0, 3.0, 4.0])
+
+    def test_rows_are_ranked_and_materialized_lazily(self):
+        result = correlate_matrix(self.matrix, self.test_values)
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(
+            [self.matrix.titles[c] for c in result.columns], ["down", "up"]
+        )
+
+        data_points = result.data_points(limit=1)
+        self.assertEqual(len(data_points), 1)
+        self.assertEqual(data_points[0].title, "down")
+        self.assertEqual(data_points[0].dates, ["2020Q1", "2020Q2", "2020Q3", "2020Q4"])
+        self.assertEqual(data_points[0].input_data, [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(data_points[0].dataset_data, [8.0, 7.0, 5.0, 4.0])
+
+    def test_to_correlate_data_without_data(self):
+        result = correlate_matrix(self.matrix, self.test_values)
+
+        correlate_data = result.to_correlate_data(
+            AggregationPeriod.QUARTERLY,
+            CorrelationMetric.RAW_VALUE,
+            include_data=False,
+        ).model_dump()
+
+        self.assertEqual(len(correlate_data["data"]), 2)
+        self.assertEqual(correlate_data["data"][1]["internal_name"], "up")
+        self.assertEqual(correlate_data["data"][1]["dates"], [])
+        self.assertEqual(correlate_data["data"][1]["input_data"], [])
+
+
+class TestWindowSums(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        scales = np.array([1, 1, 1e6, 1, 1, 1])
+        offsets = np.array([0, 1e9, 0, 0, 0, 5])
+        self.values = rng.normal(size=(30, 6)) * scales + offsets
+        self.values[rng.random(self.values.shape) < 0.3] = np.nan
+        self.values[:, 4] = 2.0
+        self.test_values = rng.normal(size=30)
+        self.test_values[[3, 11, 12, 25]] = np.nan
+
+        prefix = PrefixSums(self.values)
+        self.matrix = AlignedMatrix(
+            pd.period_range("2015Q1", periods=30, freq="Q"),
+            self.values,
+            [str(i) for i in range(6)],
+        )
+        self.sums = WindowSums(
+            self.matrix,
+            self.test_values,
+            self.values,
+            prefix,
+            CrossSums(self.test_values, self.values, prefix),
+        )
+
+    def test_window_matches_batch_pearson(self):
+        for start, stop in [(0, 30), (0, 10), (5, 26), (12, 13), (20, 20)]:
+            test_values = np.full(30, np.nan)
+            test_values[start:stop] = self.test_values[start:stop]
+            expected, expected_overlap = batch_pearson(test_values, self.values)
+
+            coefficients, overlap = self.sums.pearson(start, stop)
+
+            np.testing.assert_array_equal(overlap, expected_overlap)
+            enough = overlap >= 2
+            np.testing.assert_allclose(
+                coefficients[:, enough], expected[:, enough], atol=1e-9
+            )
+
+    def test_constant_window_is_nan(self):
+        coefficients, _ = self.sums.pearson(0, 30)
+
+        self.assertTrue(np.isnan(coefficients[0, 4]))
+
+    def test_correlate_window_cuts_test_series_to_years(self):
+        result = correlate_window(self.sums, start_year=2016, end_year=2018)
+
+        test_values = self.test_values.copy()
+        years = np.asarray(self.matrix.dates.year)
+        test_values[(years < 2016) | (years > 2018)] = np.nan
+        expected = correlate_matrix(self.matrix, test_values)
+        np.testing.assert_array_equal(result.columns, expected.columns)
+        np.testing.assert_allclose(result.coefficients, expected.coefficients)
+        np.testing.assert_array_equal(result.test_values, test_values)
+
+
+class TestPValues(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.test_values = rng.normal(size=12)
+        values = rng.normal(size=(12, 6)) + self.test_values[:, None] * np.arange(6)
+        values[:3, 2] = np.nan
+        self.matrix = AlignedMatrix(
+            pd.period_range("2020Q1", periods=12, freq="Q"),
+            values,
+            [str(i) for i in range(6)],
+        )
+
+    def test_p_values_match_pearsonr(self):
+        values = self.matrix.values
+        expected = [
+            stats.pearsonr(
+                self.test_values[~np.isnan(values[:, i])],
+                values[~np.isnan(values[:, i]), i],
+            ).pvalue
+            for i in range(6)
+        ]
+
+        result = correlate_matrix(self.matrix, self.test_values)
+
+        np.testing.assert_allclose(result.p_values, np.array(expected)[result.columns])
+        self.assertEqual(result.data_points()[0].p_value, float(result.p_values[0]))
+
+    def test_short_pairs_are_not_significant(self):
+        np.testing.assert_array_equal(
+            p_values(np.array([1.0, -0.5]), np.array([2, 1])), [1.0, 1.0]
+        )
+        self.assertEqual(p_values(np.array([1.0]), np.array([5]))[0], 0.0)
+
+    def test_lagged_p_values_use_lagged_pair_count(self):
+        result = correlate_matrix(self.matrix, self.test_values, lag_periods=2)
+
+        lagged = (result.columns == 0) & (result.lags == 2)
+        expected = stats.pearsonr(self.test_values[2:], self.matrix.values[:-2, 0])
+        self.assertAlmostEqual(result.p_values[lagged][0], expected.pvalue)
+
+    def test_benjamini_hochberg_covers_every_candidate(self):
+        unadjusted = correlate_matrix(self.matrix, self.test_values)
+
+        result = correlate_matrix(
+            self.matrix,
+            self.test_values,
+            limit=2,
+            p_value_adjustment=PValueAdjustment.BENJAMINI_HOCHBERG,
+        )
+
+        expected = stats.false_discovery_control(unadjusted.p_values)
+        np.testing.assert_allclose(result.p_values, expected[:2])
+
+
+class TestBatchSpearman(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.test_values = rng.normal(size=16)
+        self.test_values[[2, 9]] = np.nan
+        self.matrix = rng.integers(0, 6, size=(16, 5)).astype(float)
+        self.matrix[rng.random(self.matrix.shape) < 0.25] = np.nan
+
+    def shared(self, column: int, lag: int) -> tuple[np.ndarray, np.ndarray]:
+        both = ~np.isnan(self.test_values) & ~np.isnan(self.matrix[:, column])
+        y, x = self.test_values[both], self.matrix[both, column]
+        return y[lag:], x[: len(x) - lag]
+
+    def test_batch_spearman_matches_spearmanr(self):
+        coefficients, _ = batch_spearman(self.test_values, self.matrix, lag_periods=2)
+
+        for lag in range(3):
+            expected = [
+                stats.spearmanr(*self.shared(column, lag)).statistic
+                for column in range(5)
+            ]
+            np.testing.assert_allclose(coefficients[lag], expected)
+
+    def test_spearman_ignores_outliers(self):
+        matrix = AlignedMatrix(
+            pd.period_range("2020Q1", periods=6, freq="Q"),
+            np.array([[1.0], [2.0], [3.0], [4.0], [5.0], [1000.0]]),
+            ["outlier"],
+        )
+        test_values = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+        result = correlate_matrix(
+            matrix, test_values, correlation_method=CorrelationMethod.SPEARMAN
+        )
+
+        self.assertAlmostEqual(result.coefficients[0], 1.0)
+        self.assertLess(correlate_matrix(matrix, test_values).coefficients[0], 0.9)
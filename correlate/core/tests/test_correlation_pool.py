@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from core.correlation_engine import AlignedMatrix, correlate_matrix
+from core.correlation_pool import CorrelationPool, correlate
+from core.transform_cache import select_columns
+from datasets.models import CorrelationMethod, PValueAdjustment
+
+
+class TestCorrelationPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = CorrelationPool(workers=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        values = rng.normal(size=(30, 11))
+        values[rng.random(values.shape) < 0.2] = np.nan
+        # Duplicated columns tie and must keep their serial order
+        values[:, 6] = values[:, 2]
+        values[:, 9] = -values[:, 2]
+        values[3:, 10] = np.nan
+        self.matrix = AlignedMatrix(
+            pd.RangeIndex(30), values, [f"series_{i}" for i in range(11)]
+        )
+        self.test_values = rng.normal(size=30)
+        self.test_values[:-2] += values[2:, 2]
+
+    def assertSameResult(self, **kwargs):
+        expected = correlate_matrix(self.matrix, self.test_values, **kwargs)
+        result = self.pool.correlate(self.matrix, self.test_values, **kwargs)
+
+        np.testing.assert_array_equal(result.columns, expected.columns)
+        np.testing.assert_array_equal(result.lags, expected.lags)
+        np.testing.assert_allclose(result.coefficients, expected.coefficients)
+        np.testing.assert_allclose(result.p_values, expected.p_values)
+
+    def test_matches_correlate_matrix(self):
+        self.assertSameResult()
+
+    def test_matches_with_lags_and_limit(self):
+        self.assertSameResult(lag_periods=3, limit=5)
+        self.assertSameResult(lag_periods=3, best_lag_only=True, limit=4)
+
+    def test_matches_benjamini_hochberg(self):
+        self.assertSameResult(
+            lag_periods=2,
+            limit=6,
+            p_value_adjustment=PValueAdjustment.BENJAMINI_HOCHBERG,
+        )
+
+    def test_matches_spearman(self):
+        self.assertSameResult(
+            lag_periods=1, limit=5, correlation_method=CorrelationMethod.SPEARMAN
+        )
+
+    def test_shared_matrix_is_released(self):
+        matrix = AlignedMatrix(
+            pd.RangeIndex(30), self.matrix.values.copy(), self.matrix.titles
+        )
+        self.pool.correlate(matrix, self.test_values)
+        self.assertIn(id(matrix.values), self.pool._published)
+
+        key = id(matrix.values)
+        del matrix
+        self.assertNotIn(key, self.pool._published)
+
+    def test_selection_publishes_its_base(self):
+        titles = ["series_9", "series_1", "series_2", "series_3", "series_5"]
+        for selected in (titles, self.matrix.titles[4:]):
+            matrix = select_columns(self.matrix, selected)
+            expected = correlate_matrix(matrix, self.test_values, limit=4)
+            result = self.pool.correlate(matrix, self.test_values, limit=4)
+
+            np.testing.assert_array_equal(result.columns, expected.columns)
+            np.testing.assert_allclose(result.coefficients, expected.coefficients)
+            self.assertIn(id(self.matrix.values), self.pool._published)
+            self.assertNotIn(id(matrix.values), self.pool._published)
+
+    def test_should_shard(self):
+        pool = CorrelationPool(workers=2, threshold=30 * 11 * 2)
+
+        self.assertFalse(pool.should_shard(self.matrix, 0))
+        self.assertTrue(pool.should_shard(self.matrix, 1))
+        self.assertFalse(CorrelationPool(workers=1).should_shard(self.matrix, 1))
+
+    @patch("core.correlation_pool.CORRELATION_POOL", CorrelationPool(workers=1))
+    def test_correlate_runs_serially_with_one_worker(self):
+        with patch("core.correlation_pool.correlate_matrix") as mock_correlate:
+            correlate(self.matrix, self.test_values, limit=3)
+
+        mock_correlate.assert_called_once()
@@ -1,7 +1,11 @@
 import unittest
 import pandas as pd
 
-from core.data_processing import parse_input_dataset, transform_data
+from core.data_processing import (
+    parse_input_dataset,
+    transform_data,
+    transform_data_batch,
+)
 from parameterized import parameterized
 from datetime import datetime
 from datasets.models import AggregationPeriod, CorrelationMetric
@@ -210,6 +214,63 @@ class TestTransformData(unittest.TestCase):
         self.assertEqual(result["Value"].size, 6)
 
 
+class TestTransformDataBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        months = pd.date_range("2019-02-01", periods=30, freq="MS", tz="UTC")
+        quarters = pd.date_range("2018-01-01", periods=12, freq="QS", tz="UTC")
+        self.dfs = {
+            "monthly": pd.DataFrame(
+                {"Date": months, "Value": [float(i % 7) for i in range(30)]}
+            ),
+            "quarterly": pd.DataFrame(
+                {"Date": quarters, "Value": [float(i * i) for i in range(12)]}
+            ),
+            "gaps": pd.DataFrame(
+                {"Date": months[[1, 2, 3, 5, 6, 7, 8, 12, 13, 14, 20]], "Value": 1.0}
+            ),
+            "unsorted": pd.DataFrame(
+                {"Date": months[::-1], "Value": [float(i) for i in range(30)]}
+            ),
+            "short": pd.DataFrame({"Date": months[:2], "Value": [1.0, 2.0]}),
+            "zeros": pd.DataFrame({"Date": quarters, "Value": [0.0, 1.0] * 6}),
+        }
+        self.long = pd.concat(
+            [df.assign(Title=title) for title, df in self.dfs.items()],
+            ignore_index=True,
+        )
+
+    @parameterized.expand(
+        [
+            [AggregationPeriod.QUARTERLY, "December", CorrelationMetric.RAW_VALUE],
+            [AggregationPeriod.QUARTERLY, "March", CorrelationMetric.YOY_GROWTH],
+            [AggregationPeriod.ANNUALLY, None, CorrelationMetric.RAW_VALUE],
+            [AggregationPeriod.ANNUALLY, None, CorrelationMetric.YOY_GROWTH],
+        ]
+    )
+    def test_matches_transform_data(
+        self, time_increment, fiscal_end_month, correlation_metric
+    ):
+        result = transform_data_batch(
+            self.long, time_increment, fiscal_end_month, correlation_metric
+        )
+
+        for title, df in self.dfs.items():
+            expected = transform_data(
+                df, time_increment, fiscal_end_month, correlation_metric
+            )
+            actual = result[result["Title"] == title]
+            self.assertEqual(list(actual["Date"]), list(expected.get("Date", [])))
+            self.assertEqual(list(actual["Value"]), list(expected.get("Value", [])))
+
+    def test_drops_monthly_dataset_without_complete_quarter(self):
+        months = pd.date_range("2020-03-01", periods=3, freq="MS", tz="UTC")
+        long = pd.DataFrame({"Title": "partial", "Date": months, "Value": 1.0})
+
+        result = transform_data_batch(long, AggregationPeriod.QUARTERLY, "December")
+
+        self.assertTrue(result.empty)
+
+
 class TestParseInputDataset(unittest.TestCase):
     def test_parse_input_dataset_with_floats(self):
         input_data = "Q1'14\t0.05\nQ2'14\t-0.02\nQ3'14\t0.04\nQ4'14\t0.02\nQ1'15\t0.01\nQ2'15\t-0.02\nQ3'15\t-0.04\nQ4'15\t-0.05\nQ1'16\t-0.05\nQ2'16\t0.01\nQ3'16\t0.00\nQ4'16\t0.00\nQ1'17\t0.06\nQ2'17\t0.04\nQ3'17\t0.07\nQ4'17\t0.07\nQ1'18\t0.05\nQ2'18\t0.10\nQ3'18\t0.12\nQ4'18\t0.08\nQ1'19\t0.06\nQ2'19\t0.03\nQ3'19\t0.02\nQ4'19\t-0.03\nQ1'20\t-0.05\nQ2'20\t-0.20\nQ3'20\t-0.17\nQ4'20\t-0.04\nQ1'21\t0.02\nQ2'21\t0.08\nQ3'21\t0.07\nQ4'21\t0.07\nQ1'22\t0.11\nQ2'22\t0.13\nQ3'22\t0.17\nQ4'22\t0.09\nQ1'23\t0.09\nQ2'23\t0.10\nQ3'23\t-0.01\nQ4'23\t0.03"
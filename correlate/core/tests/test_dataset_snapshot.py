@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from core.dataset_snapshot import DatasetSnapshot, write_snapshot
+
+
+def raw_df(dates: list[str], values: list[float]) -> pd.DataFrame:
+    return pd.DataFrame({"Date": pd.to_datetime(dates, utc=True), "Value": values})
+
+
+class TestDatasetSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "datasets.snapshot")
+        self.dfs = {
+            "a": raw_df(["2020-01-01", "2020-02-01"], [1.0, 2.5]),
+            "empty": pd.DataFrame(columns=["Date", "Value"]),
+            "b": raw_df(["2019-06-30 12:00"], [-3.0]),
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        write_snapshot(self.path, self.dfs, version=7)
+
+        snapshot = DatasetSnapshot(self.path)
+        dfs = snapshot.dfs()
+
+        self.assertEqual(snapshot.version, 7)
+        self.assertEqual(list(dfs), ["a", "b"])
+        for title, df in dfs.items():
+            pd.testing.assert_frame_equal(df, self.dfs[title])
+
+    def test_values_are_mapped_read_only(self):
+        write_snapshot(self.path, self.dfs, version=1)
+
+        snapshot = DatasetSnapshot(self.path)
+        df = snapshot.frame(0)
+
+        self.assertTrue(np.shares_memory(df["Value"].to_numpy(), snapshot.values))
+        self.assertTrue(np.shares_memory(df["Date"].array._ndarray, snapshot.dates))
+        with self.assertRaises(ValueError):
+            df.loc[0, "Value"] = 0.0
+
+    def test_dates_without_the_private_constructor(self):
+        write_snapshot(self.path, self.dfs, version=1)
+        snapshot = DatasetSnapshot(self.path)
+        simple_new = pd.arrays.DatetimeArray._simple_new
+        # Only the first call is ours, pandas uses it internally too
+        errors = iter([AttributeError])
+
+        def removed(cls, *args, **kwargs):
+            for error in errors:
+                raise error
+            return simple_new(*args, **kwargs)
+
+        with patch.object(pd.arrays.DatetimeArray, "_simple_new", classmethod(removed)):
+            df = snapshot.frame(0)
+
+        pd.testing.assert_frame_equal(df, self.dfs["a"])
+
+    def test_selected_names(self):
+        write_snapshot(self.path, self.dfs, version=1)
+
+        dfs = DatasetSnapshot(self.path).dfs(["b", "missing"])
+
+        self.assertEqual(list(dfs), ["b"])
+
+    def test_replacing_keeps_open_snapshots(self):
+        write_snapshot(self.path, self.dfs, version=1)
+        old = DatasetSnapshot(self.path)
+
+        write_snapshot(self.path, {"c": raw_df(["2021-01-01"], [9.0])}, version=2)
+
+        self.assertEqual(old.frame(0)["Value"].tolist(), [1.0, 2.5])
+        self.assertEqual(DatasetSnapshot(self.path).titles, ["c"])
+        self.assertEqual(os.listdir(self.directory.name), ["datasets.snapshot"])
+
+    def test_empty_snapshot(self):
+        write_snapshot(self.path, {}, version=0)
+
+        self.assertEqual(DatasetSnapshot(self.path).dfs(), {})
+
+    def test_truncated_snapshot(self):
+        write_snapshot(self.path, self.dfs, version=1)
+        size = os.path.getsize(self.path)
+
+        for length in [10, 20, size - 8]:
+            with self.subTest(length=length):
+                with open(self.path, "r+b") as file:
+                    file.truncate(length)
+                with self.assertRaises(ValueError):
+                    DatasetSnapshot(self.path)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a snapshot")
+
+        with self.assertRaises(ValueError):
+            DatasetSnapshot(self.path)
@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from core.index_cache import IndexSeriesCache, index_key
+from datasets.models import AggregationPeriod, CorrelationMetric
+
+
+def key(index_id: int):
+    return index_key(
+        index_id, AggregationPeriod.QUARTERLY, "December", CorrelationMetric.RAW_VALUE
+    )
+
+
+class TestIndexSeriesCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = IndexSeriesCache(max_entries=2)
+        self.series = pd.DataFrame({"Date": ["2020Q1"], "Value": [1.0]})
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get(key(1)))
+
+        self.cache.put(key(1), self.series, ["a"], self.cache.version)
+
+        self.assertIs(self.cache.get(key(1)), self.series)
+
+    def test_annual_key_ignores_fiscal_month(self):
+        self.assertEqual(
+            index_key(
+                1, AggregationPeriod.ANNUALLY, "June", CorrelationMetric.RAW_VALUE
+            ),
+            index_key(
+                1, AggregationPeriod.ANNUALLY, "December", CorrelationMetric.RAW_VALUE
+            ),
+        )
+
+    def test_invalidate_dataset_drops_indexes_using_it(self):
+        version = self.cache.version
+        self.cache.put(key(1), self.series, ["a", "b"], version)
+        self.cache.put(key(2), self.series, ["b"], version)
+
+        self.cache.invalidate_dataset("a")
+
+        self.assertIsNone(self.cache.get(key(1)))
+        self.assertIs(self.cache.get(key(2)), self.series)
+
+    def test_entry_of_another_update_is_dropped(self):
+        saved = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.cache.put(key(1), self.series, ["a"], self.cache.version, saved)
+
+        self.assertIs(self.cache.get(key(1), saved), self.series)
+        self.assertIsNone(
+            self.cache.get(key(1), datetime(2024, 1, 2, tzinfo=timezone.utc))
+        )
+        self.assertIsNone(self.cache.get(key(1), saved))
+
+    def test_entry_of_another_data_version_is_dropped(self):
+        self.cache.put(key(1), self.series, ["a"], self.cache.version, None, 1)
+
+        self.assertIs(self.cache.get(key(1), None, 1), self.series)
+        self.assertIsNone(self.cache.get(key(1), None, 2))
+        self.assertIsNone(self.cache.get(key(1), None, 1))
+
+    def test_invalidate_index(self):
+        self.cache.put(key(1), self.series, ["a"], self.cache.version)
+
+        self.cache.invalidate_index(1)
+
+        self.assertIsNone(self.cache.get(key(1)))
+
+    def test_put_after_invalidation_is_ignored(self):
+        version = self.cache.version
+        self.cache.invalidate_dataset("a")
+
+        self.cache.put(key(1), self.series, ["a"], version)
+
+        self.assertIsNone(self.cache.get(key(1)))
+
+    def test_least_recently_used_is_dropped(self):
+        version = self.cache.version
+        self.cache.put(key(1), self.series, ["a"], version)
+        self.cache.put(key(2), self.series, ["a"], version)
+        self.cache.get(key(1))
+
+        self.cache.put(key(3), self.series, ["a"], version)
+
+        self.assertIsNone(self.cache.get(key(2)))
+        self.assertIsNotNone(self.cache.get(key(1)))
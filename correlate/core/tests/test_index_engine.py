@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from core.correlation_engine import AlignedMatrix
+from core.index_engine import build_indexes, index_weights
+from datasets.models import CorrelationMetric
+
+nan = np.nan
+
+
+class TestIndexEngine(unittest.TestCase):
+    def setUp(self):
+        values = np.array(
+            [
+                [1.0, nan, 2.0],
+                [2.0, 5.0, nan],
+                [-4.0, 10.0, nan],
+                [nan, nan, nan],
+            ]
+        )
+        self.matrix = AlignedMatrix(pd.RangeIndex(4), values, ["a", "b", "c"])
+
+    def test_index_weights(self):
+        weights = index_weights(
+            ["a", "b", "c"], [{"a": 0.5, "c": 2.0}, {"missing": 1.0, "b": 0.0}]
+        )
+
+        np.testing.assert_array_equal(
+            weights.toarray(), [[0.5, 0.0, 2.0], [0.0, 0.0, 0.0]]
+        )
+        self.assertEqual(weights.nnz, 3)
+
+    def test_build_indexes_raw_value(self):
+        indexes = build_indexes(
+            self.matrix,
+            [("first", {"a": 0.5, "b": 0.5}), ("second", {"c": 1.0})],
+            CorrelationMetric.RAW_VALUE,
+        )
+
+        self.assertEqual(indexes.titles, ["first", "second"])
+        np.testing.assert_allclose(
+            indexes.values,
+            [
+                [0.125, 1.0],
+                [0.25 + 0.25, nan],
+                [-0.5 + 0.5, nan],
+                [nan, nan],
+            ],
+        )
+
+    def test_build_indexes_growth_is_not_scaled(self):
+        indexes = build_indexes(
+            self.matrix, [("index", {"a": 2.0, "b": 1.0})], CorrelationMetric.YOY_GROWTH
+        )
+
+        np.testing.assert_allclose(indexes.values[:, 0], [2.0, 9.0, 2.0, nan])
+
+    def test_zero_weight_component_keeps_its_dates(self):
+        indexes = build_indexes(
+            self.matrix,
+            [("index", {"b": 1.0, "c": 0.0}), ("empty", {})],
+            CorrelationMetric.YOY_GROWTH,
+        )
+
+        np.testing.assert_allclose(indexes.values[:, 0], [0.0, 5.0, 10.0, nan])
+        self.assertTrue(np.isnan(indexes.values[:, 1]).all())
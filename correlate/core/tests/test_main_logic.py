@@ -1,7 +1,8 @@
 import unittest
-from core.main_logic import create_index, correlate_datasets
+from core.main_logic import calculate_correlation, create_index, correlate_datasets
 from unittest import mock
 import pandas as pd
+from core.data_processing import transform_data
 from datasets.models import CorrelationMetric, AggregationPeriod, CorrelateDataPoint
 
 DATES = [
@@ -89,6 +90,92 @@ class TestCorrelateDatasets(unittest.TestCase):
         self.assertIsNone(result)
 
 
+class TestCalculateCorrelation(unittest.TestCase):
+    def test_matches_correlate_datasets(self):
+        dfs = {
+            "same": pd.DataFrame(TEST_DATA),
+            "double": pd.DataFrame(TEST_DATA_2),
+            "reversed": pd.DataFrame(
+                {"Date": DATES, "Value": [(i % 5) * 3 for i in range(24)]}
+            ),
+        }
+
+        results = calculate_correlation(
+            AggregationPeriod.QUARTERLY,
+            "December",
+            dfs=dfs,
+            test_data=pd.DataFrame(TEST_DATA),
+            lag_periods=2,
+        )
+
+        self.assertEqual(len(results), 9)
+        values = [abs(result.pearson_value) for result in results]
+        self.assertEqual(values, sorted(values, reverse=True))
+
+        test_df = transform_data(
+            pd.DataFrame(TEST_DATA), AggregationPeriod.QUARTERLY, "December"
+        )
+        for result in results:
+            df = transform_data(
+                dfs[result.title], AggregationPeriod.QUARTERLY, "December"
+            )
+            expected = correlate_datasets(test_df, df, result.title, lag_periods=2)
+            assert expected is not None
+            self.assertAlmostEqual(
+                result.pearson_value, expected[result.lag].pearson_value
+            )
+            self.assertEqual(result.dates, expected[result.lag].dates)
+            self.assertEqual(result.input_data, expected[result.lag].input_data)
+            self.assertEqual(result.dataset_data, expected[result.lag].dataset_data)
+
+    def test_limit_keeps_strongest_correlations(self):
+        dfs = {
+            "same": pd.DataFrame(TEST_DATA),
+            "reversed": pd.DataFrame(
+                {"Date": DATES, "Value": [(i % 5) * 3 for i in range(24)]}
+            ),
+        }
+        kwargs = dict(
+            time_increment=AggregationPeriod.QUARTERLY,
+            fiscal_end_month="December",
+            dfs=dfs,
+            test_data=pd.DataFrame(TEST_DATA),
+            lag_periods=2,
+        )
+
+        results = calculate_correlation(**kwargs, limit=2)
+        all_results = calculate_correlation(**kwargs)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results, all_results[:2])
+
+    def test_best_lag_only(self):
+        results = calculate_correlation(
+            AggregationPeriod.QUARTERLY,
+            "December",
+            dfs={"double": pd.DataFrame(TEST_DATA_2)},
+            test_data=pd.DataFrame(TEST_DATA),
+            lag_periods=3,
+            best_lag_only=True,
+        )
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].title, "double")
+        self.assertAlmostEqual(results[0].pearson_value, 1.0)
+
+    def test_skips_datasets_with_insufficient_overlap(self):
+        dfs = {"short": pd.DataFrame(TEST_DATA).iloc[:9]}
+
+        results = calculate_correlation(
+            AggregationPeriod.QUARTERLY,
+            "December",
+            dfs=dfs,
+            test_data=pd.DataFrame(TEST_DATA),
+        )
+
+        self.assertEqual(results, [])
+
+
 class TestCreateIndex(unittest.TestCase):
     def test_create_index_quarterly_raw_value(self):
         with mock.patch(
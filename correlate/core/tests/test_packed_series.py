@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from core.packed_series import pack_series, unpack_series
+
+
+def round_trip(dates: pd.DatetimeIndex, values: np.ndarray):
+    packed = pack_series(dates.as_unit("ns").asi8, values)
+    return packed, unpack_series(
+        packed.start, packed.frequency, packed.dates, packed.values
+    )
+
+
+class TestPackedSeries(unittest.TestCase):
+    def test_regular_series_keeps_only_its_start(self):
+        dates = pd.date_range("2000-01-01", periods=24, freq="QS-OCT", tz="UTC")
+        values = np.arange(24, dtype=np.float64)
+
+        packed, (unpacked_dates, unpacked_values) = round_trip(dates, values)
+
+        self.assertEqual(packed.frequency, "QS-OCT")
+        self.assertIsNone(packed.dates)
+        self.assertEqual(len(packed.values), 24 * 8)
+        np.testing.assert_array_equal(unpacked_dates, dates.as_unit("ns").asi8)
+        np.testing.assert_array_equal(unpacked_values, values)
+
+    def test_regular_dates_are_read_only(self):
+        dates = pd.date_range("2000-01-01", periods=4, freq="MS", tz="UTC")
+
+        _, (unpacked_dates, _) = round_trip(dates, np.arange(4, dtype=np.float64))
+
+        with self.assertRaises(ValueError):
+            unpacked_dates[0] = 0
+
+    def test_irregular_series_keeps_its_dates(self):
+        dates = pd.DatetimeIndex(
+            ["1960-06-30", "2000-01-01", "2000-01-05 12:00"], tz="UTC"
+        )
+        values = np.array([1.5, np.nan, -2.0])
+
+        packed, (unpacked_dates, unpacked_values) = round_trip(dates, values)
+
+        self.assertIsNone(packed.frequency)
+        np.testing.assert_array_equal(unpacked_dates, dates.as_unit("ns").asi8)
+        np.testing.assert_array_equal(unpacked_values, values)
+
+    def test_short_series(self):
+        dates = pd.DatetimeIndex(["2020-01-01"], tz="UTC")
+
+        packed, (unpacked_dates, _) = round_trip(dates, np.array([1.0]))
+
+        self.assertIsNone(packed.frequency)
+        self.assertEqual(packed.start, dates[0])
+        np.testing.assert_array_equal(unpacked_dates, dates.as_unit("ns").asi8)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from core.correlation_engine import AlignedMatrix, batch_pearson
+from core.pairwise import block_tasks, pairwise_block, pairwise_correlation
+
+
+class TestPairwise(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        values = rng.normal(size=(20, 9)) + np.arange(9) * 1e5
+        values[rng.random(values.shape) < 0.3] = np.nan
+        values[:, 4] = values[:, 1] * 3 + 2
+        values[:, 7] = 1.0
+        values[2:, 8] = np.nan
+        self.matrix = AlignedMatrix(
+            pd.RangeIndex(20), values, [f"series_{i}" for i in range(9)]
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "pairwise.npy")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def expected(self) -> np.ndarray:
+        rows = []
+        for column in range(len(self.matrix)):
+            coefficients, overlap = batch_pearson(
+                self.matrix.values[:, column], self.matrix.values
+            )
+            coefficients[:, overlap < 4] = np.nan
+            rows.append(coefficients[0])
+        return np.array(rows)
+
+    def test_block_matches_batch_pearson(self):
+        coefficients, count = pairwise_block(
+            self.matrix.values, slice(0, 4), slice(2, 9)
+        )
+
+        expected = self.expected()[0:4, 2:9]
+        coefficients[count < 4] = np.nan
+        np.testing.assert_allclose(coefficients, expected, atol=1e-9)
+
+    def test_block_tasks_cover_upper_triangle(self):
+        self.assertEqual(
+            list(block_tasks(5, 2)),
+            [
+                (0, 2, 0, 2),
+                (0, 2, 2, 4),
+                (0, 2, 4, 5),
+                (2, 4, 2, 4),
+                (2, 4, 4, 5),
+                (4, 5, 4, 5),
+            ],
+        )
+
+    def test_pairwise_correlation_writes_full_matrix(self):
+        summary = pairwise_correlation(self.matrix, self.path, block_size=4, workers=1)
+
+        output = np.load(self.path)
+        expected = self.expected()
+        self.assertEqual(output.dtype, np.float32)
+        np.testing.assert_allclose(output, expected, atol=1e-6)
+
+        self.assertEqual(
+            summary.top_correlations,
+            {"series_1": ["series_4"], "series_4": ["series_1"]},
+        )
+        self.assertNotIn("series_8", summary.averages)
+        self.assertAlmostEqual(
+            summary.averages["series_0"], np.nanmean(expected[0]), places=6
+        )
+
+    def test_pairwise_correlation_with_process_pool(self):
+        pairwise_correlation(self.matrix, self.path, block_size=4, workers=1)
+        single = np.load(self.path)
+
+        summary = pairwise_correlation(self.matrix, self.path, block_size=3, workers=2)
+
+        np.testing.assert_array_equal(np.load(self.path), single)
+        self.assertEqual(set(summary.top_correlations), {"series_1", "series_4"})
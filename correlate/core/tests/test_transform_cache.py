@@ -0,0 +1,292 @@
+import gc
+import unittest
+import weakref
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+
+from core.correlation_engine import AlignedMatrix
+from core.data_processing import transform_data, transform_data_batch
+from core.transform_cache import (
+    LazyDatasets,
+    TransformedDatasetCache,
+    merge_matrices,
+    select_columns,
+    transform_key,
+)
+from datasets.models import AggregationPeriod, CorrelationMetric
+
+
+def monthly_df(start: str, values: list[float]) -> pd.DataFrame:
+    dates = pd.date_range(start, periods=len(values), freq="MS", tz="UTC")
+    return pd.DataFrame({"Date": dates, "Value": values})
+
+
+class TestTransformedDatasetCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = TransformedDatasetCache()
+        self.dfs = {
+            "a": monthly_df("2020-01-01", [float(i) for i in range(12)]),
+            "b": monthly_df("2020-04-01", [float(i * i) for i in range(12)]),
+        }
+
+    def get_matrix(self, dfs):
+        return self.cache.get_matrix(
+            dfs, AggregationPeriod.QUARTERLY, "December", CorrelationMetric.RAW_VALUE
+        )
+
+    def test_matrix_matches_transform_data(self):
+        matrix = self.get_matrix(self.dfs)
+
+        self.assertEqual(matrix.titles, ["a", "b"])
+        for column, title in enumerate(matrix.titles):
+            expected = transform_data(
+                self.dfs[title],
+                AggregationPeriod.QUARTERLY,
+                "December",
+                CorrelationMetric.RAW_VALUE,
+            )
+            values = matrix.values[:, column]
+            present = ~np.isnan(values)
+            self.assertEqual(list(matrix.dates[present]), list(expected["Date"]))
+            np.testing.assert_array_equal(values[present], expected["Value"])
+
+    def test_repeat_requests_reuse_transformed_data(self):
+        self.get_matrix(self.dfs)
+        with patch("core.transform_cache.transform_data_batch") as mock_transform:
+            matrix = self.get_matrix(self.dfs)
+
+        mock_transform.assert_not_called()
+        self.assertEqual(matrix.titles, ["a", "b"])
+
+    def test_new_dataframe_only_transforms_that_dataset(self):
+        self.get_matrix(self.dfs)
+        updated = {**self.dfs, "b": monthly_df("2020-04-01", [1.0] * 12)}
+
+        with patch(
+            "core.transform_cache.transform_data_batch", wraps=transform_data_batch
+        ) as mock_transform:
+            matrix = self.get_matrix(updated)
+
+        self.assertEqual(mock_transform.call_count, 1)
+        self.assertEqual(set(mock_transform.call_args.args[0]["Title"]), {"b"})
+        b_values = matrix.values[:, matrix.titles.index("b")]
+        np.testing.assert_array_equal(b_values[~np.isnan(b_values)], [3.0] * 4)
+
+    def test_equal_dataframe_is_not_retransformed(self):
+        self.get_matrix(self.dfs)
+        copies = {title: df.copy() for title, df in self.dfs.items()}
+
+        with patch("core.transform_cache.transform_data_batch") as mock_transform:
+            self.get_matrix(copies)
+
+        mock_transform.assert_not_called()
+
+    def test_raw_dataframes_are_not_kept(self):
+        df = monthly_df("2020-01-01", [1.0] * 12)
+        reference = weakref.ref(df)
+        self.get_matrix({"a": df})
+
+        del df
+        gc.collect()
+
+        self.assertIsNone(reference())
+        self.assertEqual(self.cache._fingerprints, {})
+
+    def test_lazy_datasets_only_load_unseen_tokens(self):
+        load = Mock(
+            side_effect=lambda titles: {t: self.dfs[t] for t in titles if t != "c"}
+        )
+        tokens = {"a": 1, "b": 1}
+        self.get_matrix(LazyDatasets(["a", "b", "c"], tokens, load))
+        load.reset_mock()
+
+        with patch(
+            "core.transform_cache.transform_data_batch", wraps=transform_data_batch
+        ) as mock_transform:
+            tokens["b"] = 2
+            matrix = self.get_matrix(LazyDatasets(["a", "b", "c"], tokens, load))
+
+        # "c" has no token and no values, it is read again to check
+        self.assertEqual([call.args[0] for call in load.call_args_list], [["c"], ["b"]])
+        self.assertEqual(set(mock_transform.call_args.args[0]["Title"]), {"b"})
+        self.assertEqual(matrix.titles, ["a", "b"])
+
+    def test_trim_keeps_the_last_entry(self):
+        self.get_matrix(self.dfs)
+        self.cache.get_matrix(
+            self.dfs, AggregationPeriod.ANNUALLY, None, CorrelationMetric.RAW_VALUE
+        )
+        self.assertGreater(self.cache.nbytes, 0)
+
+        self.cache.trim(0)
+
+        self.assertEqual(len(self.cache._entries), 1)
+        self.assertEqual(
+            self.cache.nbytes,
+            next(iter(self.cache._entries.values())).matrix.values.nbytes,
+        )
+
+    def test_invalidate_retransforms_dataset(self):
+        self.get_matrix(self.dfs)
+        self.cache.invalidate("a")
+
+        with patch(
+            "core.transform_cache.transform_data_batch", wraps=transform_data_batch
+        ) as mock_transform:
+            self.get_matrix(self.dfs)
+
+        self.assertEqual(mock_transform.call_count, 1)
+        self.assertEqual(set(mock_transform.call_args.args[0]["Title"]), {"a"})
+
+    def test_subset_request_keeps_requested_order(self):
+        self.get_matrix(self.dfs)
+
+        matrix = self.get_matrix({"b": self.dfs["b"], "missing": pd.DataFrame()})
+
+        self.assertEqual(matrix.titles, ["b"])
+
+    def test_least_recently_used_entry_is_dropped(self):
+        cache = TransformedDatasetCache(max_entries=1)
+        cache.get_matrix(
+            self.dfs,
+            AggregationPeriod.QUARTERLY,
+            "December",
+            CorrelationMetric.RAW_VALUE,
+        )
+        cache.get_matrix(
+            self.dfs,
+            AggregationPeriod.QUARTERLY,
+            "March",
+            CorrelationMetric.RAW_VALUE,
+        )
+
+        self.assertEqual(
+            list(cache._entries),
+            [
+                transform_key(
+                    AggregationPeriod.QUARTERLY, "March", CorrelationMetric.RAW_VALUE
+                )
+            ],
+        )
+
+    def test_get_transformed(self):
+        transformed = self.cache.get_transformed(
+            self.dfs,
+            AggregationPeriod.ANNUALLY,
+            None,
+            CorrelationMetric.RAW_VALUE,
+        )
+
+        expected = transform_data(
+            self.dfs["a"], AggregationPeriod.ANNUALLY, None, CorrelationMetric.RAW_VALUE
+        )
+        pd.testing.assert_frame_equal(
+            transformed["a"].reset_index(drop=True),
+            expected.reset_index(drop=True),
+            check_index_type=False,
+        )
+
+    def test_window_sums_reuse_cross_terms_per_test_series(self):
+        test_df = pd.DataFrame(
+            {"Date": ["2020Q2", "2020Q3", "2020Q4", "2021Q1"], "Value": [1, 3, 2, 5]}
+        )
+
+        def get_window_sums():
+            return self.cache.get_window_sums(
+                self.dfs,
+                AggregationPeriod.QUARTERLY,
+                "December",
+                CorrelationMetric.RAW_VALUE,
+                test_df,
+            )
+
+        sums = get_window_sums()
+        with patch("core.transform_cache.CrossSums") as mock_cross:
+            repeated = get_window_sums()
+
+        mock_cross.assert_not_called()
+        self.assertIs(repeated.cross, sums.cross)
+        self.assertIs(repeated.prefix, sums.prefix)
+        self.assertEqual(repeated.matrix.titles, ["a", "b"])
+        np.testing.assert_array_equal(
+            repeated.test_values[~np.isnan(repeated.test_values)], [1, 3, 2, 5]
+        )
+
+    def test_window_sums_of_subset(self):
+        self.get_matrix(self.dfs)
+        test_df = pd.DataFrame(
+            {"Date": ["2020Q2", "2020Q3", "2020Q4", "2021Q1"], "Value": [1, 3, 2, 5]}
+        )
+
+        sums = self.cache.get_window_sums(
+            {"b": self.dfs["b"]},
+            AggregationPeriod.QUARTERLY,
+            "December",
+            CorrelationMetric.RAW_VALUE,
+            test_df,
+        )
+
+        coefficients, overlap = sums.pearson(0, len(sums.matrix.dates))
+        self.assertEqual(sums.matrix.titles, ["b"])
+        self.assertEqual(overlap.tolist(), [4])
+        self.assertAlmostEqual(
+            coefficients[0, 0], np.corrcoef([1, 3, 2, 5], [5, 50, 149, 302])[0, 1]
+        )
+
+
+class TestTransformHelpers(unittest.TestCase):
+    def test_annual_key_ignores_fiscal_month(self):
+        self.assertEqual(
+            transform_key(
+                AggregationPeriod.ANNUALLY, "March", CorrelationMetric.YOY_GROWTH
+            ),
+            transform_key(
+                AggregationPeriod.ANNUALLY, "December", CorrelationMetric.YOY_GROWTH
+            ),
+        )
+        self.assertNotEqual(
+            transform_key(
+                AggregationPeriod.QUARTERLY, "March", CorrelationMetric.YOY_GROWTH
+            ),
+            transform_key(
+                AggregationPeriod.QUARTERLY, "December", CorrelationMetric.YOY_GROWTH
+            ),
+        )
+
+    def test_select_columns(self):
+        matrix = AlignedMatrix(
+            pd.Index(["2020Q1"]), np.array([[1.0, 2.0, 3.0]]), ["a", "b", "c"]
+        )
+
+        self.assertIs(select_columns(matrix, ["a", "b", "c"]), matrix)
+        selected = select_columns(matrix, ["c", "x", "a"])
+        self.assertEqual(selected.titles, ["c", "a"])
+        np.testing.assert_array_equal(selected.values, [[3.0, 1.0]])
+        self.assertIs(selected.base, matrix)
+        np.testing.assert_array_equal(selected.columns, [2, 0])
+
+        nested = select_columns(selected, ["a"])
+        self.assertIs(nested.base, matrix)
+        np.testing.assert_array_equal(nested.columns, [0])
+
+    def test_merge_matrices(self):
+        base = AlignedMatrix(
+            pd.Index(["2020Q1", "2020Q2"]),
+            np.array([[1.0, 2.0], [3.0, 4.0]]),
+            ["a", "b"],
+        )
+        update = AlignedMatrix(
+            pd.Index(["2020Q2", "2020Q3"]),
+            np.array([[5.0], [6.0]]),
+            ["b"],
+        )
+
+        merged = merge_matrices(base, update, ["b"], ["b", "a"])
+
+        self.assertEqual(merged.titles, ["b", "a"])
+        self.assertEqual(list(merged.dates), ["2020Q1", "2020Q2", "2020Q3"])
+        np.testing.assert_array_equal(
+            merged.values, [[np.nan, 1.0], [5.0, 3.0], [6.0, np.nan]]
+        )
@@ -0,0 +1,442 @@
+"""Cache of transformed datasets.
+
+Only 12 fiscal months x 2 aggregation periods x 2 metrics can exist, so the
+transformed universe is kept per transformation as one aligned matrix. Repeat
+requests then skip ``transform_data`` entirely. Each column remembers a token
+of the raw values it was built from rather than the dataframe itself, so raw
+datasets can be freed and reloaded: only a title whose token changed, or an
+explicit ``invalidate`` call, re-transforms that dataset. Tokens are
+fingerprints of the values, or come from ``LazyDatasets`` without loading
+them. The datasets that do need transforming go through
+``transform_data_batch`` together.
+
+Entries also keep running totals of their matrix, so correlations over a
+different range of years are differences of totals rather than a new pass.
+"""
+
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from pandas.core.dtypes.dtypes import DatetimeTZDtype
+
+from core.correlation_engine import (
+    AlignedMatrix,
+    CrossSums,
+    PrefixSums,
+    WindowSums,
+    align_datasets,
+    align_long,
+    align_series,
+)
+from core.data_processing import transform_data_base, transform_data_batch
+from datasets.models import AggregationPeriod, CorrelationMetric
+
+TransformKey = tuple[AggregationPeriod, str | None, CorrelationMetric]
+
+_EMPTY = pd.DataFrame({"Date": [], "Value": []})
+
+
+def transform_key(
+    time_increment: AggregationPeriod,
+    fiscal_end_month: str | None,
+    correlation_metric: CorrelationMetric,
+) -> TransformKey:
+    # Annual aggregation ignores the fiscal month, share one entry for all
+    if time_increment == AggregationPeriod.ANNUALLY:
+        fiscal_end_month = None
+    return (
+        AggregationPeriod(time_increment),
+        fiscal_end_month,
+        CorrelationMetric(correlation_metric),
+    )
+
+
+def select_columns(matrix: AlignedMatrix, titles: list[str]) -> AlignedMatrix:
+    """Restrict a matrix to ``titles``, in that order, skipping unknown ones."""
+    if matrix.titles == titles:
+        return matrix
+
+    columns = {title: i for i, title in enumerate(matrix.titles)}
+    selected = [title for title in titles if title in columns]
+    indices = np.array([columns[title] for title in selected], dtype=np.intp)
+    base = matrix
+    if matrix.base is not None and matrix.columns is not None:
+        base, indices = matrix.base, matrix.columns[indices]
+    return AlignedMatrix(matrix.dates, base.values[:, indices], selected, base, indices)
+
+
+def fingerprint(df: pd.DataFrame) -> bytes:
+    """Digest of the columns of a dataframe, equal for equal values."""
+    digest = hashlib.blake2b(digest_size=16)
+    for i, name in enumerate(df.columns):
+        # Boxing every column as a Series costs more than hashing it
+        array = df._get_column_array(i)
+        digest.update(f"{name}:{array.dtype}:{len(array)}".encode())
+        if array.dtype == object:
+            data = pd.util.hash_array(np.asarray(array))
+        elif hasattr(array, "asi8"):
+            data = array.asi8
+        else:
+            data = np.asarray(array)
+        digest.update(np.ascontiguousarray(data).data)
+    return digest.digest()
+
+
+class LazyDatasets(Mapping[str, pd.DataFrame]):
+    """Raw dataframes of ``titles``, only read through ``load`` when needed.
+
+    ``tokens`` identify the values of some titles without loading them, they
+    change whenever the values do. ``load`` reads many titles at once and
+    leaves out the ones without values, which read as empty dataframes.
+    """
+
+    def __init__(
+        self,
+        titles: list[str],
+        tokens: Mapping[str, Hashable],
+        load: Callable[[list[str]], Mapping[str, pd.DataFrame]],
+    ):
+        self.titles = titles
+        self.tokens = tokens
+        self._load = load
+        self._known = set(titles)
+
+    def __getitem__(self, title: str) -> pd.DataFrame:
+        if title not in self._known:
+            raise KeyError(title)
+        return self.load([title])[title]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.titles)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def load(self, titles: list[str]) -> dict[str, pd.DataFrame]:
+        loaded = self._load(titles) if titles else {}
+        return {title: loaded.get(title, _EMPTY) for title in titles}
+
+
+def column_frame(matrix: AlignedMatrix, column: int) -> pd.DataFrame:
+    """Rebuild the transformed dataframe of one column of a matrix."""
+    values = matrix.values[:, column]
+    present = ~np.isnan(values)
+    return pd.DataFrame({"Date": matrix.dates[present], "Value": values[present]})
+
+
+def long_format(dfs: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """Stack raw ``Date``/``Value`` dataframes into ``Title``/``Date``/``Value``."""
+    frames = {title: df for title, df in dfs.items() if not df.empty}
+    if len(frames) == 0:
+        return pd.DataFrame(columns=["Title", "Date", "Value"])
+
+    # Dates are stacked as naive wall clock times, which is all the
+    # transformation looks at, so mixed time zones still share one column
+    dates = []
+    for df in frames.values():
+        date = df["Date"]
+        if not isinstance(date.dtype, DatetimeTZDtype):
+            date = transform_data_base(df.copy())["Date"]
+        if isinstance(date.dtype, DatetimeTZDtype):
+            date = date.dt.tz_localize(None)
+        dates.append(date)
+
+    return pd.DataFrame(
+        {
+            "Title": np.repeat(list(frames), [len(df) for df in frames.values()]),
+            "Date": pd.concat(dates, ignore_index=True),
+            "Value": np.concatenate(
+                [df["Value"].to_numpy(dtype=float) for df in frames.values()]
+            ),
+        }
+    )
+
+
+def merge_matrices(
+    base: AlignedMatrix,
+    update: AlignedMatrix,
+    replaced: Iterable[str],
+    order: list[str],
+) -> AlignedMatrix:
+    """Combine ``update`` into ``base`` on the union of their dates.
+
+    Columns of ``base`` named in ``replaced`` are dropped, the columns of
+    ``update`` are added, and titles are ordered like ``order`` first.
+    """
+    replaced = set(replaced)
+    columns = {title: ("base", i) for i, title in enumerate(base.titles)}
+    for title in replaced:
+        columns.pop(title, None)
+    columns.update({title: ("update", i) for i, title in enumerate(update.titles)})
+
+    titles = [title for title in order if title in columns]
+    listed = set(titles)
+    titles += [title for title in columns if title not in listed]
+
+    if len(base.dates) == 0:
+        dates = update.dates
+    elif len(update.dates) == 0:
+        dates = base.dates
+    else:
+        dates = base.dates.union(update.dates)
+
+    values = np.full((len(dates), len(titles)), np.nan)
+    for source in (base, update):
+        name = "base" if source is base else "update"
+        targets = [i for i, title in enumerate(titles) if columns[title][0] == name]
+        if not targets:
+            continue
+        rows = dates.get_indexer(source.dates)
+        sources = [columns[titles[i]][1] for i in targets]
+        values[np.ix_(rows, targets)] = source.values[:, sources]
+
+    return AlignedMatrix(dates, values, titles)
+
+
+class _Entry:
+    def __init__(self, matrix: AlignedMatrix, tokens: dict[str, Hashable]):
+        self.matrix = matrix
+        # Token of the raw values every title was transformed from
+        self.tokens = tokens
+        # Running totals for windowed correlations, built on first use
+        self.prefix: PrefixSums | None = None
+        self.cross: OrderedDict[bytes, CrossSums] = OrderedDict()
+
+    @property
+    def nbytes(self) -> int:
+        totals = [self.prefix, *self.cross.values()]
+        return self.matrix.values.nbytes + sum(
+            value.nbytes
+            for total in totals
+            if total is not None
+            for value in vars(total).values()
+            if isinstance(value, np.ndarray)
+        )
+
+
+class TransformedDatasetCache:
+    """Aligned matrices of transformed datasets keyed by ``TransformKey``.
+
+    The least recently used transformations are dropped once more than
+    ``max_entries`` are held, and the cross terms of all but the last
+    ``max_test_series`` test series of a transformation are dropped.
+    ``nbytes`` is the size of the arrays held, ``trim`` bounds it.
+    """
+
+    def __init__(self, max_entries: int = 4, max_test_series: int = 8):
+        self.max_entries = max_entries
+        self.max_test_series = max_test_series
+        self.nbytes = 0
+        self._entries: OrderedDict[TransformKey, _Entry] = OrderedDict()
+        # Fingerprints of the dataframes seen, by id while they are alive
+        self._fingerprints: dict[int, tuple[weakref.ref, bytes]] = {}
+        self._lock = threading.Lock()
+        # Held while entries are refreshed, so only one request transforms
+        # them, without blocking ``invalidate`` or ``trim`` meanwhile
+        self._refresh_lock = threading.Lock()
+
+    def get_matrix(
+        self,
+        dfs: Mapping[str, pd.DataFrame],
+        time_increment: AggregationPeriod,
+        fiscal_end_month: str | None,
+        correlation_metric: CorrelationMetric,
+    ) -> AlignedMatrix:
+        """Aligned matrix of the transformed ``dfs``, in the order of ``dfs``."""
+        entry = self._get_entry(
+            dfs, transform_key(time_increment, fiscal_end_month, correlation_metric)
+        )
+        return select_columns(entry.matrix, list(dfs))
+
+    def get_window_sums(
+        self,
+        dfs: Mapping[str, pd.DataFrame],
+        time_increment: AggregationPeriod,
+        fiscal_end_month: str | None,
+        correlation_metric: CorrelationMetric,
+        test_df: pd.DataFrame,
+    ) -> WindowSums:
+        """Running totals to correlate ``test_df`` over any window of years.
+
+        The dataset totals are shared by every request of a transformation,
+        the cross terms are kept for the last few test series so changing
+        only the years of a request reuses them.
+        """
+        entry = self._get_entry(
+            dfs, transform_key(time_increment, fiscal_end_month, correlation_metric)
+        )
+        matrix = select_columns(entry.matrix, list(dfs))
+        test_values = align_series(test_df, matrix.dates)
+
+        if entry.prefix is None:
+            entry.prefix = PrefixSums(entry.matrix.values)
+            self._update_nbytes()
+        prefix = entry.prefix
+
+        fingerprint = test_values.tobytes()
+        with self._lock:
+            cross = entry.cross.get(fingerprint)
+            if cross is not None:
+                entry.cross.move_to_end(fingerprint)
+        if cross is None:
+            cross = CrossSums(test_values, entry.matrix.values, prefix)
+            with self._lock:
+                entry.cross[fingerprint] = cross
+                while len(entry.cross) > self.max_test_series:
+                    entry.cross.popitem(last=False)
+            self._update_nbytes()
+
+        columns = {title: i for i, title in enumerate(entry.matrix.titles)}
+        return WindowSums(
+            matrix,
+            test_values,
+            entry.matrix.values,
+            prefix,
+            cross,
+            np.array([columns[title] for title in matrix.titles], dtype=np.intp),
+        )
+
+    def get_transformed(
+        self,
+        dfs: Mapping[str, pd.DataFrame],
+        time_increment: AggregationPeriod,
+        fiscal_end_month: str | None,
+        correlation_metric: CorrelationMetric,
+    ) -> dict[str, pd.DataFrame]:
+        """Transformed dataframe for every non-empty entry of ``dfs``."""
+        matrix = self.get_matrix(
+            dfs, time_increment, fiscal_end_month, correlation_metric
+        )
+        return {
+            title: column_frame(matrix, column)
+            for column, title in enumerate(matrix.titles)
+        }
+
+    def warm_up(
+        self,
+        dfs: Mapping[str, pd.DataFrame],
+        keys: Iterable[TransformKey],
+    ) -> None:
+        for key in keys:
+            self.get_matrix(dfs, *key)
+
+    def invalidate(self, title: str) -> None:
+        """Re-transform ``title`` the next time it is requested."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.tokens.pop(title, None)
+
+    def trim(self, max_bytes: int) -> None:
+        """Drop the least recently used entries but the last above ``max_bytes``."""
+        with self._lock:
+            while self.nbytes > max_bytes and len(self._entries) > 1:
+                _, entry = self._entries.popitem(last=False)
+                self.nbytes -= entry.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+            self.nbytes = 0
+
+    def _get_entry(self, dfs: Mapping[str, pd.DataFrame], key: TransformKey) -> _Entry:
+        with self._refresh_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(align_datasets({}), {})
+
+            tokens, stale = self._stale(entry, dfs)
+            if stale:
+                entry = self._refresh(entry, stale, tokens, list(dfs), key)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._update_nbytes()
+        return entry
+
+    def _stale(
+        self, entry: _Entry, dfs: Mapping[str, pd.DataFrame]
+    ) -> tuple[dict[str, Hashable], dict[str, pd.DataFrame]]:
+        """Token of every title and the dataframes of those to transform."""
+        known: Mapping[str, Hashable] = {}
+        if isinstance(dfs, LazyDatasets):
+            known = dfs.tokens
+        tokens = {title: known[title] for title in dfs if title in known}
+        unknown = [title for title in dfs if title not in tokens]
+
+        # Titles without a token are read to fingerprint them, unless
+        # reading them gave them one
+        if isinstance(dfs, LazyDatasets):
+            frames = dfs.load(unknown)
+        else:
+            frames = {title: dfs[title] for title in unknown}
+        for title, df in frames.items():
+            if title in known:
+                tokens[title] = known[title]
+            else:
+                tokens[title] = self._fingerprint(df)
+
+        with self._lock:
+            current = dict(entry.tokens)
+        titles = [title for title in dfs if current.get(title) != tokens[title]]
+        missing = [title for title in titles if title not in frames]
+        if isinstance(dfs, LazyDatasets):
+            frames.update(dfs.load(missing))
+        else:
+            frames.update({title: dfs[title] for title in missing})
+        return tokens, {title: frames[title] for title in titles}
+
+    def _fingerprint(self, df: pd.DataFrame) -> bytes:
+        # Single dict operations, the weakref callback may run while the
+        # lock is held by this thread
+        key = id(df)
+        known = self._fingerprints.get(key)
+        if known is not None and known[0]() is df:
+            return known[1]
+
+        digest = fingerprint(df)
+        self._fingerprints[key] = (
+            weakref.ref(df, lambda _: self._fingerprints.pop(key, None)),
+            digest,
+        )
+        return digest
+
+    def _update_nbytes(self) -> None:
+        with self._lock:
+            self.nbytes = sum(entry.nbytes for entry in self._entries.values())
+
+    @staticmethod
+    def _refresh(
+        entry: _Entry,
+        stale: dict[str, pd.DataFrame],
+        tokens: dict[str, Hashable],
+        order: list[str],
+        key: TransformKey,
+    ) -> _Entry:
+        # Build a new entry instead of mutating the old one, requests may
+        # still be reading its matrix
+        time_increment, fiscal_end_month, correlation_metric = key
+        update = align_long(
+            transform_data_batch(
+                long_format(stale), time_increment, fiscal_end_month, correlation_metric
+            )
+        )
+        matrix = merge_matrices(entry.matrix, update, stale.keys(), order)
+        return _Entry(
+            matrix, {**entry.tokens, **{title: tokens[title] for title in stale}}
+        )
+
+
+TRANSFORMED_CACHE = TransformedDatasetCache(
+    max_entries=getattr(settings, "TRANSFORM_CACHE_MAX_ENTRIES", 4)
+)
@@ -198,6 +198,52 @@ RUST_ENGINE_URL = env.str(
     "RUST_ENGINE_URL",
     default="https://api2.correlatefinance.com",  # type:ignore
 )
+# Correlation engine, "rust" posts to RUST_ENGINE_URL and "local" runs in-process
+CORRELATION_ENGINE = env.str("CORRELATION_ENGINE", default="rust")  # type:ignore
+# Number of (aggregation period, fiscal month, metric) transformations kept in memory
+TRANSFORM_CACHE_MAX_ENTRIES = env.int(
+    "TRANSFORM_CACHE_MAX_ENTRIES",
+    default=4,  # type:ignore
+)
+# Seconds between checks of the data version behind the in-memory datasets
+DATASET_CACHE_CHECK_INTERVAL = env.float(
+    "DATASET_CACHE_CHECK_INTERVAL",
+    default=5.0,  # type:ignore
+)
+# Snapshot file written by write_dataset_snapshot, datasets are mapped from it
+DATASET_SNAPSHOT_PATH = env.str("DATASET_SNAPSHOT_PATH", default="")  # type:ignore
+# Load the datasets in the background when the app starts
+DATASET_CACHE_WARM_UP = env.bool("DATASET_CACHE_WARM_UP", default=False)  # type:ignore
+# Bytes of datasets and transformed matrices kept in memory per process, 0 keeps
+# every visible dataset
+DATASET_CACHE_MAX_BYTES = env.int("DATASET_CACHE_MAX_BYTES", default=0)  # type:ignore
+# Sources whose datasets are never evicted when DATASET_CACHE_MAX_BYTES is set
+DATASET_CACHE_PINNED_SOURCES = env.list(
+    "DATASET_CACHE_PINNED_SOURCES",
+    default=[],  # type:ignore
+)
+# Seconds the datasets of a source stay pinned after some were requested by name
+DATASET_CACHE_RECENT_SECONDS = env.float(
+    "DATASET_CACHE_RECENT_SECONDS",
+    default=600.0,  # type:ignore
+)
+# Bytes of single datasets kept in memory for charts while the datasets aren't loaded
+SERIES_CACHE_MAX_BYTES = env.int(
+    "SERIES_CACHE_MAX_BYTES",
+    default=64 * 2**20,  # type:ignore
+)
+# Computed series of saved indexes kept in memory, per index and transformation
+INDEX_CACHE_MAX_ENTRIES = env.int(
+    "INDEX_CACHE_MAX_ENTRIES",
+    default=256,  # type:ignore
+)
+# Worker processes sharing a correlation request, 1 keeps it on the request thread
+CORRELATION_WORKERS = env.int("CORRELATION_WORKERS", default=1)  # type:ignore
+# Dates x datasets x (lags + 1) above which a request is split across the workers
+CORRELATION_PARALLEL_THRESHOLD = env.int(
+    "CORRELATION_PARALLEL_THRESHOLD",
+    default=50_000_000,  # type:ignore
+)
 
 # Celery
 CELERY_BROKER_URL = env.str("CLOUDAMQP_URL", default="amqp://localhost")  # type:ignore
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class DatasetsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "datasets"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from datasets.models import DatasetMetadata
+        from datasets.orm.dataset_metadata_orm import invalidate_metadata_index
+
+        post_save.connect(invalidate_metadata_index, sender=DatasetMetadata)
+        post_delete.connect(invalidate_metadata_index, sender=DatasetMetadata)
+
+        if settings.DATASET_CACHE_WARM_UP:
+            from datasets.orm.dataset_orm import DATASET_CACHE
+
+            DATASET_CACHE.warm_up()
@@ -4,21 +4,49 @@ from core.data_processing import (
     transform_metric,
     transform_quarterly,
 )
-from core.main_logic import correlate_datasets, create_index
-from datasets.models import AggregationPeriod, CorrelationMetric
+from core.correlation_engine import (
+    AlignedMatrix,
+    CorrelationResult,
+    align_datasets,
+    align_series,
+    correlate_matrix,
+    correlate_window,
+    year_mask,
+)
+from core.correlation_pool import correlate
+from core.index_cache import INDEX_CACHE, index_key
+from core.index_engine import build_indexes
+from core.main_logic import transform_and_align
+from core.transform_cache import TRANSFORMED_CACHE, column_frame
+from datasets.models import AggregationPeriod, CorrelationMetric, Month
+from datasets.models import CorrelationMethod, PValueAdjustment
 from datasets.models import CorrelateData
 from datasets.models import Index
-from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from users.models import User
 from adapters.discounting_cash_flows import fetch_stock_data, fetch_segment_data
 from datasets.orm.correlation_parameters_orm import insert_automatic_correlation
+from datasets.orm.dataset_metadata_orm import augment_with_metadata
+from datasets.orm.dataset_orm import get_all_dfs, get_data_version
+from datasets.orm.index_orm import get_index_weights
 import json
+from collections.abc import Iterator
+from itertools import islice
+import numpy as np
 import requests
 import urllib.parse
 from datetime import datetime
-from datasets.models import CorrelateDataPoint, CorrelationParameters, IndexDataset
+from datasets.models import CorrelationParameters
 from django.conf import settings
 
+# Rows materialized and augmented with metadata at a time when streaming
+STREAM_BATCH_SIZE = 100
+
 
 def run_correlations_rust(
     correlation_parameters: CorrelationParameters,
@@ -52,10 +80,11 @@ def run_correlations_rust(
         "correlation_metric": correlation_parameters.correlation_metric.value,
         "start_year": start_year,
         "end_year": end_year,
-        include_data: str(include_data).lower(),
     }
     if limit:
         request_parameters["limit"] = limit
+    if not include_data:
+        request_parameters["include_data"] = "false"
 
     query_string = urllib.parse.urlencode(request_parameters)
     response = requests.post(url + query_string, data=json.dumps(body))
@@ -65,6 +94,205 @@ def run_correlations_rust(
     return JsonResponse(json_response)
 
 
+def run_correlations_local(
+    correlation_parameters: CorrelationParameters,
+    test_df: pd.DataFrame,
+    selected_datasets: list[str] | None = None,
+    limit: int | None = None,
+    include_data: bool = True,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    stream: bool = False,
+) -> HttpResponse:
+    """Serve the rust engine's /correlate_input contract in-process.
+
+    With ``stream`` the response is newline-delimited JSON, see
+    ``stream_correlations``.
+    """
+    start_year = correlation_parameters.start_year
+    end_year = correlation_parameters.end_year
+
+    if start_year is None or end_year is None:
+        return JsonResponse({"error": "Invalid date format"})
+
+    aggregation_period = AggregationPeriod(correlation_parameters.aggregation_period)
+    correlation_metric = CorrelationMetric(correlation_parameters.correlation_metric)
+    fiscal_end_month = Month(correlation_parameters.fiscal_year_end).value
+
+    dfs = get_all_dfs(selected_names=selected_datasets or None)
+    correlation_method = CorrelationMethod(correlation_parameters.correlation_method)
+    if (
+        correlation_parameters.lag_periods == 0
+        and correlation_method == CorrelationMethod.PEARSON
+    ):
+        # Without lags the years are a window over cached running totals
+        window_sums = TRANSFORMED_CACHE.get_window_sums(
+            dfs, aggregation_period, fiscal_end_month, correlation_metric, test_df
+        )
+        result = correlate_window(
+            window_sums,
+            start_year,
+            end_year,
+            limit=limit,
+            p_value_adjustment=p_value_adjustment,
+        )
+    else:
+        matrix = transform_and_align(
+            dfs, aggregation_period, fiscal_end_month, correlation_metric
+        )
+        test_values = align_series(test_df, matrix.dates)
+        test_values[~year_mask(matrix.dates, start_year, end_year)] = np.nan
+
+        result = correlate(
+            matrix,
+            test_values,
+            lag_periods=correlation_parameters.lag_periods,
+            limit=limit,
+            p_value_adjustment=p_value_adjustment,
+            correlation_method=correlation_method,
+        )
+    if stream:
+        header = CorrelateData(
+            data=[],
+            aggregation_period=aggregation_period,
+            correlation_metric=correlation_metric,
+            fiscalYearEnd=fiscal_end_month,
+        ).model_dump(mode="json", exclude={"data"})
+        header["correlation_parameters_id"] = correlation_parameters.id
+        header["count"] = len(result)
+        return StreamingHttpResponse(
+            stream_correlations(result, header, include_data=include_data),
+            content_type="application/x-ndjson",
+        )
+
+    correlate_data = result.to_correlate_data(
+        aggregation_period,
+        correlation_metric,
+        include_data=include_data,
+        fiscal_year_end=fiscal_end_month,
+    )
+    augment_with_metadata(correlate_data.data)
+
+    json_response = correlate_data.model_dump()
+    # Add the id for the correlation parameters to the response
+    json_response["correlation_parameters_id"] = correlation_parameters.id
+    return JsonResponse(json_response)
+
+
+def stream_correlations(
+    result: CorrelationResult, header: dict, include_data: bool = True
+) -> Iterator[str]:
+    """Yield ``header`` and then every row of ``result`` as one JSON line each.
+
+    Rows are built and augmented with metadata ``STREAM_BATCH_SIZE`` at a time,
+    so the first ones are sent before the rest exist.
+    """
+    yield json.dumps(header) + "\n"
+
+    points = result.iter_data_points(include_data=include_data)
+    while batch := list(islice(points, STREAM_BATCH_SIZE)):
+        augment_with_metadata(batch)
+        for point in batch:
+            yield point.model_dump_json() + "\n"
+
+
+def run_correlations(
+    correlation_parameters: CorrelationParameters,
+    test_df: pd.DataFrame,
+    selected_datasets: list[str] | None = None,
+    limit: int | None = None,
+    include_data: bool = True,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    stream: bool = False,
+) -> HttpResponse:
+    """Run correlations on the engine selected by ``settings.CORRELATION_ENGINE``.
+
+    P-value adjustment is only available on the local engine, and rank
+    correlations and streamed responses always run on it.
+    """
+    if (
+        settings.CORRELATION_ENGINE == "local"
+        or correlation_parameters.correlation_method != CorrelationMethod.PEARSON
+        or stream
+    ):
+        return run_correlations_local(
+            correlation_parameters=correlation_parameters,
+            test_df=test_df,
+            selected_datasets=selected_datasets,
+            limit=limit,
+            include_data=include_data,
+            p_value_adjustment=p_value_adjustment,
+            stream=stream,
+        )
+
+    return run_correlations_rust(
+        correlation_parameters=correlation_parameters,
+        test_df=test_df,
+        selected_datasets=selected_datasets,
+        limit=limit,
+        include_data=include_data,
+    )
+
+
+def index_matrix(
+    indexes: list[Index],
+    aggregation_period: AggregationPeriod,
+    correlation_metric: CorrelationMetric,
+    fiscal_end_month: str,
+) -> AlignedMatrix:
+    """Aligned series of saved ``indexes``, one column titled by index name.
+
+    Series come from ``INDEX_CACHE`` and only the indexes missing from it are
+    computed, together as one weight matrix. Cached series are only used at
+    the data version they were computed at, which ingestion in another
+    process bumps.
+    """
+    version = INDEX_CACHE.version
+    data_version = get_data_version()
+    keys = {
+        index.id: index_key(
+            index.id, aggregation_period, fiscal_end_month, correlation_metric
+        )
+        for index in indexes
+    }
+    updated_at = {index.id: index.updated_at for index in indexes}
+    series = {
+        index_id: INDEX_CACHE.get(key, updated_at[index_id], data_version)
+        for index_id, key in keys.items()
+    }
+
+    missing = [index_id for index_id, frame in series.items() if frame is None]
+    if missing:
+        weights = get_index_weights(missing)
+        names = sorted(set().union(*weights.values()))
+        matrix = transform_and_align(
+            get_all_dfs(selected_names=names) if names else {},
+            aggregation_period,
+            fiscal_end_month,
+            correlation_metric,
+        )
+        computed = build_indexes(
+            matrix,
+            [(str(index_id), weights[index_id]) for index_id in missing],
+            correlation_metric,
+        )
+        for column, index_id in enumerate(missing):
+            series[index_id] = column_frame(computed, column)
+            INDEX_CACHE.put(
+                keys[index_id],
+                series[index_id],
+                weights[index_id],
+                version,
+                updated_at[index_id],
+                data_version,
+            )
+
+    aligned = align_datasets({str(index.id): series[index.id] for index in indexes})
+    titles = {str(index.id): index.name for index in indexes}
+    return AlignedMatrix(
+        aligned.dates, aligned.values, [titles[title] for title in aligned.titles]
+    )
+
+
 def correlate_indexes(
     indexes: list[Index],
     aggregation_period: AggregationPeriod,
@@ -72,33 +300,20 @@ def correlate_indexes(
     fiscal_end_month: str,
     test_df: pd.DataFrame,
 ) -> HttpResponse:
-    results: list[CorrelateDataPoint] = []
+    """Correlate saved indexes against ``test_df`` in one batch."""
     if aggregation_period == AggregationPeriod.QUARTERLY:
         test_df = transform_quarterly(test_df, fiscal_end_month)
-    for index in indexes:
-        index_df = create_index(
-            dataset_weights={
-                index_dataset.dataset.internal_name: index_dataset.weight
-                for index_dataset in IndexDataset.objects.filter(
-                    index=index
-                ).prefetch_related("dataset")
-            },
-            aggregation_period=aggregation_period,
-            correlation_metric=correlation_metric,
-            fiscal_end_month=fiscal_end_month,
-        )
-        if index_df is None:
-            continue
 
-        result = correlate_datasets(df=index_df, test_df=test_df, df_title=index.name)
-        if result:
-            results.extend(result)
+    matrix = index_matrix(
+        indexes, aggregation_period, correlation_metric, fiscal_end_month
+    )
+    result = correlate_matrix(matrix, align_series(test_df, matrix.dates))
 
     return JsonResponse(
-        CorrelateData(
-            data=results,
-            aggregation_period=aggregation_period,
-            correlation_metric=correlation_metric,
+        result.to_correlate_data(
+            aggregation_period,
+            correlation_metric,
+            fiscal_year_end=fiscal_end_month,
         ).model_dump()
     )
 
@@ -116,6 +331,9 @@ def generate_stock_correlations(
     selected_datasets: list[str] | None = None,
     include_data: bool = True,
     limit: int | None = None,
+    p_value_adjustment: PValueAdjustment = PValueAdjustment.NONE,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
+    stream: bool = False,
 ) -> HttpResponse:
     segment_data = None
     if segment is not None:
@@ -184,14 +402,17 @@ def generate_stock_correlations(
             lag_periods=lag_periods,
             fiscal_year_end=fiscal_end_month,
             company_metric=segment,
+            correlation_method=correlation_method,
         )
 
-        return run_correlations_rust(
+        return run_correlations(
             correlation_parameters=correlation_parameters,
             test_df=test_df,
             selected_datasets=selected_datasets,
             limit=limit,
             include_data=include_data,
+            p_value_adjustment=p_value_adjustment,
+            stream=stream,
         )
 
 
@@ -0,0 +1,179 @@
+"""In-memory search over the visible dataset metadata.
+
+Every word of the external and internal names, description, source, release
+and categories is a token, with the positions of the datasets containing it.
+Query words match tokens they are a prefix of, so the tokens starting with a
+word are a contiguous range of the sorted vocabulary. Facets are exact
+matches on source, release and categories. Matches are then ordered by
+precomputed ranks and paginated with a cursor holding the sort key of the
+last result, which stays valid when the index is rebuilt.
+"""
+
+import base64
+import bisect
+import json
+import re
+from collections.abc import Sequence
+
+import numpy as np
+
+from datasets.models import DatasetMetadata
+
+FACETS = ("source", "release", "categories")
+MAX_LIMIT = 200
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Sort key of a dataset for an order, higher popularity first and missing last
+SortKey = tuple[bool, int, bool, int, int]
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def _sort_key(first: int | None, second: int | None, id: int) -> SortKey:
+    return (first is None, -(first or 0), second is None, -(second or 0), id)
+
+
+def encode_cursor(key: SortKey) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    types = (bool, int, bool, int, int)
+    if not (
+        isinstance(key, list)
+        and len(key) == len(types)
+        and all(type(value) is t for value, t in zip(key, types))
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(key)  # type: ignore
+
+
+class MetadataSearchIndex:
+    """Inverted index over ``metadatas``, whose serialized form is ``items``."""
+
+    ORDERS = ("popularity", "group_popularity")
+
+    def __init__(self, metadatas: Sequence[DatasetMetadata], items: Sequence[dict]):
+        self._items = list(items)
+        postings: dict[str, list[int]] = {}
+        facets: dict[str, dict[str, list[int]]] = {facet: {} for facet in FACETS}
+        for position, metadata in enumerate(metadatas):
+            categories = [c for c in metadata.categories or [] if c is not None]
+            text = " ".join(
+                field
+                for field in (
+                    metadata.external_name,
+                    metadata.internal_name,
+                    metadata.description,
+                    metadata.source,
+                    metadata.release,
+                    *categories,
+                )
+                if field
+            )
+            for token in set(tokenize(text)):
+                postings.setdefault(token, []).append(position)
+            for facet, values in (
+                ("source", [metadata.source]),
+                ("release", [metadata.release]),
+                ("categories", categories),
+            ):
+                for value in set(values):
+                    if value is not None:
+                        facets[facet].setdefault(value, []).append(position)
+
+        self._tokens = sorted(postings)
+        self._postings = [np.array(postings[t], dtype=np.int64) for t in self._tokens]
+        self._facets = {
+            facet: {value: np.array(p, dtype=np.int64) for value, p in values.items()}
+            for facet, values in facets.items()
+        }
+
+        # Per order the sort keys by rank and the rank of every position
+        self._keys: dict[str, list[SortKey]] = {}
+        self._ranks: dict[str, np.ndarray] = {}
+        self._positions: dict[str, np.ndarray] = {}
+        for order in self.ORDERS:
+            other = "group_popularity" if order == "popularity" else "popularity"
+            keys = [
+                _sort_key(getattr(m, order), getattr(m, other), m.id) for m in metadatas
+            ]
+            positions = np.array(
+                sorted(range(len(keys)), key=keys.__getitem__), dtype=np.int64
+            )
+            ranks = np.empty(len(keys), dtype=np.int64)
+            ranks[positions] = np.arange(len(keys))
+            self._keys[order] = [keys[p] for p in positions]
+            self._ranks[order] = ranks
+            self._positions[order] = positions
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _token_mask(self, word: str) -> np.ndarray:
+        start = bisect.bisect_left(self._tokens, word)
+        # Tokens starting with ``word`` sort before ``word`` followed by U+10FFFF
+        stop = bisect.bisect_left(self._tokens, word + "\U0010ffff", lo=start)
+        mask = np.zeros(len(self), dtype=bool)
+        if stop > start:
+            mask[np.concatenate(self._postings[start:stop])] = True
+        return mask
+
+    def _facet_mask(self, facet: str, values: Sequence[str]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for value in values:
+            positions = self._facets[facet].get(value)
+            if positions is not None:
+                mask[positions] = True
+        return mask
+
+    def search(
+        self,
+        query: str = "",
+        facets: dict[str, Sequence[str]] | None = None,
+        order: str = "popularity",
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> dict:
+        """One page of the datasets matching every word of ``query``.
+
+        Within a facet any of the values matches, across facets all must.
+        """
+        if order not in self.ORDERS:
+            raise ValueError(f"Order must be one of {', '.join(self.ORDERS)}")
+        if not 0 < limit <= MAX_LIMIT:
+            raise ValueError(f"Limit must be between 1 and {MAX_LIMIT}")
+
+        mask = np.ones(len(self), dtype=bool)
+        for word in tokenize(query):
+            mask &= self._token_mask(word)
+        for facet, values in (facets or {}).items():
+            if facet not in self._facets:
+                raise ValueError(f"Facets must be among {', '.join(FACETS)}")
+            if values:
+                mask &= self._facet_mask(facet, values)
+
+        ranks = self._ranks[order][mask]
+        count = len(ranks)
+        if cursor is not None:
+            after = bisect.bisect_right(self._keys[order], decode_cursor(cursor))
+            ranks = ranks[ranks >= after]
+        if len(ranks) > limit:
+            ranks = np.partition(ranks, limit)[: limit + 1]
+        ranks = np.sort(ranks)
+
+        page = ranks[:limit]
+        next_cursor = None
+        if len(ranks) > limit:
+            next_cursor = encode_cursor(self._keys[order][page[-1]])
+        return {
+            "count": count,
+            "results": [self._items[p] for p in self._positions[order][page]],
+            "next_cursor": next_cursor,
+        }
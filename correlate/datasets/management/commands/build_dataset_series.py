@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from datasets.models import DatasetMetadata
+from datasets.orm.dataset_orm import update_dataset_series
+
+
+class Command(BaseCommand):
+    help = (
+        "Packs the rows of every dataset into one DatasetSeries row each, so "
+        "datasets are loaded with one fetch per series. Ingestion keeps them in "
+        "sync afterwards, run once after migrating or to repair them."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Number of datasets packed per query",
+            default=500,
+        )
+
+    def handle(self, *args, **options):
+        start_time = datetime.now()
+        batch_size = options["batch_size"]
+        metadata_ids = list(
+            DatasetMetadata.objects.order_by("id").values_list("id", flat=True)
+        )
+        for start in range(0, len(metadata_ids), batch_size):
+            update_dataset_series(metadata_ids[start : start + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Packed {len(metadata_ids)} datasets in {datetime.now() - start_time}"
+            )
+        )
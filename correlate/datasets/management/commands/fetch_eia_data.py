@@ -4,6 +4,7 @@ from adapters.eia import (
     fetch_and_store_eia_series,
     BLOCKED_SERIES,
 )
+from datasets.orm.dataset_orm import ingestion_run
 
 
 class Command(BaseCommand):
@@ -19,6 +20,7 @@ class Command(BaseCommand):
         )
         return super().add_arguments(parser)
 
+    @ingestion_run()
     def handle(self, *args, **options):
         all_series = fetch_all_eia_series()
         for series_id in all_series[: int(options["n"])]:
@@ -7,7 +7,7 @@ import itertools
 import requests
 from datasets.models import DatasetMetadata
 from dateutil import parser
-from datasets.orm.dataset_orm import add_dataset_bulk
+from datasets.orm.dataset_orm import ingestion_run, upsert_dataset
 
 
 BASE_URL = "http://ec.europa.eu/eurostat/api/dissemination/statistics/1.0/data/"
@@ -55,9 +55,10 @@ def parse_and_store_observations(
     dataset_metadata = DatasetMetadata.objects.create(
         internal_name=series_id, **defaults
     )
-    add_dataset_bulk(data_points, dataset_metadata)
+    upsert_dataset(data_points, dataset_metadata)
 
 
+@ingestion_run()
 def get_eurostat_data(series_id, params, suffix=""):
     querystring = urllib.parse.urlencode(params)
     URL = BASE_URL + series_id + "?" + querystring
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from datasets.models import Dataset, DatasetMetadata
-from datasets.orm.dataset_orm import add_dataset_bulk
+from datasets.orm.dataset_orm import ingestion_run, upsert_dataset
 from adapters.fred import (
     fetch_fred_data,
     fetch_fred_metadata,
@@ -34,6 +34,7 @@ class Command(BaseCommand):
             default=None,
         )
 
+    @ingestion_run()
     def handle(self, *args, **options):
         series_id = options["series_id"]
         tags = options["tag"]
@@ -85,8 +86,11 @@ class Command(BaseCommand):
                         "description": series_metadata["notes"],
                     },
                 )
-                total_new = add_dataset_bulk(records, dataset_metadata)
-                self.stdout.write(f"Added {total_new} new records to the database")
+                result = upsert_dataset(records, dataset_metadata)
+                self.stdout.write(
+                    f"Added {result.inserted} new & updated {result.updated} "
+                    "records in the database"
+                )
             else:
                 defaults = {
                     "external_name": metadata[series_id]["title"],
@@ -102,5 +106,8 @@ class Command(BaseCommand):
                     internal_name=series_id,
                     defaults=defaults,
                 )
-                total_new = add_dataset_bulk(records, dataset_metadata)
-                self.stdout.write(f"Added {total_new} new records to the database")
+                result = upsert_dataset(records, dataset_metadata)
+                self.stdout.write(
+                    f"Added {result.inserted} new & updated {result.updated} "
+                    "records in the database"
+                )
@@ -1,10 +1,10 @@
 from django.core.management.base import BaseCommand, CommandParser
 from adapters.eia import fetch_eia_data, fetch_records_from_eia_data
 from datasets.lib.email import create_new_data_report_email
-from datasets.models import DatasetMetadata, Dataset
+from datasets.models import DatasetMetadata
 from datetime import datetime
 import pytz
-from datasets.orm.dataset_orm import add_dataset_bulk
+from datasets.orm.dataset_orm import ingestion_run, upsert_dataset
 from django.conf import settings
 from django.core.mail import send_mail
 from django.utils.html import strip_tags
@@ -30,6 +30,7 @@ class Command(BaseCommand):
 
         return super().add_arguments(parser)
 
+    @ingestion_run()
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
         n = options["n"]
@@ -60,36 +61,13 @@ class Command(BaseCommand):
                 if record[0] > datetime(2000, 1, 1, tzinfo=pytz.utc)
             ]
 
-            stored_records = Dataset.objects.filter(metadata=dataset).values_list(
-                "date", "value"
+            result = upsert_dataset(records, dataset, dry_run=dry_run)
+            if result.inserted:
+                added_records.append((series_id, result.inserted))
+            updated_records.extend(
+                (series_id, date, new_value, old_value)
+                for date, new_value, old_value in result.revisions
             )
-            stored_records_map = {record[0]: record[1] for record in stored_records}
-            records_map = {record[0]: record[1] for record in records}
-
-            new_records = []
-            records_to_update = []
-
-            for date, value in records_map.items():
-                if date in stored_records_map:
-                    if stored_records_map[date] != value:
-                        records_to_update.append((date, value))
-                else:
-                    new_records.append((date, value))
-
-            if len(new_records) > 0:
-                added_records.append((series_id, len(new_records)))
-                if not dry_run:
-                    add_dataset_bulk(new_records, dataset)
-
-            if records_to_update:
-                for record in records_to_update:
-                    if not dry_run:
-                        Dataset.objects.filter(metadata=dataset, date=record[0]).update(
-                            value=record[1]
-                        )
-                    updated_records.append(
-                        (series_id, record[0], record[1], stored_records_map[record[0]])
-                    )
 
             if not dry_run:
                 dataset.updated_at = datetime.now()
@@ -97,7 +75,7 @@ class Command(BaseCommand):
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Added {len(new_records)} & Updated {len(records_to_update)} records for {series_id} in {datetime.now() - start_time}"
+                    f"Added {result.inserted} & Updated {result.updated} records for {series_id} in {datetime.now() - start_time}"
                 )
             )
 
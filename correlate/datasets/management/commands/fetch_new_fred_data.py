@@ -1,8 +1,8 @@
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from datasets.lib.email import create_new_data_report_email
-from datasets.models import Dataset, DatasetMetadata
-from datasets.orm.dataset_orm import add_dataset_bulk
+from datasets.models import DatasetMetadata
+from datasets.orm.dataset_orm import ingestion_run, upsert_dataset
 from datasets.management.commands.denylisted.manual import MANUAL_DENYLIST
 from datasets.management.commands.denylisted.pairwise_clusters import PAIRWISE_CLUSTERS
 from datasets.management.commands.fetch_fred_data import fetch_fred_data
@@ -23,6 +23,7 @@ class Command(BaseCommand):
             help="Whether to run the command in dry run mode",
         )
 
+    @ingestion_run()
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
 
@@ -39,50 +40,20 @@ class Command(BaseCommand):
         for dataset in datasets:
             series_id = dataset.internal_name
             records = fetch_fred_data(series_id, self.stdout)
-            stored_records = Dataset.objects.filter(metadata=dataset).values_list(
-                "date", "value"
+            result = upsert_dataset(records, dataset, dry_run=dry_run)
+            if result.inserted:
+                added_records.append((series_id, result.inserted))
+            updated_records.extend(
+                (series_id, date, new_value, old_value)
+                for date, new_value, old_value in result.revisions
             )
-            stored_record_map = {record[0]: record[1] for record in stored_records}
-
-            # Check if the data is already stored
-            stored_dates = set([record[0] for record in stored_records])
-            new_records = [
-                record for record in records if record[0] not in stored_dates
-            ]
-
-            records_to_update = [
-                record
-                for record in (set(records) - set(stored_records))
-                if record not in new_records
-            ]
-
-            if new_records:
-                if not dry_run:
-                    add_dataset_bulk(new_records, dataset)
-                added_records.append((series_id, len(new_records)))
-
-            if records_to_update:
-                for record in records_to_update:
-                    if not dry_run:
-                        Dataset.objects.filter(metadata=dataset, date=record[0]).update(
-                            value=record[1]
-                        )
-
-                    updated_records.append(
-                        (
-                            series_id,
-                            record[0],
-                            record[1],
-                            stored_record_map.get(record[0], None),
-                        )
-                    )
 
             dataset.updated_at = datetime.now()
             dataset.save()
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Added {len(new_records)} & Updated {len(records_to_update)} records for {series_id}"
+                    f"Added {result.inserted} & Updated {result.updated} records for {series_id}"
                 )
             )
 
@@ -0,0 +1,97 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.main_logic import transform_and_align
+from core.pairwise import BLOCK_SIZE, THRESHOLD, pairwise_correlation
+from datasets.models import AggregationPeriod, CorrelationMetric, Month
+from datasets.orm.dataset_orm import get_all_dfs
+
+
+class Command(BaseCommand):
+    help = (
+        "Correlates every pair of datasets into a memory-mapped .npy file and "
+        "reports average correlations and near duplicate datasets."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Path of the .npy file, titles are written next to it",
+            default="pairwise_correlation.npy",
+        )
+        parser.add_argument(
+            "--aggregation_period",
+            type=str,
+            choices=[period.value for period in AggregationPeriod],
+            default=AggregationPeriod.QUARTERLY.value,
+        )
+        parser.add_argument(
+            "--fiscal_end_month",
+            type=str,
+            choices=[month.value for month in Month],
+            default=Month.DECEMBER.value,
+        )
+        parser.add_argument(
+            "--correlation_metric",
+            type=str,
+            choices=[metric.value for metric in CorrelationMetric],
+            default=CorrelationMetric.RAW_VALUE.value,
+        )
+        parser.add_argument(
+            "--block_size",
+            type=int,
+            help="Number of datasets per block",
+            default=BLOCK_SIZE,
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of worker processes, defaults to the number of CPUs",
+            default=None,
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            help="Report pairs of datasets correlating above this value",
+            default=THRESHOLD,
+        )
+
+    def handle(self, *args, **options):
+        start_time = datetime.now()
+        output = options["output"]
+
+        matrix = transform_and_align(
+            get_all_dfs(),
+            AggregationPeriod(options["aggregation_period"]),
+            options["fiscal_end_month"],
+            CorrelationMetric(options["correlation_metric"]),
+        )
+        summary = pairwise_correlation(
+            matrix,
+            output,
+            block_size=options["block_size"],
+            workers=options["workers"],
+            threshold=options["threshold"],
+        )
+
+        titles_path = output.removesuffix(".npy") + ".titles.json"
+        with open(titles_path, "w") as titles_file:
+            json.dump(matrix.titles, titles_file)
+
+        self.stdout.write("Average correlations:")
+        for title, average in summary.averages.items():
+            self.stdout.write(f"{title}\t{average:.4f}")
+
+        self.stdout.write(f"Correlations above {options['threshold']}:")
+        for title, others in summary.top_correlations.items():
+            self.stdout.write("\t".join([title, *others]))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Correlated {len(matrix)} datasets into {output} in "
+                f"{datetime.now() - start_time}"
+            )
+        )
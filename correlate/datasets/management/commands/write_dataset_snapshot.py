@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from core.dataset_snapshot import write_snapshot
+from datasets.orm.dataset_orm import get_data_version, load_dfs
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes every visible dataset to a memory-mapped snapshot file that web "
+        "processes load instead of querying the database. Run after ingestion."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--path",
+            type=str,
+            help="Snapshot file, defaults to settings.DATASET_SNAPSHOT_PATH",
+            default=settings.DATASET_SNAPSHOT_PATH,
+        )
+
+    def handle(self, *args, **options):
+        start_time = datetime.now()
+        path = options["path"]
+        if not path:
+            raise CommandError("Pass --path or set DATASET_SNAPSHOT_PATH")
+
+        # Read the version first, a bump during the load leaves it stale
+        version = get_data_version()
+        dfs = load_dfs()
+        write_snapshot(path, dfs, version)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {len(dfs)} datasets at version {version} to {path} in "
+                f"{datetime.now() - start_time}"
+            )
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-18 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datasets", "0022_alter_correlationparameters_fiscal_year_end"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="correlationparameters",
+            name="correlation_method",
+            field=models.CharField(
+                choices=[("PEARSON", "PEARSON"), ("SPEARMAN", "SPEARMAN")],
+                default="PEARSON",
+                max_length=255,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 01:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datasets", "0024_dataversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetSeries",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("start", models.DateTimeField()),
+                ("frequency", models.CharField(blank=True, max_length=32, null=True)),
+                ("dates", models.BinaryField(blank=True, null=True)),
+                ("values", models.BinaryField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "metadata",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="series",
+                        to="datasets.datasetmetadata",
+                    ),
+                ),
+            ],
+        ),
+    ]
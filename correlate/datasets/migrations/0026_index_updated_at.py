@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-18 09:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("datasets", "0025_datasetseries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="index",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -39,6 +39,19 @@ class CorrelationMetric(str, Enum):
 CorrelationMetricChoices = tuple((size.value, size.name) for size in CorrelationMetric)
 
 
+class CorrelationMethod(str, Enum):
+    PEARSON = "PEARSON"
+    SPEARMAN = "SPEARMAN"
+
+
+CorrelationMethodChoices = tuple((size.value, size.name) for size in CorrelationMethod)
+
+
+class PValueAdjustment(str, Enum):
+    NONE = "NONE"
+    BENJAMINI_HOCHBERG = "BENJAMINI_HOCHBERG"
+
+
 class CompanyMetric(str, Enum):
     REVENUE = "revenue"
     COST_OF_REVENUE = "costOfRevenue"
@@ -143,6 +156,39 @@ class Dataset(models.Model):
         return f"{self.metadata.name}"
 
 
+class DatasetSeries(models.Model):
+    """Every value of a dataset in a single row, kept in sync with ``Dataset``.
+
+    See ``core.packed_series`` for how ``start``, ``frequency``, ``dates`` and
+    ``values`` describe the series.
+    """
+
+    id = models.AutoField(primary_key=True)
+    metadata = models.OneToOneField(
+        DatasetMetadata, on_delete=models.CASCADE, related_name="series"
+    )
+    start = models.DateTimeField()
+    frequency = models.CharField(max_length=32, blank=True, null=True)
+    dates = models.BinaryField(blank=True, null=True)
+    values = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.metadata.name}"
+
+
+class DataVersion(models.Model):
+    """Counter bumped whenever ingestion writes dataset values.
+
+    A single row, processes compare it with the version of the datasets they
+    hold in memory to know when to reload them.
+    """
+
+    id = models.AutoField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
 class Index(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -150,6 +196,8 @@ class Index(models.Model):
     aggregation_period = models.CharField(max_length=255, blank=True, null=True)
     correlation_metric = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Cached index series computed before this are stale, in every process
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.email} - {self.name}"
@@ -179,6 +227,11 @@ class CorrelationParameters(models.Model):
     correlation_metric: CorrelationMetric = models.CharField(  # type: ignore
         max_length=255, choices=CorrelationMetricChoices
     )
+    correlation_method: CorrelationMethod = models.CharField(  # type: ignore
+        max_length=255,
+        choices=CorrelationMethodChoices,
+        default=CorrelationMethod.PEARSON.value,
+    )
     aggregation_period: AggregationPeriod = models.CharField(  # type: ignore
         max_length=255, choices=AggregationPeriodChoices
     )
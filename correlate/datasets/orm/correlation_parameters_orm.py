@@ -2,6 +2,7 @@ from datasets.lib.date import parse_year_from_date
 from datasets.models import (
     CorrelationParameters,
     AggregationPeriod,
+    CorrelationMethod,
     CorrelationMetric,
     Month,
 )
@@ -18,6 +19,7 @@ def insert_automatic_correlation(
     lag_periods: int,
     fiscal_year_end: Month,
     company_metric: str | None = None,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
 ) -> CorrelationParameters:
     if isinstance(user, int):
         user_id = user
@@ -34,6 +36,7 @@ def insert_automatic_correlation(
         company_metric=company_metric,
         aggregation_period=aggregation_period,
         correlation_metric=correlation_metric,
+        correlation_method=correlation_method,
     )
 
 
@@ -44,6 +47,7 @@ def insert_manual_correlation(
     correlation_metric: CorrelationMetric,
     lag_periods: int,
     fiscal_year_end: Month,
+    correlation_method: CorrelationMethod = CorrelationMethod.PEARSON,
 ) -> CorrelationParameters:
     start_year = parse_year_from_date(min(input_data["Date"]))  # type: ignore
     end_year = parse_year_from_date(max(input_data["Date"]))  # type: ignore
@@ -57,4 +61,5 @@ def insert_manual_correlation(
         fiscal_year_end=fiscal_year_end,
         aggregation_period=aggregation_period,
         correlation_metric=correlation_metric,
+        correlation_method=correlation_method,
     )
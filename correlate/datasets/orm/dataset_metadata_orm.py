@@ -1,45 +1,224 @@
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+
+from datasets.lib.metadata_search import MetadataSearchIndex
 from datasets.models import CorrelateDataPoint, DatasetMetadata
+from datasets.serializers import DatasetMetadataSerializer
+
+
+class MetadataIndex:
+    """Every ``DatasetMetadata`` by internal and by external name.
+
+    Saving or deleting metadata in this process rebuilds the index on next
+    use. Changes from other processes are noticed by comparing the latest
+    ``updated_at`` and the number of rows at most every ``check_interval``
+    seconds, so bulk updates must set ``updated_at``. The metadata returned
+    is shared, treat it as read-only. ``version`` counts the loads.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.version = 0
+        self._all: list[DatasetMetadata] = []
+        self._by_internal: dict[str, DatasetMetadata] = {}
+        self._by_external: dict[str, DatasetMetadata] = {}
+        self._state: tuple | None = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def by_internal_name(self, name: str) -> DatasetMetadata | None:
+        return self._maps()[0].get(name)
+
+    def by_external_name(self, name: str) -> DatasetMetadata | None:
+        return self._maps()[1].get(name)
+
+    def resolve(self, names: Iterable[str]) -> dict[str, DatasetMetadata]:
+        """Metadata of ``names``, by external name first then internal name."""
+        by_internal, by_external = self._maps()
+        resolved = {}
+        for name in names:
+            metadata = by_external.get(name) or by_internal.get(name)
+            if metadata is not None:
+                resolved[name] = metadata
+        return resolved
+
+    def internal_names(self, external_names: Iterable[str]) -> list[str]:
+        """Internal names of ``external_names``, unknown names are kept as is."""
+        by_external = self._maps()[1]
+        return [
+            by_external[name].internal_name if name in by_external else name
+            for name in external_names
+        ]
+
+    def all(self) -> tuple[int, list[DatasetMetadata]]:
+        """The version and every metadata, ordered by id."""
+        self._maps()
+        with self._lock:
+            return self.version, self._all
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+    def _maps(
+        self,
+    ) -> tuple[dict[str, DatasetMetadata], dict[str, DatasetMetadata]]:
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._loaded
+            check = loaded and now - self._checked_at >= self.check_interval
+            if check:
+                self._checked_at = now
+        if not loaded or (check and self._current_state() != self._state):
+            self._load()
+        return self._by_internal, self._by_external
+
+    def _current_state(self) -> tuple:
+        rows = DatasetMetadata.objects.aggregate(Max("updated_at"), Count("id"))
+        return rows["updated_at__max"], rows["id__count"]
+
+    def _load(self) -> None:
+        state = self._current_state()
+        metadatas = list(DatasetMetadata.objects.order_by("id"))
+        by_internal, by_external = {}, {}
+        # Lowest id first, like .first() when external names repeat
+        for metadata in reversed(metadatas):
+            by_internal[metadata.internal_name] = metadata
+            if metadata.external_name is not None:
+                by_external[metadata.external_name] = metadata
+        with self._lock:
+            self._all = metadatas
+            self._by_internal, self._by_external = by_internal, by_external
+            self.version += 1
+            self._state = state
+            self._loaded = True
+            self._checked_at = time.monotonic()
+
+
+METADATA_INDEX = MetadataIndex(
+    check_interval=getattr(settings, "DATASET_CACHE_CHECK_INTERVAL", 5.0)
+)
+
+
+class MetadataListing(NamedTuple):
+    """Responses derived from the visible metadata, see ``get_metadata_listing``."""
+
+    version: int
+    filters: dict[str, list[str]]
+    filters_json: bytes
+    filters_etag: str
+    metadata_json: bytes
+    metadata_etag: str
+    search: MetadataSearchIndex
+
+
+def _etag(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+
+def _build_listing(version: int, metadatas: list[DatasetMetadata]) -> MetadataListing:
+    visible = [metadata for metadata in metadatas if not metadata.hidden]
+    # dict keeps the first occurrence of each value, like an ordered set
+    sources, releases, categories = {}, {}, {}
+    for metadata in visible:
+        sources[metadata.source] = None
+        releases[metadata.release] = None
+        categories.update(dict.fromkeys(metadata.categories or []))
+    filters = {
+        "source": [s for s in sources if s is not None],
+        "release": [r for r in releases if r is not None],
+        "categories": [c for c in categories if c is not None],
+    }
+
+    filters_json = json.dumps(filters, cls=DjangoJSONEncoder).encode()
+    serialized = DatasetMetadataSerializer(visible, many=True).data
+    metadata_json = json.dumps(serialized, cls=DjangoJSONEncoder).encode()
+    return MetadataListing(
+        version=version,
+        filters=filters,
+        filters_json=filters_json,
+        filters_etag=_etag(filters_json),
+        metadata_json=metadata_json,
+        metadata_etag=_etag(metadata_json),
+        search=MetadataSearchIndex(visible, serialized),
+    )
+
+
+_listing: MetadataListing | None = None
+_listing_lock = threading.Lock()
+
+
+def get_metadata_listing() -> MetadataListing:
+    """Filter facets and serialized visible metadata, built once per version.
+
+    ETags hash the content, so they match across processes.
+    """
+    global _listing
+    version, metadatas = METADATA_INDEX.all()
+    listing = _listing
+    if listing is None or listing.version != version:
+        listing = _build_listing(version, metadatas)
+        with _listing_lock:
+            if _listing is None or _listing.version < version:
+                _listing = listing
+    return listing
+
+
+def invalidate_metadata_index(**kwargs) -> None:
+    """Receiver of ``DatasetMetadata`` saves and deletes."""
+    METADATA_INDEX.invalidate()
 
 
 def augment_with_metadata(
     datasets: list[CorrelateDataPoint],
 ) -> list[CorrelateDataPoint]:
-    dataset_metadatas = DatasetMetadata.objects.filter(
-        internal_name__in=[ds.title for ds in datasets]
-    ).all()
-    dataset_mapping = {ds.internal_name: ds for ds in dataset_metadatas}
-
     for dataset in datasets:
-        metadata = dataset_mapping.get(dataset.title, None)
+        metadata = METADATA_INDEX.by_internal_name(dataset.title)
         if metadata is None:
             continue
         if metadata.external_name is not None:
             dataset.title = metadata.external_name
         dataset.source = metadata.source
         dataset.description = metadata.description
+        dataset.release = metadata.release
+        dataset.url = metadata.url
+        dataset.units = metadata.units
+        dataset.categories = metadata.categories
     return datasets
 
 
 def get_metadata_from_external_name(external_name: str) -> DatasetMetadata | None:
-    return DatasetMetadata.objects.filter(external_name=external_name).first()
+    return METADATA_INDEX.by_external_name(external_name)
 
 
 def get_metadata_from_internal_name(internal_name: str) -> DatasetMetadata | None:
-    return DatasetMetadata.objects.filter(internal_name=internal_name).first()
+    return METADATA_INDEX.by_internal_name(internal_name)
 
 
 def get_metadata_from_name(name: str) -> DatasetMetadata | None:
-    metadata = get_metadata_from_external_name(name)
-    if metadata is not None:
-        return metadata
-    return get_metadata_from_internal_name(name)
+    return METADATA_INDEX.resolve([name]).get(name)
+
+
+def get_metadata_from_names(names: Iterable[str]) -> dict[str, DatasetMetadata]:
+    """Metadata of every name found, see ``get_metadata_from_name``."""
+    return METADATA_INDEX.resolve(names)
 
 
 def get_internal_name_from_external_name(external_name: str) -> str:
-    metadata = get_metadata_from_external_name(external_name)
-    if metadata is None:
-        return external_name
-    return metadata.internal_name
+    return get_internal_names_from_external_names([external_name])[0]
+
+
+def get_internal_names_from_external_names(external_names: list[str]) -> list[str]:
+    return METADATA_INDEX.internal_names(external_names)
 
 
 def create_dataset_metadata(
@@ -1,4 +1,4 @@
-from datasets.models import DatasetMetadata, Dataset
+from datasets.models import DataVersion, DatasetMetadata, Dataset, DatasetSeries
 from datetime import datetime, UTC
 import openpyxl
 from django.core.files.uploadedfile import UploadedFile
@@ -7,33 +7,160 @@ import pandas as pd
 from dateutil.parser import parse
 from frozendict import frozendict
 from core.data_processing import transform_data_base
-from functools import cache
-from django.db.models import Func, F
+from core.index_cache import INDEX_CACHE
+from core.packed_series import pack_series, unpack_series
+from core.dataset_snapshot import DatasetSnapshot, series_frame
+from core.transform_cache import TRANSFORMED_CACHE, LazyDatasets
+from datasets.orm.dataset_metadata_orm import get_metadata_listing
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import NamedTuple
+import heapq
+import io
+import itertools
+import logging
+import numpy as np
+import os
+import struct
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, connections
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
 
-CACHED_DFS = None
+logger = logging.getLogger(__name__)
 
 
-def add_dataset_bulk(records: list[tuple[datetime, float]], metadata: DatasetMetadata):
-    to_add = []
+class UpsertResult(NamedTuple):
+    inserted: int
+    # Date, new value and old value of every revised point
+    revisions: list[tuple[datetime, float, float]]
+
+    @property
+    def updated(self) -> int:
+        return len(self.revisions)
+
+
+UPSERT_BATCH_SIZE = 5000
+
+# Whether data changed in the ingestion run of this thread, None outside one
+_ingestion = threading.local()
+
 
-    existing_datasets = Dataset.objects.filter(metadata=metadata).values_list(
-        "date", "value"
+@contextmanager
+def ingestion_run() -> Iterator[None]:
+    """Bump the data version once for every ``upsert_dataset`` in the block.
+
+    Every bump makes each process reload its datasets, so commands ingesting
+    many datasets run inside one. Nested runs belong to the outermost one.
+    """
+    if getattr(_ingestion, "changed", None) is not None:
+        yield
+        return
+
+    _ingestion.changed = False
+    try:
+        yield
+    finally:
+        changed, _ingestion.changed = _ingestion.changed, None
+        if changed:
+            bump_data_version()
+
+
+def _data_changed() -> None:
+    """Bump the data version, at the end of the current ingestion run if any."""
+    if getattr(_ingestion, "changed", None) is None:
+        bump_data_version()
+    else:
+        _ingestion.changed = True
+
+
+def upsert_dataset(
+    records: list[tuple[datetime, float]],
+    metadata: DatasetMetadata,
+    dry_run: bool = False,
+) -> UpsertResult:
+    """Insert the new points of ``metadata`` and revise the changed ones.
+
+    Fetched and stored points are compared as sorted date and value arrays,
+    the differences are then written with batched ``INSERT ... ON CONFLICT``.
+    With ``dry_run`` nothing is written. The data version is only bumped when
+    points changed, once per ``ingestion_run``.
+    """
+    if not records:
+        return UpsertResult(0, [])
+
+    fetched = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(
+                [record[0].replace(tzinfo=UTC) for record in records], utc=True
+            ).as_unit("ns"),
+            "Value": np.array([record[1] for record in records], dtype=np.float64),
+        }
     )
-    existing_ds_map = {ds[0]: ds[1] for ds in existing_datasets}
-    for record in records:
-        date = record[0]
-        date = date.replace(tzinfo=UTC)
-        value = record[1]
-
-        if existing_ds_map.get(date, None) == value:
-            # Record already exists skip
-            continue
+    # The last record of a date wins, as when they were written in order
+    fetched = fetched.drop_duplicates("Date", keep="last").sort_values("Date")
+    dates = pd.DatetimeIndex(fetched["Date"]).asi8
+    values = fetched["Value"].to_numpy()
 
-        to_add.append(Dataset(metadata=metadata, date=date, value=value))
-    added = len(Dataset.objects.bulk_create(to_add, ignore_conflicts=True))
-    return added
+    stored = row_dfs(Dataset.objects.filter(metadata=metadata)).get(
+        metadata.internal_name
+    )
+    if stored is None:
+        stored_dates, stored_values = np.empty(0, dtype=np.int64), np.empty(0)
+    else:
+        stored_dates = pd.DatetimeIndex(stored["Date"]).as_unit("ns").asi8
+        stored_values = stored["Value"].to_numpy(dtype=np.float64)
 
+    positions = np.searchsorted(stored_dates, dates)
+    found = positions < len(stored_dates)
+    found[found] = stored_dates[positions[found]] == dates[found]
+    old_values = np.full(len(dates), np.nan)
+    old_values[found] = stored_values[positions[found]]
+    same = (old_values == values) | (np.isnan(old_values) & np.isnan(values))
+    inserted = ~found
+    revised = found & ~same
 
+    revisions = [
+        (date.to_pydatetime(), float(new), float(old))
+        for date, new, old in zip(
+            fetched["Date"][revised], values[revised], old_values[revised]
+        )
+    ]
+    result = UpsertResult(int(inserted.sum()), revisions)
+    if dry_run or not (result.inserted or result.updated):
+        return result
+
+    changed = fetched[inserted | revised]
+    Dataset.objects.bulk_create(
+        [
+            Dataset(metadata=metadata, date=date, value=value)
+            for date, value in zip(
+                pd.DatetimeIndex(changed["Date"]).to_pydatetime(), changed["Value"]
+            )
+        ],
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["metadata", "date"],
+        update_fields=["value"],
+    )
+    update_dataset_series([metadata.id])
+    SERIES_CACHE.invalidate(metadata.internal_name)
+    TRANSFORMED_CACHE.invalidate(metadata.internal_name)
+    INDEX_CACHE.invalidate_dataset(metadata.internal_name)
+    _data_changed()
+    return result
+
+
+def add_dataset_bulk(records: list[tuple[datetime, float]], metadata: DatasetMetadata):
+    """``upsert_dataset`` returning the number of inserted points."""
+    return upsert_dataset(records, metadata).inserted
+
+
+@ingestion_run()
 def parse_excel_file_for_datasets(excel_file: UploadedFile):
     workbook = openpyxl.load_workbook(filename=excel_file, data_only=True)
 
@@ -90,14 +217,15 @@ def parse_excel_file_for_datasets(excel_file: UploadedFile):
             ),
         )
 
-        total_new = add_dataset_bulk(dataset, dataset_metadata)
-        results.append((sheet.title, created, total_new))
+        result = upsert_dataset(dataset, dataset_metadata)
+        results.append((sheet.title, created, result.inserted + result.updated))
     return results
 
 
 def parse_metadata_from_excel(excel_file: UploadedFile):
     workbook = openpyxl.load_workbook(filename=excel_file, data_only=True)
     total = 0
+    hidden_changed = False
     results = []
     for sheet in workbook:
         headers = []
@@ -154,44 +282,99 @@ def parse_metadata_from_excel(excel_file: UploadedFile):
             elif not dm.exists():
                 results.append((name, "Metadata not found"))
             else:
-                dm.update(**updates)
+                # Bulk updates skip auto_now, other processes notice new
+                # metadata by its updated_at
+                dm.update(**updates, updated_at=timezone.now())
                 total += 1
+                hidden_changed = hidden_changed or "hidden" in updates
+
+    if hidden_changed:
+        # Hiding a dataset changes what get_all_dfs returns
+        bump_data_version()
 
     return [("success", f"Updated {total} metadata records")] + results
 
 
-def get_all_dfs(
-    selected_names: list[str] | None = None,
-) -> frozendict[str, pd.DataFrame]:
-    global CACHED_DFS
-    if CACHED_DFS:
-        if selected_names is None:
-            return CACHED_DFS
-        else:
-            return frozendict(
-                {
-                    name: CACHED_DFS[name]
-                    for name in selected_names
-                    if name in CACHED_DFS
-                }
-            )
+def get_data_version() -> int:
+    version = DataVersion.objects.values_list("version", flat=True).first()
+    return version or 0
 
-    dfs = {}
+
+def bump_data_version() -> None:
+    """Tell every process that dataset values changed."""
+    if not DataVersion.objects.update(version=F("version") + 1):
+        DataVersion.objects.create(version=1)
+
+
+def load_dfs(selected_names: list[str] | None = None) -> dict[str, pd.DataFrame]:
     if selected_names is not None:
-        datasets = Dataset.objects.filter(
-            metadata__internal_name__in=selected_names
-        ).prefetch_related("metadata")
+        metadatas = DatasetMetadata.objects.filter(internal_name__in=selected_names)
     else:
-        dataset_metadatas = (
-            DatasetMetadata.objects.filter(hidden=False)
-            .order_by("created_at")
-            .values_list("id", flat=True)
+        metadatas = DatasetMetadata.objects.filter(hidden=False)
+
+    dfs = series_dfs(DatasetSeries.objects.filter(metadata__in=metadatas))
+    # Datasets whose series was not built yet are read row by row
+    missing = metadatas.filter(series__isnull=True)
+    dfs.update(row_dfs(Dataset.objects.filter(metadata__in=missing)))
+    return dfs
+
+
+def series_dfs(series: QuerySet[DatasetSeries]) -> dict[str, pd.DataFrame]:
+    """Raw dataframes of packed ``series``, one row per dataset."""
+    dfs = {}
+    for title, start, frequency, dates, values in series.values_list(
+        "metadata__internal_name", "start", "frequency", "dates", "values"
+    ):
+        dfs[title] = series_frame(*unpack_series(start, frequency, dates, values))
+    return dfs
+
+
+def update_dataset_series(metadata_ids: list[int]) -> None:
+    """Rebuild the packed series of ``metadata_ids`` from their ``Dataset`` rows."""
+    dfs = row_dfs(Dataset.objects.filter(metadata_id__in=metadata_ids))
+    titles = dict(
+        DatasetMetadata.objects.filter(id__in=metadata_ids).values_list(
+            "id", "internal_name"
         )
-        datasets = Dataset.objects.filter(
-            metadata_id__in=dataset_metadatas
-        ).prefetch_related("metadata")
+    )
+
+    series = []
+    for metadata_id, title in titles.items():
+        df = dfs.get(title)
+        if df is None:
+            continue
+        df = df.sort_values("Date")
+        dates = pd.DatetimeIndex(df["Date"]).tz_convert("UTC").as_unit("ns").asi8
+        packed = pack_series(dates, df["Value"].to_numpy())
+        series.append(DatasetSeries(metadata_id=metadata_id, **packed._asdict()))
+
+    DatasetSeries.objects.filter(metadata_id__in=metadata_ids).exclude(
+        metadata_id__in=[s.metadata_id for s in series]
+    ).delete()
+    DatasetSeries.objects.bulk_create(
+        series,
+        update_conflicts=True,
+        unique_fields=["metadata"],
+        update_fields=["start", "frequency", "dates", "values", "updated_at"],
+    )
+
 
-    datasets = datasets.values_list("metadata__internal_name", "date", "value")
+def row_dfs(datasets: QuerySet[Dataset]) -> dict[str, pd.DataFrame]:
+    """Raw dataframes of ``datasets`` read from their rows."""
+    if connection.vendor == "postgresql":
+        return copy_dfs(datasets)
+    return query_dfs(datasets)
+
+
+def query_dfs(datasets: QuerySet[Dataset]) -> dict[str, pd.DataFrame]:
+    """Raw dataframes of ``datasets``, built row by row from the ORM.
+
+    Rows are ordered by dataset and date, as with ``copy_dfs``.
+    """
+    dfs = {}
+    datasets = datasets.order_by("metadata", "date").values_list(
+        "metadata__internal_name", "date", "value"
+    )
     for dataset in datasets:
         title = dataset[0]
         if title not in dfs:
@@ -201,44 +384,695 @@ def get_all_dfs(
     for title, data in dfs.items():
         dfs[title] = pd.DataFrame(data, columns=["Date", "Value"])
         transform_data_base(dfs[title])
+    return dfs
 
-    if selected_names is None:
-        CACHED_DFS = dfs
-    return frozendict(dfs)
 
+# Binary COPY output, see "Binary Format" in the PostgreSQL COPY documentation
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_COPY_HEADER = struct.Struct(">ii")
+# A (bigint, timestamptz, float8) row: field count then each length and value
+COPY_ROW = np.dtype(
+    [
+        ("fields", ">i2"),
+        ("id_length", ">i4"),
+        ("id", ">i8"),
+        ("date_length", ">i4"),
+        ("date", ">i8"),
+        ("value_length", ">i4"),
+        ("value", ">f8"),
+    ]
+)
+# Timestamps are sent as microseconds since 2000-01-01
+_POSTGRES_EPOCH_US = 946_684_800_000_000
 
-def get_df(title: str) -> pd.DataFrame | None:
-    if CACHED_DFS:
-        return CACHED_DFS.get(title)
-    dataset = list(Dataset.objects.filter(metadata__internal_name=title).all())
-    if len(dataset) == 0:
-        return None
-    data = [(d.date, d.value) for d in dataset]
-    return pd.DataFrame(data, columns=["Date", "Value"])
 
+def parse_copy_rows(data: bytes | memoryview) -> np.ndarray:
+    """``COPY_ROW`` records of a binary COPY of (bigint, timestamptz, float8)."""
+    if bytes(data[: len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+        raise ValueError("Not a binary COPY output")
+    _, extension = _COPY_HEADER.unpack_from(data, len(COPY_SIGNATURE))
+    start = len(COPY_SIGNATURE) + _COPY_HEADER.size + extension
+    # The output ends with a field count of -1
+    count, remainder = divmod(len(data) - start - 2, COPY_ROW.itemsize)
+    if remainder:
+        raise ValueError("Binary COPY rows are not (bigint, timestamptz, float8)")
+    rows = np.frombuffer(data, COPY_ROW, count=count, offset=start)
+    if (rows["fields"] != 3).any() or (rows["value_length"] != 8).any():
+        raise ValueError("Binary COPY rows are not (bigint, timestamptz, float8)")
+    return rows
 
-@cache
-def get_dataset_filters():
-    unique_sources = (
-        DatasetMetadata.objects.filter(hidden=False)
-        .values_list("source", flat=True)
-        .distinct()
-    )
-    unique_releases = (
-        DatasetMetadata.objects.filter(hidden=False)
-        .values_list("release", flat=True)
-        .distinct()
+
+def copy_dfs(datasets: QuerySet[Dataset]) -> dict[str, pd.DataFrame]:
+    """Raw dataframes of ``datasets``, streamed with a binary ``COPY``.
+
+    Rows arrive ordered by dataset and date as fixed size records that are
+    read straight into arrays, each dataframe is then a slice of them, so the
+    load costs a few array operations instead of Python objects per row.
+    """
+    try:
+        sql, params = datasets.values_list(
+            "metadata_id", "date", "value"
+        ).query.sql_with_params()
+    except EmptyResultSet:
+        return {}
+    buffer = io.BytesIO()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(
+            "COPY (SELECT metadata_id::bigint, date::timestamptz, value::float8 "
+            f"FROM ({sql}) AS rows ORDER BY 1, 2) TO STDOUT (FORMAT binary)",
+            params,
+        )
+        cursor.copy_expert(query, buffer, size=1 << 20)
+    rows = parse_copy_rows(buffer.getbuffer())
+
+    ids = rows["id"].astype(np.int64)
+    dates = (rows["date"].astype(np.int64) + _POSTGRES_EPOCH_US) * 1000
+    values = rows["value"].astype(np.float64)
+    offsets = np.flatnonzero(np.diff(ids, prepend=-1, append=-1))
+    titles = dict(
+        DatasetMetadata.objects.filter(id__in=ids[offsets[:-1]].tolist()).values_list(
+            "id", "internal_name"
+        )
     )
-    unique_categories = (
-        DatasetMetadata.objects.filter(hidden=False)
-        .annotate(categories_elm=Func(F("categories"), function="unnest"))
-        .values_list("categories_elm", flat=True)
-        .distinct()
+    return {
+        titles[ids[start]]: series_frame(dates[start:stop], values[start:stop])
+        for start, stop in zip(offsets[:-1], offsets[1:])
+    }
+
+
+class DatasetCache:
+    """Snapshot of every visible dataset, reloaded when the data version moves.
+
+    At most every ``check_interval`` seconds the version of the snapshot is
+    compared with ``DataVersion``. Once ingestion has bumped it a new snapshot
+    is loaded, on a background thread when ``background`` is set, while the
+    old one keeps serving, and then swapped in. Datasets whose values did not
+    change keep their dataframe so the transform cache doesn't fingerprint
+    them again.
+
+    When ``snapshot_path`` holds a snapshot written at the current version,
+    see ``write_dataset_snapshot``, datasets are mapped from it instead of
+    loaded from the database, and a newly written snapshot is picked up
+    like a version bump. A corrupt snapshot is logged and deleted, and the
+    datasets are loaded from the database instead.
+    """
+
+    def __init__(
+        self,
+        check_interval: float = 5.0,
+        background: bool = True,
+        snapshot_path: str | None = None,
+    ):
+        self.check_interval = check_interval
+        self.background = background
+        self.snapshot_path = snapshot_path
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.last_reload_seconds: float | None = None
+        self.total_reload_seconds = 0.0
+        self._snapshot: frozendict[str, pd.DataFrame] | None = None
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._loaded_mtime: int | None = None
+        self._reloading: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Held while a snapshot is loaded so only one load runs at a time
+        self._load_lock = threading.Lock()
+
+    def get(
+        self, selected_names: list[str] | None = None
+    ) -> frozendict[str, pd.DataFrame]:
+        """Every dataset, or only ``selected_names``, from the current snapshot."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._count("misses")
+            if selected_names is not None:
+                # Don't load everything for a few datasets
+                return frozendict(load_dfs(selected_names))
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._load()
+                snapshot = self._snapshot
+        else:
+            self._count("hits")
+            if self._check_version():
+                snapshot = self._snapshot
+
+        if selected_names is None:
+            return snapshot  # type: ignore
+        return frozendict(
+            {name: snapshot[name] for name in selected_names if name in snapshot}  # type: ignore
+        )
+
+    def peek(self) -> frozendict[str, pd.DataFrame] | None:
+        """The current snapshot, without loading or checking it."""
+        return self._snapshot
+
+    def set(self, dfs: dict[str, pd.DataFrame]) -> None:
+        with self._lock:
+            self._snapshot = frozendict(dfs)
+            self._version = get_data_version()
+            self._checked_at = time.monotonic()
+
+    def warm_up(self) -> None:
+        """Load the first snapshot in the background."""
+        self._start_reload()
+
+    def reload(self) -> None:
+        with self._load_lock:
+            self._load()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._version = None
+            self._checked_at = 0.0
+
+    def stats(self) -> dict[str, int | float | None]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "datasets": None if self._snapshot is None else len(self._snapshot),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "last_reload_seconds": self.last_reload_seconds,
+                "total_reload_seconds": self.total_reload_seconds,
+            }
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _check_version(self) -> bool:
+        """Reload a stale snapshot, returns whether it was swapped already."""
+        now = time.monotonic()
+        with self._lock:
+            if self._is_reloading() or now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+
+        if get_data_version() == self._version and not self._snapshot_replaced():
+            return False
+        if self.background:
+            self._start_reload()
+            return False
+        self.reload()
+        return True
+
+    def _snapshot_mtime(self) -> int | None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        return os.stat(self.snapshot_path).st_mtime_ns
+
+    def _snapshot_replaced(self) -> bool:
+        """Whether a snapshot file was written since the last load."""
+        mtime = self._snapshot_mtime()
+        return mtime is not None and mtime != self._loaded_mtime
+
+    def _read_snapshot_file(self, version: int) -> dict[str, pd.DataFrame] | None:
+        """Datasets of the snapshot file, if it was written at ``version``."""
+        if self._loaded_mtime is None:
+            return None
+        try:
+            snapshot = DatasetSnapshot(self.snapshot_path)  # type: ignore
+        except (OSError, ValueError):
+            logger.exception("Ignoring the dataset snapshot %s", self.snapshot_path)
+            self._remove_snapshot_file()
+            return None
+        if snapshot.version != version:
+            return None
+        return snapshot.dfs()
+
+    def _remove_snapshot_file(self) -> None:
+        """Delete a bad snapshot file unless a new one replaced it meanwhile."""
+        if self._snapshot_mtime() == self._loaded_mtime:
+            try:
+                os.unlink(self.snapshot_path)  # type: ignore
+            except FileNotFoundError:
+                pass
+        self._loaded_mtime = None
+
+    def _is_reloading(self) -> bool:
+        return self._reloading is not None and self._reloading.is_alive()
+
+    def _start_reload(self) -> None:
+        with self._lock:
+            if self._is_reloading():
+                return
+            self._reloading = threading.Thread(target=self._reload_thread, daemon=True)
+            self._reloading.start()
+
+    def _reload_thread(self) -> None:
+        try:
+            self.reload()
+        finally:
+            # Threads open their own database connections
+            connections.close_all()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        # Read the version first, a bump during the load triggers another one
+        version = get_data_version()
+        self._loaded_mtime = self._snapshot_mtime()
+        dfs = self._read_snapshot_file(version)
+        mapped = dfs is not None
+        if dfs is None:
+            dfs = load_dfs()
+
+        previous = self._snapshot or {}
+        changed = []
+        for title, df in dfs.items():
+            old = previous.get(title)
+            if old is None or not old.equals(df):
+                changed.append(title)
+            elif not mapped:
+                # Mapped dataframes replace private copies even when equal
+                dfs[title] = old
+
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._snapshot = frozendict(dfs)
+            self._version = version
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+            self.last_reload_seconds = duration
+            self.total_reload_seconds += duration
+
+        if previous:
+            for title in changed:
+                SERIES_CACHE.invalidate(title)
+                TRANSFORMED_CACHE.invalidate(title)
+                INDEX_CACHE.invalidate_dataset(title)
+
+
+class BoundedDatasetCache:
+    """Datasets loaded on demand, kept within ``max_bytes`` with their transforms.
+
+    Replaces ``DatasetCache`` when the whole universe should not be held in
+    every process. The budget covers the dataframes held here and the
+    matrices of ``TRANSFORMED_CACHE``. Cold datasets are evicted least
+    frequently used first, with dynamic aging: a dataset's priority is its
+    number of uses since it was loaded plus the priority of the last evicted
+    dataset when it was, so datasets that were only popular long ago still
+    get evicted eventually. Transformations are dropped when evicting
+    datasets is not enough. Datasets on a watchlist, from ``pinned_sources``
+    or from a source requested in the last ``recent_seconds`` are never
+    evicted.
+
+    Requests for every visible dataset get a ``LazyDatasets`` whose tokens
+    are the ``updated_at`` of the packed series, so only the datasets the
+    transform cache has not seen are read.
+
+    At most every ``check_interval`` seconds the data version is compared,
+    after a bump the resident datasets are reloaded, keeping the dataframes
+    whose values did not change.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        check_interval: float = 5.0,
+        pinned_sources: Iterable[str] = (),
+        recent_seconds: float = 0.0,
+    ):
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.pinned_sources = list(pinned_sources)
+        self.recent_seconds = recent_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.resident_bytes = 0
+        self.generation = 0
+        self._entries: dict[str, pd.DataFrame] = {}
+        self._sizes: dict[str, int] = {}
+        self._uses: dict[str, int] = {}
+        self._priorities: dict[str, int] = {}
+        # (priority, order, title), entries whose priority moved are skipped
+        self._heap: list[tuple[int, int, str]] = []
+        self._order = itertools.count()
+        self._age = 0
+        self._visible: list[str] | None = None
+        self._tokens: dict[str, Hashable] = {}
+        self._sources: dict[str, str | None] = {}
+        # Last time datasets of each source were requested by name
+        self._requested: dict[str | None, float] = {}
+        self._pinned: set[str] = set()
+        self._pinned_titles: set[str] = set()
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(
+        self, selected_names: list[str] | None = None
+    ) -> Mapping[str, pd.DataFrame]:
+        """Every visible dataset, or only ``selected_names``, loading misses.
+
+        Without ``selected_names`` nothing is read until the returned
+        ``LazyDatasets`` is.
+        """
+        self._check_version()
+        if self._visible is None:
+            self._load_index()
+        if selected_names is None:
+            return LazyDatasets(self._visible, self._tokens, self._get)  # type: ignore
+
+        now = time.monotonic()
+        with self._lock:
+            for name in selected_names:
+                self._requested[self._sources.get(name)] = now
+        return frozendict(self._get(selected_names))
+
+    def _get(self, names: list[str]) -> dict[str, pd.DataFrame]:
+        with self._lock:
+            generation = self.generation
+            dfs = {name: self._entries[name] for name in names if name in self._entries}
+            for name in dfs:
+                self._use(name)
+            missing = [name for name in names if name not in dfs]
+            self.hits += len(dfs)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = load_dfs(missing)
+            with self._lock:
+                if generation == self.generation:
+                    for name, df in loaded.items():
+                        self._put(name, df)
+                    # Without a packed series, the values can only change
+                    # with the data version
+                    for name in missing:
+                        self._tokens.setdefault(name, ("version", self._version))
+            dfs.update(loaded)
+            self._enforce_budget()
+        return {name: dfs[name] for name in names if name in dfs}
+
+    def peek(self) -> None:
+        """Resident datasets are only a part of them, so never a whole snapshot."""
+        return None
+
+    def set(self, dfs: dict[str, pd.DataFrame]) -> None:
+        with self._lock:
+            self.generation += 1
+            for name, df in dfs.items():
+                self._put(name, df)
+        self._enforce_budget()
+
+    def pin(self, titles: Iterable[str]) -> None:
+        """Never evict ``titles``, in addition to watchlists and pinned sources."""
+        with self._lock:
+            self._pinned_titles.update(titles)
+            self._pinned.update(titles)
+
+    def warm_up(self) -> None:
+        """Load the pinned datasets in the background."""
+        threading.Thread(target=self._warm_up_thread, daemon=True).start()
+
+    def reload(self) -> None:
+        """Reload the resident datasets, keeping the unchanged dataframes."""
+        version = get_data_version()
+        with self._lock:
+            self.generation += 1
+            titles = list(self._entries)
+        self._load_index()
+        dfs = load_dfs(titles)
+
+        changed = []
+        with self._lock:
+            self.generation += 1
+            for title in titles:
+                old, df = self._entries.get(title), dfs.get(title)
+                if old is not None and df is not None and old.equals(df):
+                    continue
+                changed.append(title)
+                self._drop(title)
+                if df is not None:
+                    self._put(title, df)
+            self._version = version
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+        self._enforce_budget()
+
+        for title in changed:
+            SERIES_CACHE.invalidate(title)
+            TRANSFORMED_CACHE.invalidate(title)
+            INDEX_CACHE.invalidate_dataset(title)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._sizes.clear()
+            self._uses.clear()
+            self._priorities.clear()
+            self._heap.clear()
+            self._age = 0
+            self.resident_bytes = 0
+            self._visible = None
+            self._tokens = {}
+            self._requested.clear()
+            self._version = None
+            self._checked_at = 0.0
+
+    def stats(self) -> dict[str, int | float | None]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "datasets": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "resident_bytes": self.resident_bytes,
+                "transformed_bytes": TRANSFORMED_CACHE.nbytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "pinned": len(self._pinned & self._entries.keys()),
+            }
+
+    def _warm_up_thread(self) -> None:
+        try:
+            self._load_index()
+            self._get(sorted(self._pinned))
+        finally:
+            # Threads open their own database connections
+            connections.close_all()
+
+    def _load_index(self) -> None:
+        """Read the visible and pinned titles and the tokens of their values."""
+        version = get_data_version()
+        rows = list(
+            DatasetMetadata.objects.filter(hidden=False)
+            .order_by("created_at")
+            .values_list("internal_name", "source", "series__updated_at")
+        )
+        pinned = DatasetMetadata.objects.filter(
+            Q(watchlist__isnull=False) | Q(source__in=self.pinned_sources)
+        ).values_list("internal_name", flat=True)
+        with self._lock:
+            if self._version is None:
+                self._version = version
+                self._checked_at = time.monotonic()
+            self._visible = [name for name, _, _ in rows]
+            self._sources = {name: source for name, source, _ in rows}
+            self._tokens = {
+                name: updated_at
+                for name, _, updated_at in rows
+                if updated_at is not None
+            }
+            self._pinned = set(pinned) | self._pinned_titles
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._version is None or now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+
+        if get_data_version() != self._version:
+            self.reload()
+
+    def _use(self, title: str) -> None:
+        self._uses[title] += 1
+        self._priorities[title] = self._age + self._uses[title]
+        heapq.heappush(self._heap, (self._priorities[title], next(self._order), title))
+
+    def _put(self, title: str, df: pd.DataFrame) -> None:
+        self._drop(title)
+        self._entries[title] = df
+        self._sizes[title] = int(df.memory_usage(index=True).sum())
+        self.resident_bytes += self._sizes[title]
+        self._uses[title] = 0
+        self._use(title)
+
+    def _drop(self, title: str) -> None:
+        if self._entries.pop(title, None) is not None:
+            self.resident_bytes -= self._sizes.pop(title)
+            del self._uses[title], self._priorities[title]
+
+    def _enforce_budget(self) -> None:
+        """Evict datasets, then transformations, until both fit ``max_bytes``."""
+        transformed = TRANSFORMED_CACHE.nbytes
+        with self._lock:
+            self._evict(self.max_bytes - transformed)
+            resident = self.resident_bytes
+        if resident + transformed > self.max_bytes:
+            TRANSFORMED_CACHE.trim(self.max_bytes - resident)
+
+    def _is_pinned(self, title: str, now: float) -> bool:
+        if title in self._pinned:
+            return True
+        requested = self._requested.get(self._sources.get(title))
+        return requested is not None and now - requested < self.recent_seconds
+
+    def _evict(self, max_bytes: int) -> None:
+        now = time.monotonic()
+        skipped = []
+        while self.resident_bytes > max_bytes and self._heap:
+            entry = heapq.heappop(self._heap)
+            priority, _, title = entry
+            if self._priorities.get(title) != priority:
+                continue
+            if self._is_pinned(title, now):
+                # Recent sources get unpinned, keep them evictable
+                skipped.append(entry)
+                continue
+            self._drop(title)
+            self._age = priority
+            self.evictions += 1
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+        # Every use pushes an entry, drop the outdated ones once they pile up
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            self._heap = [
+                (priority, next(self._order), title)
+                for title, priority in self._priorities.items()
+            ]
+            heapq.heapify(self._heap)
+
+
+def _dataset_cache() -> DatasetCache | BoundedDatasetCache:
+    max_bytes = getattr(settings, "DATASET_CACHE_MAX_BYTES", 0)
+    check_interval = getattr(settings, "DATASET_CACHE_CHECK_INTERVAL", 5.0)
+    if max_bytes:
+        return BoundedDatasetCache(
+            max_bytes,
+            check_interval=check_interval,
+            pinned_sources=getattr(settings, "DATASET_CACHE_PINNED_SOURCES", []),
+            recent_seconds=getattr(settings, "DATASET_CACHE_RECENT_SECONDS", 0.0),
+        )
+    return DatasetCache(
+        check_interval=check_interval,
+        snapshot_path=getattr(settings, "DATASET_SNAPSHOT_PATH", None) or None,
     )
 
-    filters = {
-        "source": [s for s in unique_sources if s is not None],
-        "release": [r for r in unique_releases if r is not None],
-        "categories": [c for c in unique_categories if c is not None],
-    }
-    return filters
+
+DATASET_CACHE = _dataset_cache()
+
+
+class SeriesCache:
+    """Single datasets read while ``DATASET_CACHE`` is not loaded, for charts.
+
+    The least recently used datasets are dropped once their dataframes take
+    more than ``max_bytes``. Ingestion invalidates the datasets it writes, and
+    at most every ``check_interval`` seconds everything is dropped if another
+    process bumped the data version.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, check_interval: float = 5.0):
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.size = 0
+        self.version = 0
+        self._entries: OrderedDict[str, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._data_version: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, title: str) -> pd.DataFrame | None:
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(title)
+            if entry is None:
+                return None
+            self._entries.move_to_end(title)
+            return entry[0]
+
+    def put(self, title: str, df: pd.DataFrame, version: int) -> None:
+        """Store ``df`` unless anything was invalidated since ``version``."""
+        self._check_version()
+        size = int(df.memory_usage(index=True).sum())
+        with self._lock:
+            if version != self.version or size > self.max_bytes:
+                return
+            self._pop(title)
+            self._entries[title] = (df, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, title: str) -> None:
+        with self._lock:
+            self.version += 1
+            self._pop(title)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self.size = 0
+            self._data_version = None
+            self._checked_at = 0.0
+
+    def _pop(self, title: str) -> None:
+        entry = self._entries.pop(title, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _check_version(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+
+        version = get_data_version()
+        with self._lock:
+            if self._data_version is not None and version != self._data_version:
+                self.version += 1
+                self._entries.clear()
+                self.size = 0
+            self._data_version = version
+
+
+SERIES_CACHE = SeriesCache(
+    max_bytes=getattr(settings, "SERIES_CACHE_MAX_BYTES", 64 * 2**20),
+    check_interval=getattr(settings, "DATASET_CACHE_CHECK_INTERVAL", 5.0),
+)
+
+
+def get_all_dfs(
+    selected_names: list[str] | None = None,
+) -> Mapping[str, pd.DataFrame]:
+    return DATASET_CACHE.get(selected_names)
+
+
+def get_df(title: str) -> pd.DataFrame | None:
+    dfs = DATASET_CACHE.peek()
+    if dfs:
+        return dfs.get(title)
+
+    df = SERIES_CACHE.get(title)
+    if df is None:
+        version = SERIES_CACHE.version
+        df = load_dfs([title]).get(title)
+        if df is not None:
+            SERIES_CACHE.put(title, df, version)
+    return df
+
+
+def get_dataset_filters() -> dict[str, list[str]]:
+    return get_metadata_listing().filters
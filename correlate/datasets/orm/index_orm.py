@@ -0,0 +1,11 @@
+from datasets.models import IndexDataset
+
+
+def get_index_weights(index_ids: list[int]) -> dict[int, dict[str, float]]:
+    """Component weights keyed by dataset internal name for every index id."""
+    weights: dict[int, dict[str, float]] = {index_id: {} for index_id in index_ids}
+    for index_id, internal_name, weight in IndexDataset.objects.filter(
+        index_id__in=index_ids
+    ).values_list("index_id", "dataset__internal_name", "weight"):
+        weights[index_id][internal_name] = weight
+    return weights
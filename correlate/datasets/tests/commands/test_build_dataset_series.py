@@ -0,0 +1,28 @@
+from datetime import datetime, UTC
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from datasets.models import Dataset, DatasetMetadata, DatasetSeries
+
+
+class BuildDatasetSeriesCommandTest(TestCase):
+    def test_command(self):
+        for name in ["first", "second", "empty"]:
+            metadata = DatasetMetadata.objects.create(internal_name=name)
+            if name != "empty":
+                Dataset.objects.create(
+                    metadata=metadata, date=datetime(2020, 1, 1, tzinfo=UTC), value=1
+                )
+        out = StringIO()
+
+        call_command("build_dataset_series", batch_size=2, stdout=out)
+
+        self.assertEqual(
+            sorted(
+                DatasetSeries.objects.values_list("metadata__internal_name", flat=True)
+            ),
+            ["first", "second"],
+        )
+        self.assertIn("Packed 3 datasets", out.getvalue())
@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+def monthly_df(values: list[float]) -> pd.DataFrame:
+    dates = pd.date_range("2020-01-01", periods=len(values), freq="MS", tz="UTC")
+    return pd.DataFrame({"Date": dates, "Value": values})
+
+
+class PairwiseCorrelationCommandTest(SimpleTestCase):
+    @patch("datasets.management.commands.pairwise_correlation.get_all_dfs")
+    def test_command(self, mock_get_all_dfs: MagicMock):
+        growth = [float(i * i) for i in range(24)]
+        mock_get_all_dfs.return_value = {
+            "growth": monthly_df(growth),
+            "double_growth": monthly_df([value * 2 for value in growth]),
+            "cycle": monthly_df([float(i % 5) for i in range(24)]),
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "pairwise.npy")
+            out = StringIO()
+            call_command("pairwise_correlation", output=output, workers=1, stdout=out)
+
+            matrix = np.load(output)
+            with open(os.path.join(directory, "pairwise.titles.json")) as file:
+                titles = json.load(file)
+
+        self.assertEqual(titles, ["growth", "double_growth", "cycle"])
+        self.assertEqual(matrix.shape, (3, 3))
+        self.assertAlmostEqual(matrix[0, 1], 1.0, places=6)
+        self.assertEqual(matrix[1, 2], matrix[2, 1])
+        self.assertIn("growth\tdouble_growth", out.getvalue())
+        self.assertIn("Correlated 3 datasets", out.getvalue())
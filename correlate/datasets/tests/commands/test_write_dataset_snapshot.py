@@ -0,0 +1,37 @@
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from core.dataset_snapshot import DatasetSnapshot
+from datasets.models import DatasetMetadata
+from datasets.orm.dataset_orm import add_dataset_bulk, get_data_version
+
+
+class WriteDatasetSnapshotCommandTest(TestCase):
+    def setUp(self):
+        metadata = DatasetMetadata.objects.create(internal_name="series")
+        hidden = DatasetMetadata.objects.create(internal_name="hidden", hidden=True)
+        add_dataset_bulk([(datetime(2020, 1, 1), 1.0)], metadata)
+        add_dataset_bulk([(datetime(2020, 1, 1), 2.0)], hidden)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "datasets.snapshot")
+            out = StringIO()
+            call_command("write_dataset_snapshot", path=path, stdout=out)
+
+            snapshot = DatasetSnapshot(path)
+            self.assertEqual(snapshot.titles, ["series"])
+            self.assertEqual(snapshot.version, get_data_version())
+            self.assertEqual(snapshot.frame(0)["Value"].tolist(), [1.0])
+        self.assertIn("Wrote 1 datasets", out.getvalue())
+
+    @override_settings(DATASET_SNAPSHOT_PATH="")
+    def test_requires_path(self):
+        with self.assertRaises(CommandError):
+            call_command("write_dataset_snapshot", path="")
@@ -1,6 +1,17 @@
 from django.test import TestCase
 from datasets.models import DatasetMetadata, CorrelateDataPoint
-from datasets.orm.dataset_metadata_orm import augment_with_metadata
+from datasets.orm.dataset_metadata_orm import (
+    MetadataIndex,
+    augment_with_metadata,
+    get_internal_names_from_external_names,
+    get_metadata_from_name,
+    get_metadata_from_names,
+)
+from datasets.orm.dataset_orm import bump_data_version, parse_metadata_from_excel
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from io import BytesIO
+import openpyxl
 
 
 class AugmentWithMetadataTests(TestCase):
@@ -69,3 +80,62 @@ class AugmentWithMetadataTests(TestCase):
     def test_empty_datasets_list(self):
         augmented_data_points = augment_with_metadata([])
         self.assertEqual(len(augmented_data_points), 0)
+
+
+class MetadataIndexTests(TestCase):
+    def setUp(self):
+        self.first = DatasetMetadata.objects.create(
+            internal_name="first", external_name="First"
+        )
+        DatasetMetadata.objects.create(internal_name="second", external_name="First")
+        DatasetMetadata.objects.create(internal_name="third")
+
+    def test_resolve_names_with_one_load(self):
+        with self.assertNumQueries(2):
+            resolved = get_metadata_from_names(["First", "third", "missing"])
+            self.assertEqual(
+                get_internal_names_from_external_names(["First", "third", "x"]),
+                ["first", "third", "x"],
+            )
+            self.assertEqual(get_metadata_from_name("second").internal_name, "second")
+
+        self.assertEqual(list(resolved), ["First", "third"])
+        self.assertEqual(resolved["First"].id, self.first.id)
+        self.assertEqual(resolved["third"].internal_name, "third")
+
+    def test_saving_metadata_refreshes_the_index(self):
+        self.assertIsNone(get_metadata_from_name("Fourth"))
+
+        DatasetMetadata.objects.create(internal_name="fourth", external_name="Fourth")
+
+        self.assertEqual(get_metadata_from_name("Fourth").internal_name, "fourth")
+
+    def test_bulk_updates_are_noticed(self):
+        index = MetadataIndex(check_interval=0)
+        self.assertIsNone(index.by_external_name("Third"))
+
+        DatasetMetadata.objects.filter(internal_name="third").update(
+            external_name="Third", updated_at=timezone.now()
+        )
+
+        self.assertEqual(index.by_external_name("Third").internal_name, "third")
+
+    def test_data_version_does_not_reload(self):
+        index = MetadataIndex(check_interval=0)
+        version = index.all()[0]
+
+        bump_data_version()
+
+        self.assertEqual(index.all()[0], version)
+
+    def test_metadata_upload_is_noticed(self):
+        index = MetadataIndex(check_interval=0)
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["internal_name", "external_name"])
+        workbook.active.append(["third", "Third"])
+        file = BytesIO()
+        workbook.save(file)
+
+        parse_metadata_from_excel(SimpleUploadedFile("file", file.getvalue()))
+
+        self.assertEqual(index.by_external_name("Third").internal_name, "third")
@@ -1,8 +1,19 @@
+import os
+import tempfile
 from django.test import TransactionTestCase
-from datasets.models import Dataset, DatasetMetadata
+from core.dataset_snapshot import write_snapshot
+from core.transform_cache import TRANSFORMED_CACHE, LazyDatasets
+from datasets.models import (
+    AggregationPeriod,
+    CorrelationMetric,
+    Dataset,
+    DatasetMetadata,
+    DatasetSeries,
+)
 from datasets.orm.dataset_orm import (
     add_dataset_bulk,
     parse_excel_file_for_datasets,
+    upsert_dataset,
     get_all_dfs,
 )
 from datetime import datetime, UTC
@@ -12,8 +23,11 @@ from io import BytesIO
 import openpyxl
 import pytz
 from django.core.files.uploadedfile import SimpleUploadedFile
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from users.models import User, WatchList
+from unittest.mock import patch
 from datasets.orm import dataset_orm
 
 
@@ -55,6 +69,100 @@ class AddDatasetTest(TransactionTestCase):
         )  # Total three records in the database
 
 
+class UpsertDatasetTest(TestCase):
+    def setUp(self):
+        self.metadata = DatasetMetadata.objects.create(internal_name="Test Metadata")
+        add_dataset_bulk(
+            [(datetime(2020, 1, 1), 100.0), (datetime(2020, 2, 1), 200.0)],
+            self.metadata,
+        )
+
+    def stored(self):
+        return list(
+            Dataset.objects.filter(metadata=self.metadata)
+            .order_by("date")
+            .values_list("value", flat=True)
+        )
+
+    def test_inserts_and_revises(self):
+        version = dataset_orm.get_data_version()
+
+        result = upsert_dataset(
+            [
+                (datetime(2020, 3, 1), 300.0),
+                (datetime(2020, 2, 1), 250.0),
+                (datetime(2020, 1, 1), 100.0),
+            ],
+            self.metadata,
+        )
+
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual(
+            result.revisions, [(datetime(2020, 2, 1, tzinfo=UTC), 250.0, 200.0)]
+        )
+        self.assertEqual(self.stored(), [100.0, 250.0, 300.0])
+        self.assertEqual(
+            dataset_orm.load_dfs(["Test Metadata"])["Test Metadata"]["Value"].tolist(),
+            [100.0, 250.0, 300.0],
+        )
+        self.assertEqual(dataset_orm.get_data_version(), version + 1)
+
+    def test_rows_stored_out_of_order(self):
+        for month in [5, 3, 4]:
+            Dataset.objects.create(
+                metadata=self.metadata,
+                date=datetime(2020, month, 1, tzinfo=UTC),
+                value=100.0 * month,
+            )
+
+        with patch.object(dataset_orm, "row_dfs", dataset_orm.query_dfs):
+            result = upsert_dataset(
+                [(datetime(2020, month, 1), 100.0 * month) for month in range(1, 7)],
+                self.metadata,
+            )
+
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual(result.revisions, [])
+
+    def test_last_record_of_a_date_wins(self):
+        result = upsert_dataset(
+            [(datetime(2020, 1, 1), 1.0), (datetime(2020, 1, 1), 100.0)],
+            self.metadata,
+        )
+
+        self.assertEqual(result, (0, []))
+
+    def test_dry_run_writes_nothing(self):
+        version = dataset_orm.get_data_version()
+
+        result = upsert_dataset(
+            [(datetime(2020, 2, 1), 250.0), (datetime(2020, 3, 1), 300.0)],
+            self.metadata,
+            dry_run=True,
+        )
+
+        self.assertEqual((result.inserted, result.updated), (1, 1))
+        self.assertEqual(self.stored(), [100.0, 200.0])
+        self.assertEqual(dataset_orm.get_data_version(), version)
+
+    def test_ingestion_run_bumps_version_once(self):
+        other = DatasetMetadata.objects.create(internal_name="Other Metadata")
+        version = dataset_orm.get_data_version()
+
+        with dataset_orm.ingestion_run():
+            upsert_dataset([(datetime(2020, 3, 1), 300.0)], self.metadata)
+            with dataset_orm.ingestion_run():
+                upsert_dataset([(datetime(2020, 1, 1), 1.0)], other)
+            self.assertEqual(dataset_orm.get_data_version(), version)
+
+        self.assertEqual(dataset_orm.get_data_version(), version + 1)
+
+        with dataset_orm.ingestion_run():
+            upsert_dataset([(datetime(2020, 3, 1), 300.0)], self.metadata)
+
+        self.assertEqual(dataset_orm.get_data_version(), version + 1)
+
+
 class ParseExcelFileForDatasetsTest(TestCase):
     def setUp(self):
         # Create a mock Excel file
@@ -141,7 +249,7 @@ class GetAllDatasetDfsTest(TransactionTestCase):
         Dataset.objects.create(metadata=metadata2, date=datetime.now(), value=300)
 
     def test_get_all_dfs(self):
-        dataset_orm.CACHED_DFS = {}
+        dataset_orm.DATASET_CACHE.clear()
         # Call the function
         dfs = get_all_dfs()
 
@@ -161,6 +269,379 @@ class GetAllDatasetDfsTest(TransactionTestCase):
         self.assertEqual(len(df2), 1)  # One row for 'Test Data 2'
 
 
+class LoadDfsTest(TestCase):
+    def setUp(self):
+        first = DatasetMetadata.objects.create(internal_name="Test Data 1")
+        second = DatasetMetadata.objects.create(internal_name="Test Data 2")
+        DatasetMetadata.objects.create(internal_name="Hidden", hidden=True)
+        add_dataset_bulk(
+            [(datetime(2021, 1, 1), 2.5), (datetime(1960, 6, 30), -1.0)], first
+        )
+        add_dataset_bulk([(datetime(2020, 1, 1, 12, 30), 300.0)], second)
+        add_dataset_bulk(
+            [(datetime(2020, 1, 1), 1.0)],
+            DatasetMetadata.objects.get(internal_name="Hidden"),
+        )
+
+    def test_copy_matches_query(self):
+        datasets = Dataset.objects.all()
+
+        copied = dataset_orm.copy_dfs(datasets)
+        queried = dataset_orm.query_dfs(datasets)
+
+        self.assertEqual(copied.keys(), queried.keys())
+        for title, df in queried.items():
+            pd.testing.assert_frame_equal(
+                copied[title], df.sort_values("Date", ignore_index=True)
+            )
+
+    def test_load_dfs(self):
+        self.assertEqual(list(dataset_orm.load_dfs()), ["Test Data 1", "Test Data 2"])
+        self.assertEqual(list(dataset_orm.load_dfs(["Hidden", "Missing"])), ["Hidden"])
+        self.assertEqual(dataset_orm.load_dfs([]), {})
+
+    def test_ingestion_keeps_series_in_sync(self):
+        metadata = DatasetMetadata.objects.get(internal_name="Test Data 2")
+        add_dataset_bulk([(datetime(2020, 2, 1), 400.0)], metadata)
+        Dataset.objects.filter(metadata=metadata, value=400.0).update(value=500.0)
+        dataset_orm.update_dataset_series([metadata.id])
+
+        series = DatasetSeries.objects.get(metadata=metadata)
+        df = dataset_orm.series_dfs(DatasetSeries.objects.all())["Test Data 2"]
+
+        self.assertIsNone(series.frequency)
+        self.assertEqual(df["Value"].tolist(), [300.0, 500.0])
+        self.assertEqual(
+            df["Date"].tolist(),
+            [
+                pd.Timestamp("2020-01-01 12:30", tz="UTC"),
+                pd.Timestamp("2020-02-01", tz="UTC"),
+            ],
+        )
+
+    def test_load_dfs_reads_rows_without_series(self):
+        DatasetSeries.objects.filter(metadata__internal_name="Test Data 2").delete()
+        expected = dataset_orm.query_dfs(Dataset.objects.all())
+
+        dfs = dataset_orm.load_dfs()
+
+        self.assertEqual(sorted(dfs), ["Test Data 1", "Test Data 2"])
+        for title, df in dfs.items():
+            pd.testing.assert_frame_equal(
+                df, expected[title].sort_values("Date", ignore_index=True)
+            )
+
+    def test_parse_copy_rows_rejects_other_output(self):
+        with self.assertRaises(ValueError):
+            dataset_orm.parse_copy_rows(b"1,2020-01-01,1.0\n")
+
+
+class DatasetCacheTest(TransactionTestCase):
+    def setUp(self):
+        self.metadata = DatasetMetadata.objects.create(internal_name="Test Data 1")
+        self.other = DatasetMetadata.objects.create(internal_name="Test Data 2")
+        add_dataset_bulk([(datetime(2020, 1, 1), 100.0)], self.metadata)
+        add_dataset_bulk([(datetime(2020, 1, 1), 300.0)], self.other)
+
+    def test_data_version(self):
+        version = dataset_orm.get_data_version()
+
+        dataset_orm.bump_data_version()
+
+        self.assertEqual(dataset_orm.get_data_version(), version + 1)
+
+    def test_hits_and_misses(self):
+        cache = dataset_orm.DatasetCache(background=False)
+
+        self.assertEqual(len(cache.get(["Test Data 1"])), 1)
+        self.assertIsNone(cache.peek())
+        dfs = cache.get()
+        self.assertIs(cache.get(), dfs)
+        self.assertEqual(list(cache.get(["Test Data 2", "missing"])), ["Test Data 2"])
+
+        stats = cache.stats()
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["reloads"], 1)
+        self.assertEqual(stats["datasets"], 2)
+        self.assertEqual(stats["version"], dataset_orm.get_data_version())
+        self.assertIsNotNone(stats["last_reload_seconds"])
+
+    def test_reloads_after_ingestion(self):
+        cache = dataset_orm.DatasetCache(check_interval=0, background=False)
+        dfs = cache.get()
+
+        add_dataset_bulk([(datetime(2020, 2, 1), 200.0)], self.metadata)
+        reloaded = cache.get()
+
+        self.assertEqual(len(reloaded["Test Data 1"]), 2)
+        # Unchanged datasets keep their dataframe for the transform cache
+        self.assertIs(reloaded["Test Data 2"], dfs["Test Data 2"])
+        self.assertEqual(cache.stats()["reloads"], 2)
+
+    def test_background_reload_keeps_serving_old_snapshot(self):
+        cache = dataset_orm.DatasetCache(check_interval=0)
+        dfs = cache.get()
+        add_dataset_bulk([(datetime(2020, 2, 1), 200.0)], self.metadata)
+
+        self.assertIs(cache.get(), dfs)
+        assert cache._reloading is not None
+        cache._reloading.join()
+
+        self.assertEqual(len(cache.get()["Test Data 1"]), 2)
+
+    def test_checks_version_at_most_every_interval(self):
+        cache = dataset_orm.DatasetCache(check_interval=3600, background=False)
+        dfs = cache.get()
+
+        add_dataset_bulk([(datetime(2020, 2, 1), 200.0)], self.metadata)
+
+        self.assertIs(cache.get(), dfs)
+
+
+class SeriesCacheTest(TestCase):
+    def setUp(self):
+        self.metadata = DatasetMetadata.objects.create(internal_name="Test Data 1")
+        add_dataset_bulk([(datetime(2020, 1, 1), 100.0)], self.metadata)
+
+    def test_get_df_caches_series(self):
+        df = dataset_orm.get_df("Test Data 1")
+
+        with self.assertNumQueries(0):
+            self.assertIs(dataset_orm.get_df("Test Data 1"), df)
+        self.assertIsNone(dataset_orm.get_df("Missing"))
+
+    def test_ingestion_invalidates_series(self):
+        dataset_orm.get_df("Test Data 1")
+
+        add_dataset_bulk([(datetime(2020, 2, 1), 200.0)], self.metadata)
+
+        self.assertEqual(
+            dataset_orm.get_df("Test Data 1")["Value"].tolist(), [100.0, 200.0]
+        )
+
+    def test_other_process_bump_drops_everything(self):
+        cache = dataset_orm.SeriesCache(check_interval=0)
+        df = pd.DataFrame({"Value": [1.0]})
+        cache.put("a", df, cache.version)
+        self.assertIs(cache.get("a"), df)
+
+        dataset_orm.bump_data_version()
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_least_recently_used_is_dropped_over_max_bytes(self):
+        df = pd.DataFrame({"Value": np.zeros(100)})
+        size = int(df.memory_usage(index=True).sum())
+        cache = dataset_orm.SeriesCache(max_bytes=2 * size, check_interval=3600)
+        version = cache.version
+        cache.put("a", df, version)
+        cache.put("b", df, version)
+        cache.get("a")
+
+        cache.put("c", df, version)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.size, 2 * size)
+
+    def test_put_after_invalidation_is_ignored(self):
+        cache = dataset_orm.SeriesCache(check_interval=3600)
+        version = cache.version
+        cache.invalidate("a")
+
+        cache.put("a", pd.DataFrame({"Value": [1.0]}), version)
+
+        self.assertIsNone(cache.get("a"))
+
+
+class BoundedDatasetCacheTest(TestCase):
+    def setUp(self):
+        for name, source in [("a", "FRED"), ("b", "FRED"), ("c", "EIA"), ("d", "EIA")]:
+            metadata = DatasetMetadata.objects.create(internal_name=name, source=source)
+            add_dataset_bulk([(datetime(2020, 1, 1), 1.0)], metadata)
+        DatasetMetadata.objects.create(internal_name="hidden", hidden=True)
+        df = dataset_orm.load_dfs(["a"])["a"]
+        self.size = int(df.memory_usage(index=True).sum())
+
+    def cache(self, **kwargs) -> dataset_orm.BoundedDatasetCache:
+        kwargs.setdefault("check_interval", 3600)
+        return dataset_orm.BoundedDatasetCache(max_bytes=2 * self.size, **kwargs)
+
+    def test_loads_on_demand(self):
+        cache = self.cache()
+
+        dfs = cache.get(["b", "a", "missing"])
+
+        self.assertEqual(list(dfs), ["b", "a"])
+        with self.assertNumQueries(0):
+            self.assertIs(cache.get(["a"])["a"], dfs["a"])
+        self.assertEqual(list(cache.get()), ["a", "b", "c", "d"])
+        self.assertIsNone(cache.peek())
+
+    def test_evicts_least_frequently_used(self):
+        cache = self.cache()
+        cache.get(["a"])
+        cache.get(["a"])
+        cache.get(["b"])
+
+        cache.get(["c"])
+
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["resident_bytes"], 2 * self.size)
+        with self.assertNumQueries(0):
+            cache.get(["a", "c"])
+
+    def test_never_evicts_pinned_datasets(self):
+        user = User.objects.create(email="user@example.com")
+        WatchList.objects.create(
+            user=user, dataset=DatasetMetadata.objects.get(internal_name="a")
+        )
+        cache = self.cache(pinned_sources=["EIA"])
+        cache.get(["a", "b", "c"])
+
+        cache.get(["d"])
+
+        self.assertEqual(cache.stats()["pinned"], 3)
+        with self.assertNumQueries(0):
+            cache.get(["a", "c", "d"])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_reloads_changed_datasets_after_ingestion(self):
+        cache = self.cache(check_interval=0)
+        before = cache.get(["a", "b"])
+
+        add_dataset_bulk(
+            [(datetime(2020, 2, 1), 2.0)],
+            DatasetMetadata.objects.get(internal_name="a"),
+        )
+        after = cache.get(["a", "b"])
+
+        self.assertEqual(after["a"]["Value"].tolist(), [1.0, 2.0])
+        self.assertIs(after["b"], before["b"])
+        self.assertEqual(cache.stats()["reloads"], 1)
+
+    def transform(self, cache: dataset_orm.BoundedDatasetCache):
+        return TRANSFORMED_CACHE.get_matrix(
+            cache.get(),
+            AggregationPeriod.QUARTERLY,
+            "December",
+            CorrelationMetric.RAW_VALUE,
+        )
+
+    def test_all_datasets_only_reads_unseen_ones(self):
+        with dataset_orm.ingestion_run():
+            for metadata in DatasetMetadata.objects.filter(hidden=False):
+                add_dataset_bulk(
+                    [(datetime(2020, month, 1), 1.0) for month in (2, 3)], metadata
+                )
+        cache = self.cache(check_interval=0)
+        self.assertIsInstance(cache.get(), LazyDatasets)
+        before = self.transform(cache)
+        self.assertEqual(before.titles, ["a", "b", "c", "d"])
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+        # Only the data version is read, evicted datasets aren't reloaded
+        with self.assertNumQueries(1):
+            self.transform(cache)
+
+        resident = cache.stats()["datasets"]
+        upsert_dataset(
+            [(datetime(2020, 3, 1), 4.0)],
+            DatasetMetadata.objects.get(internal_name="c"),
+        )
+        with patch(
+            "datasets.orm.dataset_orm.load_dfs", wraps=dataset_orm.load_dfs
+        ) as mock_load:
+            after = self.transform(cache)
+
+        # Resident datasets are reloaded, of the evicted ones only "c" is read
+        self.assertEqual(mock_load.call_args_list[-1].args[0], ["c"])
+        self.assertEqual(len(mock_load.call_args_list[0].args[0]), resident)
+        np.testing.assert_array_equal(after.values[:, :2], before.values[:, :2])
+        self.assertNotEqual(after.values[0, 2], before.values[0, 2])
+
+    def test_keeps_recently_requested_sources(self):
+        cache = self.cache(recent_seconds=3600)
+        cache.get(["a", "b"])
+
+        cache.get().load(["c", "d"])
+
+        self.assertEqual(cache.stats()["evictions"], 2)
+        with self.assertNumQueries(0):
+            cache.get(["a", "b"])
+
+    def test_transformed_matrices_count_towards_the_budget(self):
+        cache = self.cache()
+        with patch.object(TRANSFORMED_CACHE, "nbytes", self.size):
+            cache.get(["a", "b"])
+
+            stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["resident_bytes"], self.size)
+        self.assertEqual(stats["transformed_bytes"], self.size)
+
+
+class DatasetCacheSnapshotTest(TransactionTestCase):
+    def setUp(self):
+        self.metadata = DatasetMetadata.objects.create(internal_name="Test Data 1")
+        add_dataset_bulk([(datetime(2020, 1, 1), 100.0)], self.metadata)
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "datasets.snapshot")
+        self.cache = dataset_orm.DatasetCache(
+            check_interval=0, background=False, snapshot_path=self.path
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_snapshot(self):
+        write_snapshot(
+            self.path, dataset_orm.load_dfs(), dataset_orm.get_data_version()
+        )
+
+    def test_maps_current_snapshot(self):
+        self.write_snapshot()
+
+        df = self.cache.get()["Test Data 1"]
+
+        self.assertEqual(df["Value"].tolist(), [100.0])
+        self.assertFalse(df["Value"].to_numpy().flags.writeable)
+
+    def test_stale_snapshot_falls_back_to_database(self):
+        self.write_snapshot()
+        add_dataset_bulk([(datetime(2020, 2, 1), 200.0)], self.metadata)
+
+        df = self.cache.get()["Test Data 1"]
+
+        self.assertEqual(df["Value"].tolist(), [100.0, 200.0])
+        self.assertTrue(df["Value"].to_numpy().flags.writeable)
+
+    def test_corrupt_snapshot_falls_back_to_database(self):
+        self.write_snapshot()
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 8)
+
+        with self.assertLogs("datasets.orm.dataset_orm", "ERROR"):
+            df = self.cache.get()["Test Data 1"]
+
+        self.assertEqual(df["Value"].tolist(), [100.0])
+        self.assertTrue(df["Value"].to_numpy().flags.writeable)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_picks_up_new_snapshot(self):
+        self.assertTrue(
+            self.cache.get()["Test Data 1"]["Value"].to_numpy().flags.writeable
+        )
+
+        self.write_snapshot()
+        df = self.cache.get()["Test Data 1"]
+
+        self.assertFalse(df["Value"].to_numpy().flags.writeable)
+        self.assertEqual(self.cache.stats()["reloads"], 2)
+
+
 class GetDatasetFiltersTest(TransactionTestCase):
     def setUp(self):
         DatasetMetadata.objects.create(
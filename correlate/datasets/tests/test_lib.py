@@ -1,6 +1,34 @@
+import json
 from unittest import TestCase
+from unittest.mock import patch
+from datasets.lib.correlations import (
+    correlate_indexes,
+    run_correlations,
+    run_correlations_local,
+)
 from datasets.lib.date import get_date_from_days_since_1900
-from datetime import datetime
+from datasets.lib.metadata_search import MetadataSearchIndex, encode_cursor
+from datasets.orm.dataset_orm import add_dataset_bulk, bump_data_version
+from datasets.orm.index_orm import get_index_weights
+from datasets.models import (
+    AggregationPeriod,
+    CorrelationMethod,
+    CorrelationMetric,
+    CorrelationParameters,
+    Dataset,
+    DatasetMetadata,
+    Index,
+    IndexDataset,
+    Month,
+    PValueAdjustment,
+)
+from datetime import datetime, UTC
+from django.http import JsonResponse
+from django.test import TestCase as DjangoTestCase, override_settings
+from users.models import User
+import numpy as np
+import pandas as pd
+from scipy import stats
 
 
 class TestGetDateFromDaysSince1900(TestCase):
@@ -19,3 +47,391 @@ class TestGetDateFromDaysSince1900(TestCase):
 
         # Test for a regular date (should return 2017-09-23 for 43001 days since 1900)
         self.assertEqual(get_date_from_days_since_1900(43001), datetime(2017, 9, 23))
+
+
+class TestRunCorrelationsLocal(DjangoTestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="testuser", password="testpassword")
+        metadata = DatasetMetadata.objects.create(
+            internal_name="series",
+            external_name="Series",
+            source="FRED",
+            units="Units",
+        )
+        DatasetMetadata.objects.create(internal_name="other")
+        for month in range(24):
+            Dataset.objects.create(
+                metadata=metadata,
+                date=datetime(2020 + month // 12, month % 12 + 1, 1, tzinfo=UTC),
+                value=month + 1,
+            )
+
+        self.test_df = pd.DataFrame(
+            {
+                "Date": ["2020Q1", "2020Q2", "2020Q3", "2020Q4", "2021Q1", "2021Q2"],
+                "Value": [1, 2, 3, 5, 4, 6],
+            }
+        )
+
+    def create_parameters(self, **kwargs) -> CorrelationParameters:
+        parameters = dict(
+            user=self.user,
+            start_year=2020,
+            end_year=2021,
+            aggregation_period=AggregationPeriod.QUARTERLY,
+            correlation_metric=CorrelationMetric.RAW_VALUE,
+            lag_periods=0,
+            fiscal_year_end=Month.DECEMBER,
+        )
+        parameters.update(kwargs)
+        return CorrelationParameters.objects.create(**parameters)
+
+    def test_run_correlations_local(self):
+        parameters = self.create_parameters()
+
+        response = run_correlations_local(
+            parameters, self.test_df, selected_datasets=["series"]
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(data["correlation_parameters_id"], parameters.id)
+        self.assertEqual(data["aggregation_period"], "Quarterly")
+        self.assertEqual(len(data["data"]), 1)
+        point = data["data"][0]
+        self.assertEqual(point["title"], "Series")
+        self.assertEqual(point["internal_name"], "series")
+        self.assertEqual(point["units"], "Units")
+        self.assertEqual(point["dates"][0], "2020Q1")
+        self.assertEqual(point["dataset_data"][0], 6)
+        self.assertAlmostEqual(
+            point["pearson_value"],
+            np.corrcoef([1, 2, 3, 5, 4, 6], [6, 15, 24, 33, 42, 51])[0, 1],
+        )
+
+    def test_run_correlations_local_year_window_and_data(self):
+        parameters = self.create_parameters(end_year=2020, lag_periods=1)
+
+        response = run_correlations_local(
+            parameters,
+            self.test_df,
+            selected_datasets=["series"],
+            limit=1,
+            include_data=False,
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(len(data["data"]), 1)
+        self.assertEqual(data["data"][0]["dates"], [])
+        self.assertAlmostEqual(
+            data["data"][0]["pearson_value"],
+            np.corrcoef([1, 2, 3, 5], [6, 15, 24, 33])[0, 1],
+        )
+
+    def test_run_correlations_local_year_window_without_lags(self):
+        response = run_correlations_local(
+            self.create_parameters(end_year=2020),
+            self.test_df,
+            selected_datasets=["series"],
+        )
+        point = json.loads(response.content)["data"][0]
+
+        self.assertEqual(point["dates"], ["2020Q1", "2020Q2", "2020Q3", "2020Q4"])
+        self.assertAlmostEqual(
+            point["pearson_value"],
+            np.corrcoef([1, 2, 3, 5], [6, 15, 24, 33])[0, 1],
+        )
+
+    def test_run_correlations_local_p_values(self):
+        response = run_correlations_local(
+            self.create_parameters(),
+            self.test_df,
+            selected_datasets=["series"],
+            p_value_adjustment=PValueAdjustment.BENJAMINI_HOCHBERG,
+        )
+        point = json.loads(response.content)["data"][0]
+
+        self.assertAlmostEqual(
+            point["p_value"],
+            stats.pearsonr([1, 2, 3, 5, 4, 6], [6, 15, 24, 33, 42, 51]).pvalue,
+        )
+
+    def test_run_correlations_local_spearman(self):
+        parameters = self.create_parameters(
+            correlation_method=CorrelationMethod.SPEARMAN
+        )
+
+        response = run_correlations_local(
+            parameters, self.test_df, selected_datasets=["series"]
+        )
+        point = json.loads(response.content)["data"][0]
+
+        self.assertAlmostEqual(
+            point["pearson_value"],
+            stats.spearmanr([1, 2, 3, 5, 4, 6], [6, 15, 24, 33, 42, 51]).statistic,
+        )
+
+    def test_run_correlations_local_stream(self):
+        parameters = self.create_parameters(lag_periods=1)
+        expected = json.loads(
+            run_correlations_local(
+                parameters, self.test_df, selected_datasets=["series"]
+            ).content
+        )
+
+        response = run_correlations_local(
+            parameters, self.test_df, selected_datasets=["series"], stream=True
+        )
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        header, *rows = [json.loads(line) for line in lines]
+
+        self.assertEqual(
+            header,
+            {
+                "aggregation_period": "Quarterly",
+                "correlation_metric": "RAW_VALUE",
+                "fiscalYearEnd": "December",
+                "correlation_parameters_id": parameters.id,
+                "count": 2,
+            },
+        )
+        self.assertEqual(rows, expected["data"])
+
+    def test_correlate_indexes(self):
+        series = DatasetMetadata.objects.get(internal_name="series")
+        doubled = Index.objects.create(name="Doubled", user=self.user)
+        IndexDataset.objects.create(index=doubled, dataset=series, weight=2)
+        empty = Index.objects.create(name="Empty", user=self.user)
+
+        response = correlate_indexes(
+            [doubled, empty],
+            AggregationPeriod.QUARTERLY,
+            CorrelationMetric.RAW_VALUE,
+            "December",
+            self.test_df.copy(),
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(len(data["data"]), 1)
+        point = data["data"][0]
+        self.assertEqual(point["title"], "Doubled")
+        self.assertAlmostEqual(point["dataset_data"][0], 2 * 6 / 69)
+        self.assertAlmostEqual(
+            point["pearson_value"],
+            np.corrcoef([1, 2, 3, 5, 4, 6], [6, 15, 24, 33, 42, 51])[0, 1],
+        )
+
+    def test_correlate_indexes_reuses_cached_series(self):
+        series = DatasetMetadata.objects.get(internal_name="series")
+        index = Index.objects.create(name="Index", user=self.user)
+        IndexDataset.objects.create(index=index, dataset=series, weight=1)
+
+        def correlate():
+            return json.loads(
+                correlate_indexes(
+                    [index],
+                    AggregationPeriod.QUARTERLY,
+                    CorrelationMetric.RAW_VALUE,
+                    "December",
+                    self.test_df.copy(),
+                ).content
+            )
+
+        with patch(
+            "datasets.lib.correlations.get_index_weights",
+            wraps=get_index_weights,
+        ) as mock_weights:
+            first = correlate()
+            second = correlate()
+            self.assertEqual(mock_weights.call_count, 1)
+            self.assertEqual(first, second)
+
+            add_dataset_bulk([(datetime(2022, 1, 1), 100.0)], series)
+            correlate()
+            self.assertEqual(mock_weights.call_count, 2)
+
+    def test_correlate_indexes_recomputes_index_saved_elsewhere(self):
+        series = DatasetMetadata.objects.get(internal_name="series")
+        index = Index.objects.create(name="Index", user=self.user)
+        IndexDataset.objects.create(index=index, dataset=series, weight=1)
+
+        def correlate(index: Index):
+            return json.loads(
+                correlate_indexes(
+                    [index],
+                    AggregationPeriod.QUARTERLY,
+                    CorrelationMetric.RAW_VALUE,
+                    "December",
+                    self.test_df.copy(),
+                ).content
+            )
+
+        first = correlate(index)
+        # Saved by another process, which only clears its own cache
+        IndexDataset.objects.filter(index=index).update(weight=2)
+        index.save()
+        second = correlate(Index.objects.get(id=index.id))
+
+        self.assertAlmostEqual(
+            second["data"][0]["dataset_data"][0],
+            2 * first["data"][0]["dataset_data"][0],
+        )
+
+    def test_correlate_indexes_recomputes_after_ingestion_elsewhere(self):
+        series = DatasetMetadata.objects.get(internal_name="series")
+        index = Index.objects.create(name="Index", user=self.user)
+        IndexDataset.objects.create(index=index, dataset=series, weight=1)
+
+        def correlate():
+            correlate_indexes(
+                [index],
+                AggregationPeriod.QUARTERLY,
+                CorrelationMetric.RAW_VALUE,
+                "December",
+                self.test_df.copy(),
+            )
+
+        with patch(
+            "datasets.lib.correlations.get_index_weights",
+            wraps=get_index_weights,
+        ) as mock_weights:
+            correlate()
+            # Ingested by another process, which only clears its own cache
+            Dataset.objects.create(
+                metadata=series, date=datetime(2022, 1, 1, tzinfo=UTC), value=100.0
+            )
+            bump_data_version()
+            correlate()
+
+        self.assertEqual(mock_weights.call_count, 2)
+
+    @override_settings(CORRELATION_ENGINE="rust")
+    def test_run_correlations_streams_locally(self):
+        with patch(
+            "datasets.lib.correlations.run_correlations_local",
+            return_value=JsonResponse({}),
+        ) as mock_local:
+            run_correlations(self.create_parameters(), self.test_df, stream=True)
+
+        mock_local.assert_called_once()
+        self.assertTrue(mock_local.call_args.kwargs["stream"])
+
+    @override_settings(CORRELATION_ENGINE="rust")
+    def test_run_correlations_runs_spearman_locally(self):
+        parameters = self.create_parameters(
+            correlation_method=CorrelationMethod.SPEARMAN
+        )
+        with patch(
+            "datasets.lib.correlations.run_correlations_local",
+            return_value=JsonResponse({}),
+        ) as mock_local:
+            run_correlations(parameters, self.test_df)
+
+        mock_local.assert_called_once()
+
+    @override_settings(CORRELATION_ENGINE="local")
+    def test_run_correlations_uses_configured_engine(self):
+        with patch(
+            "datasets.lib.correlations.run_correlations_local",
+            return_value=JsonResponse({}),
+        ) as mock_local:
+            run_correlations(self.create_parameters(), self.test_df)
+
+        mock_local.assert_called_once()
+
+
+class TestMetadataSearchIndex(TestCase):
+    def setUp(self):
+        self.metadatas = [
+            DatasetMetadata(
+                id=1,
+                internal_name="GDP",
+                external_name="Gross Domestic Product",
+                source="FRED",
+                release="GDP Release",
+                categories=["Economy"],
+                popularity=50,
+                group_popularity=10,
+            ),
+            DatasetMetadata(
+                id=2,
+                internal_name="OIL",
+                external_name="Crude Oil Prices",
+                description="Prices of crude oil, per barrel",
+                source="EIA",
+                categories=["Energy", "Prices"],
+                popularity=90,
+                group_popularity=5,
+            ),
+            DatasetMetadata(
+                id=3,
+                internal_name="CPI",
+                external_name="Consumer Price Index",
+                source="FRED",
+                categories=["Prices"],
+                popularity=None,
+                group_popularity=80,
+            ),
+            DatasetMetadata(
+                id=4,
+                internal_name="GAS",
+                external_name="Gasoline Prices",
+                source="EIA",
+                categories=["Energy"],
+                popularity=90,
+                group_popularity=1,
+            ),
+        ]
+        self.index = MetadataSearchIndex(
+            self.metadatas, [{"id": m.id} for m in self.metadatas]
+        )
+
+    def ids(self, **kwargs) -> list[int]:
+        return [item["id"] for item in self.index.search(**kwargs)["results"]]
+
+    def test_orders_by_popularity(self):
+        self.assertEqual(self.ids(), [2, 4, 1, 3])
+        self.assertEqual(self.ids(order="group_popularity"), [3, 1, 2, 4])
+
+    def test_words_match_token_prefixes(self):
+        self.assertEqual(self.ids(query="pric"), [2, 4, 3])
+        self.assertEqual(self.ids(query="Crude  pri"), [2])
+        self.assertEqual(self.ids(query="barrel"), [2])
+        self.assertEqual(self.ids(query="missing"), [])
+
+    def test_facets(self):
+        self.assertEqual(self.ids(facets={"source": ["FRED", "Other"]}), [1, 3])
+        self.assertEqual(
+            self.ids(query="price", facets={"categories": ["Energy"]}), [2, 4]
+        )
+        self.assertEqual(
+            self.ids(facets={"source": ["EIA"], "categories": ["Prices"]}), [2]
+        )
+        self.assertEqual(self.ids(facets={"source": []}), [2, 4, 1, 3])
+
+    def test_cursor_pagination(self):
+        first = self.index.search(limit=3)
+        second = self.index.search(limit=3, cursor=first["next_cursor"])
+
+        self.assertEqual([item["id"] for item in first["results"]], [2, 4, 1])
+        self.assertEqual(first["count"], 4)
+        self.assertEqual([item["id"] for item in second["results"]], [3])
+        self.assertIsNone(second["next_cursor"])
+
+        # The cursor holds a sort key, so it survives rebuilding the index
+        rebuilt = MetadataSearchIndex(
+            self.metadatas[1:], [{"id": m.id} for m in self.metadatas[1:]]
+        )
+        page = rebuilt.search(limit=3, cursor=first["next_cursor"])
+        self.assertEqual([item["id"] for item in page["results"]], [3])
+
+    def test_invalid_arguments(self):
+        for kwargs in [
+            {"order": "name"},
+            {"limit": 0},
+            {"cursor": "not a cursor"},
+            {"cursor": encode_cursor(("a", 1))},  # type: ignore
+            {"facets": {"units": ["$"]}},
+        ]:
+            with self.assertRaises(ValueError):
+                self.index.search(**kwargs)
@@ -28,7 +28,7 @@ class CorrelateManualInputViewTests(APITestCase):
         self.assertNotEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     @patch(
-        "datasets.views.run_correlations_rust",
+        "datasets.views.run_correlations",
         return_value=JsonResponse({"test": "test"}),
     )
     def test_valid_request(self, _mock_run_correlations):
@@ -57,7 +57,7 @@ class CorrelateManualInputViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     @patch(
-        "datasets.views.run_correlations_rust",
+        "datasets.views.run_correlations",
         return_value=JsonResponse({"test": "test"}),
     )
     def test_valid_request_creates_correlation(self, _mock_run_correlations):
@@ -99,3 +99,26 @@ class CorrelateManualInputViewTests(APITestCase):
         self.assertIsNone(correlation_parameters.ticker)
         self.assertIsNone(correlation_parameters.company_metric)
         self.assertIsNotNone(correlation_parameters.input_data)
+
+    @patch(
+        "datasets.views.run_correlations",
+        return_value=JsonResponse({"test": "test"}),
+    )
+    def test_stream_request(self, mock_run_correlations):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+        params: dict[str, str] = {
+            "aggregation_period": AggregationPeriod.ANNUALLY.value,
+            "stream": "true",
+        }
+
+        body = """Q1'11	4,401
+                    Q2'11	4,730
+                    Q3'11	4,625
+                    Q4'11	4,910
+                    """
+
+        response = self.client.post(
+            f"{self.url}?{urlencode(params)}", data=body, content_type="text/plain"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(mock_run_correlations.call_args.kwargs["stream"])
@@ -44,7 +44,7 @@ class CorrelateViewTests(APITestCase):
         return_value=({"2020-01-01": 1}, Month.DECEMBER),
     )
     @patch(
-        "datasets.views.run_correlations_rust",
+        "datasets.lib.correlations.run_correlations",
         return_value=JsonResponse({"test": "test"}),
     )
     def test_valid_request(self, mock_fetch_stock_data, mock_run_correlations):
@@ -67,7 +67,7 @@ class CorrelateViewTests(APITestCase):
         return_value=({"2020-01-01": 1}, Month.DECEMBER),
     )
     @patch(
-        "datasets.views.run_correlations_rust",
+        "datasets.lib.correlations.run_correlations",
         return_value=JsonResponse({"test": "test"}),
     )
     def test_valid_request_creates_correlation(
@@ -0,0 +1,34 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+class DatasetCacheStatsViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="testuser", password="testpassword")
+        self.token, _ = Token.objects.get_or_create(user=self.user)
+        self.url = reverse("dataset-cache-stats")
+
+    def test_access_without_authentication(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.json()),
+            {
+                "version",
+                "datasets",
+                "hits",
+                "misses",
+                "reloads",
+                "last_reload_seconds",
+                "total_reload_seconds",
+            },
+        )
@@ -79,3 +79,18 @@ class TestGetAllDatasetMetadata(APITestCase):
                 },
             ],
         )
+
+    def test_not_modified_until_metadata_changes(self) -> None:
+        metadata = DatasetMetadata.objects.create(internal_name="table_name")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        metadata.hidden = True
+        metadata.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [])
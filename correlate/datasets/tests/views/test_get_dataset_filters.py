@@ -61,3 +61,17 @@ class TestGetDatasetFilters(APITestCase):
                 "categories": ["a", "b"],
             },
         )
+
+    def test_not_modified_until_metadata_changes(self) -> None:
+        DatasetMetadata.objects.create(internal_name="table_name", source="Source")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        DatasetMetadata.objects.create(internal_name="other", source="Source 2")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content)["source"], ["Source", "Source 2"])
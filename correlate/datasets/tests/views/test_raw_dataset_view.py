@@ -21,7 +21,7 @@ class TestRawDatasetView(APITestCase):
         mock_df = pd.DataFrame(
             {"Date": ["2021-01-01", "2021-01-02"], "Value": ["10", "20"]}
         )
-        dataset_orm.CACHED_DFS = {"table_name": mock_df}
+        dataset_orm.DATASET_CACHE.set({"table_name": mock_df})
         DatasetMetadata.objects.create(
             internal_name="table_name",
             external_name="Title",
@@ -48,8 +48,7 @@ class TestRawDatasetView(APITestCase):
             json_data["description"],
             "Description",
         )
-        # Todo: This is really bad we shouldnt be updating state this way
-        dataset_orm.CACHED_DFS = {}
+        dataset_orm.DATASET_CACHE.clear()
 
     @patch(
         "datasets.orm.dataset_metadata_orm.get_metadata_from_external_name",
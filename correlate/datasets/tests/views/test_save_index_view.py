@@ -1,8 +1,16 @@
+import pandas as pd
+from core.index_cache import INDEX_CACHE, index_key
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from users.models import User
-from datasets.models import Index, IndexDataset, DatasetMetadata
+from datasets.models import (
+    AggregationPeriod,
+    CorrelationMetric,
+    DatasetMetadata,
+    Index,
+    IndexDataset,
+)
 from django.urls import reverse
 from rest_framework.authtoken.models import Token
 
@@ -44,6 +52,30 @@ class SaveIndexViewTests(TestCase):
         )
         self.assertEqual(response.data, {"message": "Index saved"})  # type: ignore
 
+    def test_save_existing_index_invalidates_cached_series(self):
+        index = Index.objects.create(name="Old Index", user=self.user)
+        key = index_key(
+            index.id,
+            AggregationPeriod.QUARTERLY,
+            "December",
+            CorrelationMetric.RAW_VALUE,
+        )
+        INDEX_CACHE.put(key, pd.DataFrame(), ["Dataset 1"], INDEX_CACHE.version)
+        data = {
+            "index_id": index.id,
+            "index_name": "Test Index",
+            "datasets": [{"title": "Dataset 2", "percentage": "1"}],
+        }
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse("save-index"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(INDEX_CACHE.get(key))
+        self.assertGreater(Index.objects.get(id=index.id).updated_at, index.updated_at)
+
     def test_save_index_unauthenticated(self):
         # No token provided, simulating unauthenticated state
         data = {
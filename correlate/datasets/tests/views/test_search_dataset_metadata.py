@@ -0,0 +1,71 @@
+from users.models import User
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from datasets.models import DatasetMetadata
+import json
+
+
+class TestSearchDatasetMetadata(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(email="testuser", password="testpassword")
+        self.token, _ = Token.objects.get_or_create(user=self.user)
+        self.url = reverse("search-dataset-metadata")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")  # type: ignore
+
+        DatasetMetadata.objects.create(
+            internal_name="oil",
+            external_name="Crude Oil Prices",
+            source="EIA",
+            popularity=10,
+        )
+        DatasetMetadata.objects.create(
+            internal_name="gas",
+            external_name="Gasoline Prices",
+            source="EIA",
+            popularity=20,
+        )
+        DatasetMetadata.objects.create(
+            internal_name="cpi",
+            external_name="Consumer Price Index",
+            source="FRED",
+            popularity=30,
+        )
+        DatasetMetadata.objects.create(
+            internal_name="hidden",
+            external_name="Hidden Prices",
+            source="EIA",
+            hidden=True,
+        )
+
+    def test_search(self) -> None:
+        response = self.client.get(
+            self.url, {"q": "price", "source": "EIA", "limit": 1}
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][0]["internal_name"], "gas")
+        self.assertEqual(data["results"][0]["external_name"], "Gasoline Prices")
+
+        response = self.client.get(
+            self.url,
+            {"q": "price", "source": "EIA", "limit": 1, "cursor": data["next_cursor"]},
+        )
+        data = json.loads(response.content)
+        self.assertEqual([r["internal_name"] for r in data["results"]], ["oil"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_multiple_facet_values(self) -> None:
+        response = self.client.get(self.url + "?source=EIA&source=FRED")
+
+        self.assertEqual(
+            [r["internal_name"] for r in json.loads(response.content)["results"]],
+            ["cpi", "gas", "oil"],
+        )
+
+    def test_invalid_request(self) -> None:
+        response = self.client.get(self.url, {"order": "name"})
+
+        self.assertEqual(response.status_code, 400)
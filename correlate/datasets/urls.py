@@ -31,10 +31,20 @@ urlpatterns = [
         views.GetAllDatasetMetadata.as_view(),
         name="get_all_dataset_metadata",
     ),
+    path(
+        "search-dataset-metadata",
+        views.SearchDatasetMetadata.as_view(),
+        name="search-dataset-metadata",
+    ),
     path("save-index", views.SaveIndexView.as_view(), name="save-index"),
     path("save-index/", views.SaveIndexView.as_view(), name="save-index"),
     path("get-indices", views.GetIndicesView.as_view(), name="get-indices"),
     path("get-indices/", views.GetIndicesView.as_view(), name="get-indices"),
+    path(
+        "dataset-cache-stats",
+        views.DatasetCacheStatsView.as_view(),
+        name="dataset-cache-stats",
+    ),
     path(
         "get-dataset-filters",
         views.GetDatasetFilters.as_view(),
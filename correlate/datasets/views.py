@@ -3,11 +3,12 @@ import urllib.parse
 from users.models import User
 from typing import List
 import pandas as pd
+from datasets.lib.metadata_search import FACETS
 from datasets.lib.report import generate_report, generate_stock_report
 from datasets.lib.correlations import (
     correlate_indexes,
     generate_stock_correlations,
-    run_correlations_rust,
+    run_correlations,
 )
 from adapters.discounting_cash_flows import (
     fetch_segment_data,
@@ -24,8 +25,11 @@ from core.data_trends import (
     calculate_year_over_year_growth,
     calculate_yearly_stacks,
 )
+from core.index_cache import INDEX_CACHE
 from core.main_logic import correlate_datasets, create_index
 from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.http import (
     HttpResponse,
     HttpResponseBadRequest,
@@ -43,30 +47,42 @@ from datasets.models import (
     CompanyMetric,
     CorrelateData,
     CorrelateDataPoint,
+    CorrelationMethod,
     CorrelationMetric,
-    DatasetMetadata,
     Index,
     IndexDataset,
     Month,
+    PValueAdjustment,
     Report,
 )
 from datasets.orm.correlation_parameters_orm import (
     insert_manual_correlation,
 )
 from datasets.orm.dataset_metadata_orm import (
-    get_internal_name_from_external_name,
+    get_internal_names_from_external_names,
     get_metadata_from_external_name,
     get_metadata_from_name,
+    get_metadata_from_names,
+    get_metadata_listing,
 )
-from datasets.orm.dataset_orm import get_dataset_filters, get_df
+from datasets.orm.dataset_orm import DATASET_CACHE, get_df
 from datasets.serializers import (
     CorrelateIndexRequestBody,
-    DatasetMetadataSerializer,
     IndexSerializer,
     ReportSerializer,
 )
 
 
+def json_response_with_etag(
+    request: Request, content: bytes, etag: str
+) -> HttpResponse:
+    """``content`` as JSON, or 304 when the client already holds ``etag``."""
+    etag = quote_etag(etag)
+    response = HttpResponse(content, content_type="application/json")
+    response.headers["ETag"] = etag
+    return get_conditional_response(request, etag=etag, response=response)  # type: ignore
+
+
 class RevenueView(APIView):
     permission_classes = (IsAuthenticated,)
 
@@ -277,6 +293,15 @@ class CorrelateView(APIView):
         ]
         selected_datasets = request.GET.getlist("selected_datasets")
         selected_indexes = request.GET.getlist("selected_indexes")
+        p_value_adjustment = PValueAdjustment[
+            request.GET.get("p_value_adjustment", PValueAdjustment.NONE.value).upper()
+        ]
+        correlation_method = CorrelationMethod[
+            request.GET.get(
+                "correlation_method", CorrelationMethod.PEARSON.value
+            ).upper()
+        ]
+        stream = request.GET.get("stream", "false").lower() == "true"
 
         segment: str | None = request.GET.get("segment", None)
         if stock is None or len(stock) < 1:
@@ -293,6 +318,9 @@ class CorrelateView(APIView):
             end_year=end_year,
             selected_indexes=selected_indexes,
             selected_datasets=selected_datasets,
+            p_value_adjustment=p_value_adjustment,
+            correlation_method=correlation_method,
+            stream=stream,
         )
 
 
@@ -321,6 +349,15 @@ class CorrelateInputDataView(APIView):
         ]
         selected_datasets = request.GET.getlist("selected_datasets")
         selected_indexes = request.GET.getlist("selected_indexes")
+        p_value_adjustment = PValueAdjustment[
+            request.GET.get("p_value_adjustment", PValueAdjustment.NONE.value).upper()
+        ]
+        correlation_method = CorrelationMethod[
+            request.GET.get(
+                "correlation_method", CorrelationMethod.PEARSON.value
+            ).upper()
+        ]
+        stream = request.GET.get("stream", "false").lower() == "true"
 
         dates: list[str] = test_data["Date"]  # type: ignore
         if len(dates) == 0:
@@ -356,26 +393,44 @@ class CorrelateInputDataView(APIView):
                 correlation_metric=correlation_metric,
                 lag_periods=lag_periods,
                 fiscal_year_end=fiscal_end_month,
+                correlation_method=correlation_method,
             )
-            return run_correlations_rust(
+            return run_correlations(
                 correlation_parameters=correlation_parameters,
                 test_df=test_df,
                 selected_datasets=selected_datasets,
+                p_value_adjustment=p_value_adjustment,
+                stream=stream,
             )
 
 
 class GetAllDatasetMetadata(APIView):
     permission_classes = (IsAuthenticated,)
 
-    def get(self, _: Request) -> HttpResponse:
-        metadata = DatasetMetadata.objects.filter(hidden=False)
-        serialized = DatasetMetadataSerializer(metadata, many=True)
-        return JsonResponse(
-            serialized.data,
-            safe=False,
+    def get(self, request: Request) -> HttpResponse:
+        listing = get_metadata_listing()
+        return json_response_with_etag(
+            request, listing.metadata_json, listing.metadata_etag
         )
 
 
+class SearchDatasetMetadata(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> HttpResponse:
+        try:
+            page = get_metadata_listing().search.search(
+                query=request.GET.get("q", ""),
+                facets={facet: request.GET.getlist(facet) for facet in FACETS},
+                order=request.GET.get("order", "popularity"),
+                limit=int(request.GET.get("limit", 50)),
+                cursor=request.GET.get("cursor") or None,
+            )
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        return JsonResponse(page)
+
+
 class CorrelateIndex(APIView):
     permission_classes = (IsAuthenticated,)
 
@@ -396,11 +451,9 @@ class CorrelateIndex(APIView):
 
         request_body = CorrelateIndexRequestBody(**json.loads(body))
 
-        for i in range(len(request_body.index_datasets)):
-            internal_name = get_internal_name_from_external_name(
-                request_body.index_datasets[i]
-            )
-            request_body.index_datasets[i] = internal_name
+        request_body.index_datasets = get_internal_names_from_external_names(
+            request_body.index_datasets
+        )
 
         test_df = pd.DataFrame(
             {"Date": request_body.dates, "Value": request_body.input_data}
@@ -483,16 +536,21 @@ class SaveIndexView(APIView):
                     correlation_metric=correlation_metric,
                 )
 
+            metadatas = get_metadata_from_names(
+                [dataset[0] for dataset in parsed_datasets]
+            )
             IndexDataset.objects.bulk_create(
                 [
                     IndexDataset(
-                        dataset=get_metadata_from_name(dataset[0]),
+                        dataset=metadatas.get(dataset[0]),
                         weight=dataset[1],
                         index=index,
                     )
                     for dataset in parsed_datasets
                 ]
             )
+            # Other processes see the new updated_at once this commits
+            transaction.on_commit(lambda: INDEX_CACHE.invalidate_index(index.id))
 
         return Response({"message": "Index saved"})
 
@@ -507,12 +565,21 @@ class GetIndicesView(APIView):
         return Response(index_serializer.data)
 
 
-class GetDatasetFilters(APIView):
+class DatasetCacheStatsView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, _: Request) -> HttpResponse:
-        filters = get_dataset_filters()
-        return JsonResponse(filters)
+        return JsonResponse(DATASET_CACHE.stats())
+
+
+class GetDatasetFilters(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request: Request) -> HttpResponse:
+        listing = get_metadata_listing()
+        return json_response_with_etag(
+            request, listing.filters_json, listing.filters_etag
+        )
 
 
 class GenerateReport(APIView):
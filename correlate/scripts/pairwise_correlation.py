@@ -1,47 +1,31 @@
 """
 This script runs pairwise correlations against all datasets and calculates clusters as well as average correlation of a dataset against other datasets.
+
+The full matrix is built by the pairwise_correlation management command, this
+keeps the old entry point printing the averages and clusters.
 """
 
+import os
+import tempfile
+import time
+
+from core.main_logic import transform_and_align
+from core.pairwise import pairwise_correlation
+from datasets.models import AggregationPeriod
 from datasets.orm.dataset_orm import (
     get_all_dfs,
 )
-from core.main_logic import calculate_correlation
-from datasets.models import AggregationPeriod
-import time
 
 
 def calculate_pairwise_correlation():
-    dfs = get_all_dfs()
-
-    average = {}
-    top_correlations = {}
-
-    # f = open("pairwise_correlation.csv", "w")
-
-    for title, df in dfs.items():
-        start_time = time.time()
-        sorted_correlations = calculate_correlation(
-            AggregationPeriod.QUARTERLY, "December", dfs=dfs, test_data=df
-        )
-        correlations = [dp.pearson_value for dp in sorted_correlations]
-        if len(correlations) == 0:
-            print(title, "no correlations")
-            continue
-        average[title] = sum(correlations) / len(correlations)
-        top_correlation = [
-            dp.title
-            for dp in sorted_correlations
-            if dp.pearson_value > 0.99 and dp.title != title
-        ]
-        if top_correlation:
-            top_correlations[title] = top_correlation
-            # f.write(f"{title},{",".join(top_correlation)}\n")
-            # f.flush()
-            # print(f"{title},{",".join([str(t) for t in top_correlation])}\n")
+    start_time = time.time()
+    matrix = transform_and_align(get_all_dfs(), AggregationPeriod.QUARTERLY, "December")
 
-        print(
-            f"Finished {title}. {len(average)/len(dfs) * 100:.2f} % completed in {time.time() - start_time:.2f} seconds."
+    with tempfile.TemporaryDirectory() as directory:
+        summary = pairwise_correlation(
+            matrix, os.path.join(directory, "pairwise_correlation.npy")
         )
 
-    print(average)
-    print(top_correlations)
+    print(f"Finished {len(matrix)} datasets in {time.time() - start_time:.2f} seconds.")
+    print(summary.averages)
+    print(summary.top_correlations)